@@ -87,6 +87,26 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Asynchronous generation jobs: artifacts directory, concurrent generations per web process
+# and retention of finished jobs in seconds (0 keeps them forever)
+GENERATION_JOBS_DIR = os.environ.get('GENERATION_JOBS_DIR', str(BASE_DIR / 'generation_jobs'))
+GENERATION_JOB_WORKERS = int(os.environ.get('GENERATION_JOB_WORKERS', 2))
+GENERATION_JOB_RETENTION_SECONDS = int(os.environ.get('GENERATION_JOB_RETENTION_SECONDS', 24 * 3600))
+
+# Maximum WORKERS (worker processes per generation) a request may ask for; 0 allows up to the CPU count
+GENERATION_MAX_WORKERS = int(os.environ.get('GENERATION_MAX_WORKERS', 2))
+
+# Cache of seeded dataset archives: directory and size cap in bytes (0 disables the cache)
+DATASET_CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', str(BASE_DIR / 'dataset_cache'))
+DATASET_CACHE_MAX_BYTES = int(os.environ.get('DATASET_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+# Admission control of generation requests, from their estimated cost (0 disables a limit):
+# requests over the transaction or memory limit are rejected (or downscaled on request),
+# synchronous requests expected to run longer than GENERATION_MAX_SYNC_SECONDS become jobs
+GENERATION_MAX_TRANSACTIONS = int(os.environ.get('GENERATION_MAX_TRANSACTIONS', 20_000_000))
+GENERATION_MAX_MEMORY_BYTES = int(os.environ.get('GENERATION_MAX_MEMORY_BYTES', 4 * 1024 ** 3))
+GENERATION_MAX_SYNC_SECONDS = int(os.environ.get('GENERATION_MAX_SYNC_SECONDS', 120))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Fundraising Dataset Generator API',
     'VERSION': '1.0.0',
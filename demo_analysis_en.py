@@ -32,26 +32,61 @@ except OSError:
         plt.style.use('default')
 sns.set_palette("husl")
 
+# Date columns of the exported tables, written as ISO days (YYYY-MM-DD)
+DATE_COLUMNS = ['date', 'campaign_start', 'campaign_end', 'Creation_date']
+
+def read_dataset_csv(source):
+    """Read an exported CSV table, parsing its date columns once with their known ISO format"""
+    df = pd.read_csv(source)
+    for column in df.columns.intersection(DATE_COLUMNS):
+        df[column] = pd.to_datetime(df[column], format='%Y-%m-%d')
+    return df
+
 def load_data_from_zip(zip_path):
     """Load data from ZIP file generated by API"""
     transactions_df = None
     contacts_df = None
+    campaigns_df = None
     
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
         for file_name in zip_ref.namelist():
             if 'transactions' in file_name.lower():
                 with zip_ref.open(file_name) as f:
-                    transactions_df = pd.read_csv(f)
+                    transactions_df = read_dataset_csv(f)
             elif 'contacts' in file_name.lower():
                 with zip_ref.open(file_name) as f:
-                    contacts_df = pd.read_csv(f)
+                    contacts_df = read_dataset_csv(f)
+            elif 'campaigns' in file_name.lower():
+                with zip_ref.open(file_name) as f:
+                    campaigns_df = read_dataset_csv(f)
     
+    if campaigns_df is not None:
+        # Normalized export: bring the campaign columns back onto the transactions
+        transactions_df = transactions_df.merge(campaigns_df, on='campaign_id', how='left')
+    
+    return transactions_df, contacts_df
+
+# Transaction columns used by the analysis (read alone from columnar datasets)
+ANALYSIS_TRANSACTION_COLUMNS = ['contact_id', 'date', 'donation_amount', 'channel']
+
+def load_data_from_columnar(dataset_path, transaction_columns=None):
+    """Load data from a Parquet / Arrow dataset directory, reading only the given transaction columns"""
+    from fundraising_generator.services.columnar import FORMAT_EXTENSIONS, read_columnar_dataset
+
+    # Detect the format from the extension of the files
+    extensions = {Path(name).suffix.lstrip('.') for _, _, files in os.walk(dataset_path) for name in files}
+    output_format = next(fmt for fmt, extension in FORMAT_EXTENSIONS.items() if extension in extensions)
+
+    transactions_df = read_columnar_dataset(
+        os.path.join(dataset_path, 'transactions'), output_format, columns=transaction_columns
+    )
+    contacts_df = read_columnar_dataset(os.path.join(dataset_path, 'contacts'), output_format)
     return transactions_df, contacts_df
 
 def load_data_from_csv(transactions_path, contacts_path):
     """Load data from CSV files"""
-    transactions_df = pd.read_csv(transactions_path)
-    contacts_df = pd.read_csv(contacts_path)
+    transactions_df = read_dataset_csv(transactions_path)
+    contacts_df = read_dataset_csv(contacts_path)
     return transactions_df, contacts_df
 
 def identify_regular_donors(transactions_df, min_donations=3):
@@ -86,7 +121,6 @@ def calculate_donor_longevity(contacts_df, transactions_df, current_year=2025):
         Series with longevity in years per contact_id
     """
     first_donations = transactions_df.groupby('contact_id')['date'].min()
-    first_donations = pd.to_datetime(first_donations)
     
     longevity = (pd.Timestamp(f'{current_year}-01-01') - first_donations).dt.days / 365.25
     
@@ -363,6 +397,7 @@ def main():
     """Main function"""
     if len(sys.argv) < 2:
         print("Usage: python demo_analysis_en.py <zip_file> [min_donations] [timestamp]")
+        print("   or: python demo_analysis_en.py <parquet_or_arrow_dataset_dir> [min_donations] [timestamp]")
         print("   or: python demo_analysis_en.py <transactions.csv> <contacts.csv> [min_donations] [timestamp]")
         sys.exit(1)
     
@@ -374,7 +409,7 @@ def main():
         # Timestamp provided as argument
         timestamp = sys.argv[3]
         output_dir = os.path.join('demo_output', timestamp)
-    elif sys.argv[1].endswith('.zip'):
+    elif sys.argv[1].endswith('.zip') or os.path.isdir(sys.argv[1]):
         # Try to extract timestamp from zip filename
         zip_path = sys.argv[1]
         # Check if it's a symlink and resolve it
@@ -402,8 +437,12 @@ def main():
     
     # Load data
     print("📥 Loading data...")
+    columnar = os.path.isdir(sys.argv[1])
     if sys.argv[1].endswith('.zip'):
         transactions_df, contacts_df = load_data_from_zip(sys.argv[1])
+    elif columnar:
+        # Column projection: only the transaction columns used by the analysis are read
+        transactions_df, contacts_df = load_data_from_columnar(sys.argv[1], ANALYSIS_TRANSACTION_COLUMNS)
     else:
         transactions_df, contacts_df = load_data_from_csv(sys.argv[1], sys.argv[2])
         min_donations = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3].isdigit() else 3
@@ -435,16 +474,20 @@ def main():
     analysis_df.to_csv(os.path.join(output_dir, 'complex_analysis_data.csv'), index=False)
     print(f"   ✓ Data saved to {output_dir}/complex_analysis_data.csv (original format)")
     
-    # Save raw transactions (one row per transaction) in Salesforce NPC format
-    print("\n💾 Saving raw transactions data...")
-    transactions_sf = export_to_salesforce_format(transactions_df, data_type='transactions')
-    transactions_sf.to_csv(os.path.join(output_dir, 'Gift_Transaction_Raw_Salesforce.csv'), index=False)
-    print(f"   ✓ Raw transactions saved to {output_dir}/Gift_Transaction_Raw_Salesforce.csv (Salesforce NPC format)")
-    print(f"   • {len(transactions_sf):,} transactions (one row per transaction)")
-    
-    # Also save raw transactions in original format for backward compatibility
-    transactions_df.to_csv(os.path.join(output_dir, 'transactions_raw.csv'), index=False)
-    print(f"   ✓ Raw transactions saved to {output_dir}/transactions_raw.csv (original format)")
+    if columnar:
+        # Only the analysis columns were read; the raw transactions are the columnar dataset itself
+        print(f"\n💾 Raw transactions available in {sys.argv[1]}/transactions (columnar dataset)")
+    else:
+        # Save raw transactions (one row per transaction) in Salesforce NPC format
+        print("\n💾 Saving raw transactions data...")
+        transactions_sf = export_to_salesforce_format(transactions_df, data_type='transactions')
+        transactions_sf.to_csv(os.path.join(output_dir, 'Gift_Transaction_Raw_Salesforce.csv'), index=False)
+        print(f"   ✓ Raw transactions saved to {output_dir}/Gift_Transaction_Raw_Salesforce.csv (Salesforce NPC format)")
+        print(f"   • {len(transactions_sf):,} transactions (one row per transaction)")
+        
+        # Also save raw transactions in original format for backward compatibility
+        transactions_df.to_csv(os.path.join(output_dir, 'transactions_raw.csv'), index=False)
+        print(f"   ✓ Raw transactions saved to {output_dir}/transactions_raw.csv (original format)")
     
     # Create enriched CONTACT-level dataset for predictive AI
     print("\n💾 Creating CONTACT-level dataset for predictive AI...")
@@ -459,7 +502,7 @@ def main():
     # Calculate days since last donation
     current_date = pd.Timestamp(f'{datetime.now().year}-01-01')
     contact_predictive_df['days_since_last_donation'] = (
-        current_date - pd.to_datetime(contact_predictive_df['last_donation'])
+        current_date - contact_predictive_df['last_donation']
     ).dt.days
     
     # Select relevant columns for predictive modeling
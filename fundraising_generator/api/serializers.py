@@ -1,10 +1,48 @@
+from django.urls import reverse
 from rest_framework import serializers
+from ..services.columnar import COLUMNAR_FORMATS, OUTPUT_FORMATS, columnar_available
 
 class ConfigurationSerializer(serializers.Serializer):
     """Serializer for the fundraising data generation configuration."""
     config_file = serializers.FileField(
         help_text='YAML configuration file containing fundraising generation parameters'
     )
+    seed = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        min_value=0,
+        help_text='Random seed; the same configuration and seed always produce the same dataset (overrides SEED in the YAML)'
+    )
+    output_format = serializers.ChoiceField(
+        choices=OUTPUT_FORMATS,
+        default='csv',
+        help_text='csv: CSV files (Salesforce NPC and original formats); parquet / arrow: columnar files partitioned by year and channel'
+    )
+
+    campaign_table = serializers.BooleanField(
+        default=False,
+        help_text='CSV only: export campaigns as a separate Campaign table, transactions referencing them by campaign_id'
+    )
+    downscale = serializers.BooleanField(
+        default=False,
+        help_text='Scale the contact volumes down to fit the server limits instead of rejecting an oversized request'
+    )
+    preview = serializers.BooleanField(
+        default=False,
+        help_text='Return a small JSON sample (first year, capped donor sample) instead of the ZIP file'
+    )
+    preview_donors = serializers.IntegerField(
+        default=200,
+        min_value=1,
+        max_value=1000,
+        help_text='Preview only: maximum number of donors in the sample'
+    )
+
+    def validate(self, attrs):
+        """Validate that the campaign table is only requested with CSV output."""
+        if attrs.get('campaign_table') and attrs.get('output_format', 'csv') != 'csv':
+            raise serializers.ValidationError({'campaign_table': 'The campaign table is only available with the csv output format'})
+        return attrs
 
     def validate_config_file(self, value):
         """Validate that the uploaded file is a YAML file."""
@@ -12,6 +50,12 @@ class ConfigurationSerializer(serializers.Serializer):
             raise serializers.ValidationError('File must be a YAML file')
         return value
 
+    def validate_output_format(self, value):
+        """Validate that the columnar formats can be written."""
+        if value in COLUMNAR_FORMATS and not columnar_available():
+            raise serializers.ValidationError(f"The '{value}' output format is not available on this server")
+        return value
+
 class TransactionSerializer(serializers.Serializer):
     """Serializer for transaction data output."""
     date = serializers.DateTimeField()
@@ -45,6 +89,52 @@ class ContactSerializer(serializers.Serializer):
     Creation_date = serializers.DateTimeField()
     Creation_year = serializers.IntegerField()
 
+class JobSerializer(serializers.Serializer):
+    """Serializer for the state of an asynchronous generation job."""
+    job_id = serializers.CharField()
+    status = serializers.ChoiceField(choices=['queued', 'running', 'succeeded', 'failed'])
+    stage = serializers.CharField(help_text='queued, transactions, contacts, campaigns, donors or done')
+    progress = serializers.FloatField(help_text='Fraction of the generation completed (0 to 1)')
+    options = serializers.DictField()
+    seed = serializers.CharField(allow_null=True, help_text='Seed actually used, once the job has started')
+    error = serializers.CharField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    def get_status_url(self, job):
+        return self.context['request'].build_absolute_uri(reverse('generation-job', args=[job['job_id']]))
+
+    def get_download_url(self, job):
+        if job['status'] != 'succeeded':
+            return None
+        return self.context['request'].build_absolute_uri(reverse('generation-job-download', args=[job['job_id']]))
+
+class GenerationEstimateSerializer(serializers.Serializer):
+    """Serializer for the estimated cost of a generation."""
+    transactions = serializers.IntegerField()
+    campaign_transactions = serializers.IntegerField()
+    recurring_transactions = serializers.IntegerField()
+    contacts = serializers.IntegerField()
+    allocated_contacts = serializers.IntegerField(help_text='Contact IDs handed out (initial_nb and prospects)')
+    largest_chunk = serializers.IntegerField(help_text='Transactions of the largest year and channel')
+    peak_memory_bytes = serializers.IntegerField()
+    runtime_seconds = serializers.FloatField()
+
+class AdmissionSerializer(serializers.Serializer):
+    """Serializer for the admission decision of a generation request (dry run)."""
+    decision = serializers.ChoiceField(
+        choices=['sync', 'background', 'reject'],
+        help_text='sync: generated in the request; background: queued as a job; reject: over the server limits'
+    )
+    estimate = serializers.SerializerMethodField()
+    scale = serializers.FloatField(help_text='Factor applied to the contact volumes (1.0 if not downscaled)')
+    reason = serializers.CharField(allow_null=True)
+
+    def get_estimate(self, admission) -> dict:
+        return GenerationEstimateSerializer(admission.estimate._asdict()).data
+
 class DatasetResponseSerializer(serializers.Serializer):
     """Serializer for the complete dataset response."""
     transactions = TransactionSerializer(many=True)
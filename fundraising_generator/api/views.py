@@ -3,11 +3,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 import yaml
-from .serializers import ConfigurationSerializer, DatasetResponseSerializer
+from .serializers import AdmissionSerializer, ConfigurationSerializer, DatasetResponseSerializer, JobSerializer
+from ..services.compiled_config import ConfigurationError, validate_config
+from ..services.estimate import BACKGROUND, REJECT, preview_config
 from ..services.generator import FundraisingDataGenerator
-from django.http import HttpResponse
-import io
-import zipfile
+from ..services.workers import get_max_workers
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
 import pandas as pd
 from datetime import datetime
 
@@ -17,6 +19,13 @@ class GenerateDatasetView(APIView):
         description='''
         Generates a synthetic fundraising dataset based on the provided YAML configuration.
         
+        With preview set, a small slice of the dataset (first year, capped donor
+        sample) is returned as JSON instead, in well under a second.
+        
+        The cost of the request is estimated first: requests over the server limits
+        are rejected (413) unless downscale is set, and requests expected to run
+        too long are queued as a background job (202, see the jobs endpoints).
+        
         The configuration file should include:
         * Years of data to generate
         * Initial donor database size
@@ -38,6 +47,7 @@ class GenerateDatasetView(APIView):
                     'content-type': 'application/zip'
                 }
             ),
+            202: JobSerializer,
             400: OpenApiExample(
                 'Validation Error',
                 value={
@@ -45,6 +55,13 @@ class GenerateDatasetView(APIView):
                     'details': 'Specific error message'
                 }
             ),
+            413: OpenApiExample(
+                'Request Too Large',
+                value={
+                    'error': 'Expected 25,000,000 transactions exceeds the limit of 20,000,000',
+                    'estimate': {'transactions': 25000000}
+                }
+            ),
             401: OpenApiExample(
                 'Authentication Error',
                 value={
@@ -67,49 +84,74 @@ class GenerateDatasetView(APIView):
 
         try:
             # Read and parse YAML configuration
-            config_file = serializer.validated_data['config_file']
-            config_data = yaml.safe_load(config_file)
+            config_data = load_request_config(serializer)
 
-            # Generate dataset
-            generator = FundraisingDataGenerator(config_data)
-            transactions, contacts = generator.generate()
+            # Preview: a JSON sample of the first year, small enough for interactive use
+            if serializer.validated_data['preview']:
+                generator = FundraisingDataGenerator(preview_config(config_data))
+                transactions, contacts = generator.preview(serializer.validated_data['preview_donors'])
+                response = Response(DatasetResponseSerializer({
+                    'transactions': frame_records(transactions),
+                    'contacts': frame_records(contacts)
+                }).data)
+                response['X-Dataset-Seed'] = str(generator.entropy)
+                return response
 
-            # Create ZIP file in memory
-            zip_buffer = io.BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # Convert DataFrames to CSV and add to ZIP
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                
-                # Import Salesforce mapper
-                from ..services.salesforce_mapper import export_to_salesforce_format
-                
-                # Add transactions CSV (Salesforce NPC format)
-                transactions_sf = export_to_salesforce_format(transactions, data_type='transactions')
-                transactions_csv = transactions_sf.to_csv(index=False).encode('utf-8')
-                zip_file.writestr(f'Gift_Transaction_{timestamp}.csv', transactions_csv)
-                
-                # Add contacts CSV (Salesforce NPC format)
-                contacts_sf = export_to_salesforce_format(contacts, data_type='contacts')
-                contacts_csv = contacts_sf.to_csv(index=False).encode('utf-8')
-                zip_file.writestr(f'Contact_{timestamp}.csv', contacts_csv)
-                
-                # Also include original format files for backward compatibility
-                transactions_csv_orig = transactions.to_csv(index=False).encode('utf-8')
-                zip_file.writestr(f'transactions_{timestamp}.csv', transactions_csv_orig)
-                
-                contacts_csv_orig = contacts.to_csv(index=False).encode('utf-8')
-                zip_file.writestr(f'contacts_{timestamp}.csv', contacts_csv_orig)
-
-            # Prepare the response
-            zip_buffer.seek(0)
-            response = HttpResponse(
-                zip_buffer.getvalue(),
-                content_type='application/zip'
+            from ..services.cache import archive_entry_suffix, dataset_cache_key, get_dataset_cache
+            from ..services.export import iter_dataset_archive
+            output_format = serializer.validated_data['output_format']
+            campaign_table = serializer.validated_data['campaign_table']
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+            # Admission control, from the estimated cost of the request
+            admission = admit_request(config_data, serializer)
+            if admission.decision == REJECT:
+                return rejection_response(admission)
+            config_data = admission.config
+
+            # Seeded requests are deterministic: serve a previous archive if there is one
+            cache = get_dataset_cache()
+            cache_key = dataset_cache_key(config_data, output_format, campaign_table)
+            cached_file = cache.open(cache_key)
+            if cached_file is not None:
+                response = FileResponse(
+                    cached_file,
+                    as_attachment=True,
+                    filename=f'fundraising_data_{timestamp}.zip',
+                    content_type='application/zip'
+                )
+                response['X-Dataset-Seed'] = str(config_data['SEED'])
+                response['X-Dataset-Scale'] = str(admission.scale)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            # Too long to hold a web worker: run it as a job instead
+            if admission.decision == BACKGROUND:
+                from ..services.jobs import get_job_queue
+                job = get_job_queue().submit(config_data, job_options(serializer, admission))
+                response = Response(
+                    JobSerializer(job, context={'request': request}).data,
+                    status=status.HTTP_202_ACCEPTED
+                )
+                response['Location'] = reverse('generation-job', args=[job['job_id']])
+                return response
+
+            # Generate dataset, streamed: each chunk is compressed and sent as soon as it is produced
+            generator = FundraisingDataGenerator(config_data)
+            content = iter_dataset_archive(
+                generator.iter_generate(),
+                archive_entry_suffix(config_data, timestamp),
+                output_format,
+                campaign_table
             )
+            response = StreamingHttpResponse(cache.store_stream(cache_key, content), content_type='application/zip')
             
             # Set filename for download
             response['Content-Disposition'] = f'attachment; filename=fundraising_data_{timestamp}.zip'
+            # Seed actually used, so the same dataset can be requested again
+            response['X-Dataset-Seed'] = str(generator.entropy)
+            response['X-Dataset-Scale'] = str(admission.scale)
+            response['X-Cache'] = 'MISS'
             
             return response
 
@@ -121,10 +163,217 @@ class GenerateDatasetView(APIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except ConfigurationError as e:
+            return Response(
+                {
+                    'error': 'Invalid configuration',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {
                     'error': str(e)
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+def load_request_config(serializer):
+    """Parse and validate the uploaded YAML configuration and apply the request seed, if any."""
+    config_data = yaml.safe_load(serializer.validated_data['config_file'])
+    if not isinstance(config_data, dict):
+        raise yaml.YAMLError('The configuration must be a YAML mapping')
+    validate_config(config_data, max_workers=get_max_workers())
+    if serializer.validated_data.get('seed') is not None:
+        config_data['SEED'] = serializer.validated_data['seed']
+    return config_data
+
+
+def frame_records(frame):
+    """Rows of a DataFrame as dicts, missing values as None."""
+    frame = frame.copy()
+    for column in frame.columns[frame.dtypes == 'float32']:
+        # Shortest repr, as in the CSV files, rather than the widened float32 value
+        frame[column] = frame[column].astype(str).astype('float64')
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def admit_request(config_data, serializer):
+    """Estimate the cost of a generation request and decide how to run it."""
+    from ..services.estimate import admit_generation, get_generation_limits
+    return admit_generation(
+        config_data, downscale=serializer.validated_data['downscale'], **get_generation_limits()
+    )
+
+
+def rejection_response(admission):
+    """413 response for a request over the server limits."""
+    return Response(
+        {
+            'error': admission.reason,
+            'estimate': admission.estimate._asdict()
+        },
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    )
+
+
+def job_options(serializer, admission):
+    """Options recorded with a generation job."""
+    return {
+        'output_format': serializer.validated_data['output_format'],
+        'campaign_table': serializer.validated_data['campaign_table'],
+        'seed': serializer.validated_data.get('seed'),
+        'scale': admission.scale,
+    }
+
+
+class GenerationEstimateView(APIView):
+    @extend_schema(
+        summary='Estimate a Generation (Dry Run)',
+        description='''
+        Estimates the number of transactions, contacts and recurring donations, the
+        peak memory and the runtime of a generation request, without running it,
+        and tells how the generation endpoint would handle it.
+        
+        Accepts the same parameters as the generation endpoint.
+        ''',
+        request=ConfigurationSerializer,
+        responses={200: AdmissionSerializer},
+        methods=['POST'],
+        tags=['Dataset Generation']
+    )
+    def post(self, request):
+        """Estimate the cost of a dataset generation."""
+        serializer = ConfigurationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            config_data = load_request_config(serializer)
+        except yaml.YAMLError as e:
+            return Response(
+                {
+                    'error': 'Invalid YAML file format',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except ConfigurationError as e:
+            return Response(
+                {
+                    'error': 'Invalid configuration',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(AdmissionSerializer(admit_request(config_data, serializer)).data)
+
+
+class GenerationJobListView(APIView):
+    @extend_schema(
+        summary='Start a Generation Job',
+        description='''
+        Queues the generation of a dataset and returns immediately with a job ID.
+        
+        Accepts the same parameters as the synchronous generation endpoint. Poll
+        the job status URL, then download the ZIP file once the job succeeded.
+        ''',
+        request=ConfigurationSerializer,
+        responses={202: JobSerializer},
+        methods=['POST'],
+        tags=['Dataset Generation']
+    )
+    def post(self, request):
+        """Queue a dataset generation."""
+        from ..services.jobs import get_job_queue
+
+        serializer = ConfigurationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            config_data = load_request_config(serializer)
+        except yaml.YAMLError as e:
+            return Response(
+                {
+                    'error': 'Invalid YAML file format',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except ConfigurationError as e:
+            return Response(
+                {
+                    'error': 'Invalid configuration',
+                    'details': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Jobs do not hold a web worker, only the hard limits apply
+        admission = admit_request(config_data, serializer)
+        if admission.decision == REJECT:
+            return rejection_response(admission)
+
+        job = get_job_queue().submit(admission.config, job_options(serializer, admission))
+        return Response(
+            JobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class GenerationJobDetailView(APIView):
+    @extend_schema(
+        summary='Generation Job Status',
+        description='Returns the status and progress of a generation job.',
+        responses={200: JobSerializer},
+        tags=['Dataset Generation']
+    )
+    def get(self, request, job_id):
+        """Return the state of a job."""
+        from ..services.jobs import get_job_queue
+
+        job = get_job_queue().store.get(job_id)
+        if job is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job, context={'request': request}).data)
+
+
+class GenerationJobDownloadView(APIView):
+    @extend_schema(
+        summary='Download Generation Job Result',
+        description='Downloads the ZIP file of a succeeded generation job.',
+        tags=['Dataset Generation']
+    )
+    def get(self, request, job_id):
+        """Serve the artifact of a succeeded job."""
+        from ..services.jobs import SUCCEEDED, get_job_queue
+
+        queue = get_job_queue()
+        job = queue.store.get(job_id)
+        if job is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if job['status'] != SUCCEEDED:
+            return Response(
+                {
+                    'error': f"Job is {job['status']}",
+                    'details': job['error']
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            artifact = open(queue.store.artifact_path(job_id), 'rb')
+        except FileNotFoundError:
+            # Retention cleanup deleted the job since it was read
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        response = FileResponse(
+            artifact,
+            as_attachment=True,
+            filename=job['filename'],
+            content_type='application/zip'
+        )
+        response['X-Dataset-Seed'] = job['seed']
+        return response
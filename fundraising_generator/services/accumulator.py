@@ -0,0 +1,44 @@
+import pandas as pd
+from typing import List
+
+from .schema import concat_frames
+
+
+class TransactionAccumulator:
+    """Append-only collector of transaction chunks.
+
+    Campaign frames are kept as a list of chunks and concatenated once when
+    the final frame is requested, instead of copying the growing history on
+    every campaign.
+    """
+
+    def __init__(self):
+        self._chunks: List[pd.DataFrame] = []
+        self._num_rows = 0
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        """Add a chunk of transactions.
+
+        Args:
+            chunk (pd.DataFrame): Transactions to append
+        """
+        if chunk is None or chunk.empty:
+            return
+        self._chunks.append(chunk)
+        self._num_rows += len(chunk)
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def to_frame(self) -> pd.DataFrame:
+        """Concatenate all chunks into a single DataFrame.
+
+        Returns:
+            pd.DataFrame: All accumulated transactions
+        """
+        if not self._chunks:
+            return pd.DataFrame()
+        frame = concat_frames(self._chunks)
+        # Keep a single chunk so repeated calls do not concatenate again
+        self._chunks = [frame]
+        return frame
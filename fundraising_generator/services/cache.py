@@ -0,0 +1,215 @@
+"""
+Content-addressed on-disk cache of generated dataset archives.
+
+An archive is keyed by a hash of the normalized configuration (which
+includes the seed) and of the output options. Only seeded generations are
+cached: without a seed every run is meant to be different. The cache is
+capped in size; least recently used archives are evicted first (a hit
+refreshes the modification time of its file). Every producer builds
+cached archives from FundraisingDataGenerator.iter_generate, with entry
+names suffixed by the seed rather than a timestamp, so an archive is the
+same whoever stored it.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+# Bump when the generator output changes, so stale archives are never served
+CACHE_FORMAT_VERSION = 5
+
+# Configuration keys that change how a dataset is generated, not what is generated
+# (archives are identical whatever their value), left out of the cache key.
+# LAZY_RECURRING is not one of them: it changes the row order of the transactions.
+EXECUTION_CONFIG_KEYS = ('WORKERS',)
+
+
+def dataset_cache_key(config_data: dict, output_format: str = 'csv', campaign_table: bool = False) -> Optional[str]:
+    """Hash of a generation request, or None if it is not cacheable (no seed).
+
+    Args:
+        config_data (dict): Generator configuration, SEED included
+        output_format (str): 'csv', 'parquet' or 'arrow'
+        campaign_table (bool): Whether campaigns are exported as a separate table
+
+    Returns:
+        str: Hex digest identifying the generated archive
+    """
+    if config_data.get('SEED') is None:
+        return None
+    normalized = json.dumps(
+        {
+            'version': CACHE_FORMAT_VERSION,
+            'config': {key: value for key, value in config_data.items() if key not in EXECUTION_CONFIG_KEYS},
+            'output_format': output_format,
+            'campaign_table': bool(campaign_table),
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def archive_entry_suffix(config_data: dict, timestamp: str) -> str:
+    """Suffix of the entry names of a generated archive.
+
+    Args:
+        config_data (dict): Generator configuration
+        timestamp (str): Generation timestamp, used when the archive is not cacheable
+
+    Returns:
+        str: 'seed<SEED>' for seeded (cacheable) archives, the timestamp otherwise
+    """
+    if config_data.get('SEED') is None:
+        return timestamp
+    return f"seed{config_data['SEED']}"
+
+
+class DatasetCache:
+    """Size-capped LRU store of generated archives, one file per key."""
+
+    def __init__(self, root: str, max_bytes: int):
+        """Create the cache.
+
+        Args:
+            root (str): Cache directory
+            max_bytes (int): Maximum total size of the cached archives (0 disables the cache)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f'{key}.zip')
+
+    def open(self, key: Optional[str]) -> Optional[BinaryIO]:
+        """Open a cached archive for reading and mark it as recently used.
+
+        The archive stays readable through the returned file even if another
+        process evicts it afterwards.
+
+        Args:
+            key (str): Cache key (None is never cached)
+
+        Returns:
+            BinaryIO: Open archive, or None on a miss
+        """
+        if not self.enabled or key is None:
+            return None
+        path = self.path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted in between: the open file is still complete
+            pass
+        return f
+
+    def store_stream(self, key: Optional[str], content: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass an archive stream through, storing it once fully produced.
+
+        The archive is only committed if the stream runs to the end, so an
+        interrupted download or a failed generation never gets cached.
+
+        Args:
+            key (str): Cache key (None passes the stream through untouched)
+            content (Iterable[bytes]): Archive pieces
+
+        Yields:
+            bytes: The same pieces
+        """
+        if not self.enabled or key is None:
+            yield from content
+            return
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path(key)), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for data in content:
+                    f.write(data)
+                    yield data
+            os.replace(tmp_path, self.path(key))
+            self.evict()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store_file(self, key: Optional[str], source_path: str) -> None:
+        """Copy a finished archive into the cache.
+
+        Args:
+            key (str): Cache key (None is never cached)
+            source_path (str): Archive to copy
+        """
+        if not self.enabled or key is None:
+            return
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path(key)), suffix='.part')
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used archives until the cache fits its size cap."""
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith('.zip'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already evicted by another process
+                pass
+            total -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """Process-wide dataset cache configured from the Django settings
+    (DATASET_CACHE_DIR, DATASET_CACHE_MAX_BYTES)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from django.conf import settings
+            # The demo scripts run with bare settings, hence the environment fallbacks
+            project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            root = getattr(settings, 'DATASET_CACHE_DIR', None) or os.environ.get(
+                'DATASET_CACHE_DIR', os.path.join(project_dir, 'dataset_cache')
+            )
+            max_bytes = getattr(settings, 'DATASET_CACHE_MAX_BYTES', None)
+            if max_bytes is None:
+                max_bytes = os.environ.get('DATASET_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+            _cache = DatasetCache(str(root), int(max_bytes))
+        return _cache
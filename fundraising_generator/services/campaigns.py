@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .generator import GenerationChunk
+from .schema import TRANSACTION_SCHEMA, apply_schema
+
+# Transaction columns that are constant per campaign and move to the Campaign table
+CAMPAIGN_COLUMNS = [
+    'campaign_name',
+    'campaign_type',
+    'channel',
+    'campaign_start',
+    'campaign_end',
+    'cost',
+    'reactivity',
+]
+
+
+class CampaignCatalog:
+    """Campaign dimension built incrementally from transaction chunks.
+
+    Each distinct combination of the campaign columns gets an integer
+    campaign ID (from 1, in order of first appearance). Normalized
+    transactions keep only that ID instead of repeating the campaign columns
+    on every row.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple, int] = {}
+        self._rows: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def normalize(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """Replace the campaign columns of a chunk with a campaign_id column.
+
+        Args:
+            transactions (pd.DataFrame): Transactions chunk with the campaign columns
+
+        Returns:
+            pd.DataFrame: The chunk with campaign_id (after date) instead of the campaign columns
+        """
+        if transactions.empty:
+            normalized = transactions.drop(columns=CAMPAIGN_COLUMNS, errors='ignore')
+            if len(transactions.columns):
+                normalized.insert(1, 'campaign_id', np.empty(0, dtype=np.int32))
+            return normalized
+
+        grouped = transactions.groupby(CAMPAIGN_COLUMNS, sort=False, observed=True, dropna=False)
+        # Groups are numbered in order of first appearance, like the rows of head(1)
+        codes = grouped.ngroup().to_numpy()
+        campaign_ids = np.array([
+            self._campaign_id(key)
+            for key in grouped.head(1)[CAMPAIGN_COLUMNS].itertuples(index=False, name=None)
+        ], dtype=np.int32)
+
+        normalized = transactions.drop(columns=CAMPAIGN_COLUMNS)
+        normalized.insert(1, 'campaign_id', campaign_ids[codes])
+        return normalized
+
+    def _campaign_id(self, key: Tuple) -> int:
+        campaign_id = self._ids.get(key)
+        if campaign_id is None:
+            self._rows.append(key)
+            campaign_id = self._ids[key] = len(self._rows)
+        return campaign_id
+
+    def to_frame(self) -> pd.DataFrame:
+        """Campaign table, one row per campaign.
+
+        Returns:
+            pd.DataFrame: campaign_id followed by the campaign columns
+        """
+        campaigns = pd.DataFrame(self._rows, columns=CAMPAIGN_COLUMNS)
+        campaigns.insert(0, 'campaign_id', np.arange(1, len(campaigns) + 1, dtype=np.int32))
+        return apply_schema(campaigns, TRANSACTION_SCHEMA)
+
+
+def normalize_campaigns(chunks: Iterable[GenerationChunk]) -> Iterator[GenerationChunk]:
+    """Normalize the transactions chunks of a generation and append the Campaign table.
+
+    Args:
+        chunks (Iterable[GenerationChunk]): Chunks as yielded by FundraisingDataGenerator.iter_generate
+
+    Yields:
+        GenerationChunk: The chunks with normalized transactions, then one 'campaigns' chunk
+    """
+    catalog = CampaignCatalog()
+    for chunk in chunks:
+        if chunk.kind == 'transactions':
+            chunk = chunk._replace(frame=catalog.normalize(chunk.frame))
+        yield chunk
+    yield GenerationChunk('campaigns', None, None, catalog.to_frame())
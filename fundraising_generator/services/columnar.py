@@ -0,0 +1,178 @@
+"""
+Columnar (Parquet / Arrow IPC) output of generated datasets.
+
+Transactions are partitioned Hive-style by year and channel
+(``transactions/year=2021/channel=Online/part-00000.parquet``), contacts are
+written as plain parts (``contacts/part-00000.parquet``). Low-cardinality
+string columns are dictionary-encoded. pyarrow is an optional dependency,
+only needed when a columnar format is requested.
+"""
+import io
+import os
+import zipfile
+from collections import defaultdict
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    # Columnar output disabled if pyarrow is not available
+    pa = None
+
+from .export import ZipStream
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+OUTPUT_FORMATS = ('csv',) + COLUMNAR_FORMATS
+
+# File extension and pyarrow.dataset format name of each columnar format
+FORMAT_EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+DATASET_FORMATS = {'parquet': 'parquet', 'arrow': 'ipc'}
+
+DICTIONARY_COLUMNS = ('channel', 'campaign_name', 'payment_method', 'campaign_type')
+
+
+def columnar_available():
+    """Whether pyarrow is installed, i.e. columnar formats can be written."""
+    return pa is not None
+
+
+def _require_pyarrow(output_format):
+    if pa is None:
+        raise ImportError(f"The '{output_format}' output format requires pyarrow (pip install pyarrow)")
+
+
+def frame_to_table(frame):
+    """
+    Convert a chunk to an Arrow table with dictionary-encoded string columns.
+
+    Args:
+        frame: pandas DataFrame of transactions or contacts
+
+    Returns:
+        pyarrow.Table
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for name in DICTIONARY_COLUMNS:
+        index = table.schema.get_field_index(name)
+        if index >= 0 and not pa.types.is_dictionary(table.schema.field(index).type):
+            table = table.set_column(index, name, table.column(index).dictionary_encode())
+    return table
+
+
+def table_to_bytes(table, output_format):
+    """Serialize an Arrow table as a Parquet or Arrow IPC file."""
+    buffer = io.BytesIO()
+    if output_format == 'parquet':
+        pq.write_table(table, buffer)
+    else:
+        feather.write_feather(table, buffer)
+    return buffer.getvalue()
+
+
+def iter_columnar_parts(chunks, output_format):
+    """
+    Split generated chunks into the files of a partitioned columnar dataset.
+
+    Transactions chunks are split by transaction year (recurring donations
+    run into later years) and channel; the partition values are carried by
+    the paths, not by the files.
+
+    Args:
+        chunks: GenerationChunk iterable, as yielded by FundraisingDataGenerator.iter_generate
+        output_format: 'parquet' or 'arrow'
+
+    Yields:
+        (path, bytes): Relative path of each file and its content
+    """
+    _require_pyarrow(output_format)
+    extension = FORMAT_EXTENSIONS[output_format]
+    part_numbers = defaultdict(int)
+
+    def part_path(directory):
+        number = part_numbers[directory]
+        part_numbers[directory] += 1
+        return f'{directory}/part-{number:05d}.{extension}'
+
+    for chunk in chunks:
+        frame = chunk.frame
+        if frame.empty:
+            continue
+        if chunk.kind == 'transactions':
+            years = frame['date'].dt.year
+            for (year, channel), partition in frame.groupby([years, 'channel'], sort=True, observed=True):
+                # Segments are URI-encoded, as expected by pyarrow's Hive partitioning
+                directory = f'transactions/year={year}/channel={quote(str(channel), safe="")}'
+                table = frame_to_table(partition.drop(columns='channel'))
+                yield part_path(directory), table_to_bytes(table, output_format)
+        else:
+            yield part_path(chunk.kind), table_to_bytes(frame_to_table(frame), output_format)
+
+
+def write_columnar_dataset(chunks, root, output_format):
+    """
+    Write a partitioned columnar dataset to a directory.
+
+    Args:
+        chunks: GenerationChunk iterable
+        root: Output directory (created if needed)
+        output_format: 'parquet' or 'arrow'
+
+    Returns:
+        Number of files written
+    """
+    count = 0
+    for path, data in iter_columnar_parts(chunks, output_format):
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        count += 1
+    return count
+
+
+def iter_columnar_zip(chunks, output_format):
+    """
+    Stream a partitioned columnar dataset as a ZIP archive.
+
+    The files are stored without ZIP compression: Parquet and Arrow IPC
+    files are compressed already.
+
+    Args:
+        chunks: GenerationChunk iterable
+        output_format: 'parquet' or 'arrow'
+
+    Yields:
+        bytes: Successive pieces of the archive
+    """
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zip_file:
+        for path, data in iter_columnar_parts(chunks, output_format):
+            zip_file.writestr(path, data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def read_columnar_dataset(path, output_format, columns=None):
+    """
+    Read one table of a columnar dataset, loading only the requested columns.
+
+    Args:
+        path: Directory of the table (e.g. <root>/transactions)
+        output_format: 'parquet' or 'arrow'
+        columns: Columns to load (partition columns included), None for all
+
+    Returns:
+        pandas DataFrame
+    """
+    _require_pyarrow(output_format)
+    dataset = ds.dataset(
+        path,
+        format=DATASET_FORMATS[output_format],
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True)
+    )
+    if columns is not None:
+        columns = [column for column in columns if column in dataset.schema.names]
+    return dataset.to_table(columns=columns).to_pandas()
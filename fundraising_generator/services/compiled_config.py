@@ -0,0 +1,311 @@
+"""
+Validated, precompiled view of the channel, theme and salutation configuration.
+
+The YAML configuration holds weights as lists and mappings. Sampling from them
+directly means re-zipping and re-normalizing the weights on every draw; here
+they are compiled once, when the generator loads its configuration, into
+read-only cumulative-weight tables. A malformed configuration is rejected at
+that point with a ConfigurationError naming the offending key, instead of
+failing halfway through a generation.
+"""
+import numbers
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+DISTRIBUTIONS = ('regular', 'exponential', 'inverted_exponential')
+CAMPAIGN_TYPES = ('prospecting', 'retention')
+# DECILE_MODE values (see deciles.py)
+DECILE_MODES = ('campaign', 'config', 'sketch')
+# Wealth categories of the amount deciles: 1-4 low, 5-7 medium, 8-10 high
+WEALTH_CATEGORIES = ('low', 'medium', 'high')
+# Largest CONTACT_POOL_SIZE: every pooled attribute costs that many Faker calls up front
+MAX_CONTACT_POOL_SIZE = 100000
+# Bounds of the generated calendar: YEARS, and four-digit years from FIRST_YEAR to
+# the year of the last monthly gifts (FIRST_YEAR + YEARS)
+MAX_YEARS = 100
+MIN_FIRST_YEAR = 1000
+MAX_LAST_YEAR = 9999
+
+
+class ConfigurationError(ValueError):
+    """A generator configuration that cannot be generated from."""
+
+
+class WeightedChoices(namedtuple('WeightedChoices', ['values', 'cumulative'])):
+    """Values with a normalized cumulative weight table.
+
+    Sampling consumes the random generator exactly like
+    ``rng.choice(values, p=weights / weights.sum())``, so a given seed
+    gives the same draws.
+    """
+
+    def sample(self, rng: np.random.Generator, size: Optional[int] = None):
+        """Draw one value (size None) or an array of values.
+
+        Args:
+            rng (np.random.Generator): Random generator
+            size (int): Number of draws, or None for a single value
+
+        Returns:
+            A value, or an array of values
+        """
+        return self.values[self.cumulative.searchsorted(rng.random(size), side='right')]
+
+
+# One channel of CHANNELS, with its sampling tables
+CompiledChannel = namedtuple('CompiledChannel', [
+    'name',
+    'index',                # Position in CHANNELS, part of the random substream keys
+    'distribution',
+    'duration',
+    'cost_per_reach',
+    'payment',              # WeightedChoices of payment methods
+    'regular_donor_rate',
+    'regular_donor_monthly_avg',
+    'wealth_multipliers',   # Regular donor multipliers indexed by wealth category (low, medium, high)
+    'campaigns',            # ((campaign_type, read-only campaign settings), ...)
+])
+
+# CAMPAIGN_THEMES: weighted themes and the campaign names of each theme
+CampaignThemes = namedtuple('CampaignThemes', ['choices', 'campaign_names'])
+
+# SALUTATIONS: civility and gender arrays, and the weighted salutation indices
+SalutationTable = namedtuple('SalutationTable', ['civilities', 'genders', 'choices'])
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _require_number(value, what: str, minimum: float = 0.0, maximum: float = np.inf):
+    if not _is_number(value) or not np.isfinite(value) or value < minimum:
+        raise ConfigurationError(f'{what} must be a number >= {minimum:g}, got {value!r}')
+    if value > maximum:
+        raise ConfigurationError(f'{what} must be at most {maximum:g}, got {value!r}')
+    return value
+
+
+def _require_integer(value, what: str, minimum: int = 0, maximum: int = 0):
+    """Check an integer setting against its bounds (a maximum of 0 means no upper bound)."""
+    if not isinstance(value, numbers.Integral) or isinstance(value, bool) or value < minimum:
+        raise ConfigurationError(f'{what} must be an integer >= {minimum}, got {value!r}')
+    if maximum and value > maximum:
+        raise ConfigurationError(f'{what} must be at most {maximum}, got {value!r}')
+    return value
+
+
+def weighted_choices(options: Iterable[Tuple], what: str, dtype=None) -> WeightedChoices:
+    """Compile (value, weight) pairs into a cumulative weight table.
+
+    Args:
+        options (Iterable[Tuple]): (value, weight) pairs
+        what (str): Configuration key, for error messages
+        dtype: dtype of the values array (default: inferred by NumPy)
+
+    Returns:
+        WeightedChoices: The compiled table
+
+    Raises:
+        ConfigurationError: If there are no options, or the weights are negative or sum to 0
+    """
+    options = list(options)
+    if not options:
+        raise ConfigurationError(f'{what} must not be empty')
+    for option in options:
+        if not isinstance(option, (list, tuple)) or len(option) != 2:
+            raise ConfigurationError(f'{what} entries must be [value, weight] pairs, got {option!r}')
+        _require_number(option[1], f'{what} weight of {option[0]!r}')
+    values, weights = zip(*options)
+    weights = np.asarray(weights, dtype=float)
+    if weights.sum() <= 0:
+        raise ConfigurationError(f'{what} weights must not all be 0')
+    # Same normalization as Generator.choice with p
+    cumulative = np.cumsum(weights / weights.sum())
+    cumulative /= cumulative[-1]
+    values = np.array(values, dtype=dtype)
+    values.flags.writeable = False
+    cumulative.flags.writeable = False
+    return WeightedChoices(values, cumulative)
+
+
+def _compile_campaigns(name: str, campaigns, channel_names) -> Tuple:
+    if not isinstance(campaigns, Mapping) or not campaigns:
+        raise ConfigurationError(f'CHANNELS.{name}.campaigns must be a non-empty mapping')
+    compiled = []
+    for campaign_type, info in campaigns.items():
+        what = f'CHANNELS.{name}.campaigns.{campaign_type}'
+        if campaign_type not in CAMPAIGN_TYPES:
+            raise ConfigurationError(f'{what}: campaign type must be one of {", ".join(CAMPAIGN_TYPES)}')
+        if not isinstance(info, Mapping):
+            raise ConfigurationError(f'{what} must be a mapping')
+        nb = info.get('nb', 1)
+        if not isinstance(nb, int) or isinstance(nb, bool) or nb < 0:
+            raise ConfigurationError(f'{what}.nb must be a non-negative integer, got {nb!r}')
+        if 'transformation_rate' not in info:
+            raise ConfigurationError(f'{what}.transformation_rate is required')
+        _require_number(info['transformation_rate'], f'{what}.transformation_rate')
+        if campaign_type == 'prospecting':
+            if 'max_reach_contact' not in info:
+                raise ConfigurationError(f'{what}.max_reach_contact is required')
+            _require_number(info['max_reach_contact'], f'{what}.max_reach_contact')
+        for key in ('avg_donation', 'std_deviation'):
+            if key in info:
+                _require_number(info[key], f'{what}.{key}')
+        for entry in info.get('cross_sell', []) or []:
+            if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+                raise ConfigurationError(f'{what}.cross_sell entries must be [channel, percentage] pairs, got {entry!r}')
+            if entry[0] not in channel_names:
+                raise ConfigurationError(f'{what}.cross_sell: unknown channel {entry[0]!r}')
+            _require_number(entry[1], f'{what}.cross_sell percentage of {entry[0]!r}')
+        compiled.append((campaign_type, MappingProxyType(dict(info))))
+    return tuple(compiled)
+
+
+def compile_channels(channels) -> Mapping[str, CompiledChannel]:
+    """Validate CHANNELS and compile each channel.
+
+    Args:
+        channels: CHANNELS configuration
+
+    Returns:
+        Mapping[str, CompiledChannel]: Read-only mapping of the compiled channels, in configuration order
+
+    Raises:
+        ConfigurationError: If a channel is malformed
+    """
+    if not isinstance(channels, Mapping) or not channels:
+        raise ConfigurationError('CHANNELS must be a non-empty mapping of channel names to settings')
+    compiled = {}
+    for index, (name, data) in enumerate(channels.items()):
+        if not isinstance(data, Mapping):
+            raise ConfigurationError(f'CHANNELS.{name} must be a mapping')
+        for key in ('distribution', 'duration', 'payment', 'campaigns'):
+            if key not in data:
+                raise ConfigurationError(f'CHANNELS.{name}.{key} is required')
+        if data['distribution'] not in DISTRIBUTIONS:
+            raise ConfigurationError(
+                f'CHANNELS.{name}.distribution must be one of {", ".join(DISTRIBUTIONS)}, got {data["distribution"]!r}'
+            )
+        _require_integer(data.get('initial_nb', 0), f'CHANNELS.{name}.initial_nb')
+        duration = data['duration']
+        if not isinstance(duration, int) or isinstance(duration, bool) or duration < 0:
+            raise ConfigurationError(f'CHANNELS.{name}.duration must be a non-negative number of days, got {duration!r}')
+        if not isinstance(data['payment'], Mapping):
+            raise ConfigurationError(f'CHANNELS.{name}.payment must be a mapping of payment methods to weights')
+        multipliers = data.get('regular_donor_wealth_multiplier', {}) or {}
+        if not isinstance(multipliers, Mapping) or set(multipliers) - set(WEALTH_CATEGORIES):
+            raise ConfigurationError(
+                f'CHANNELS.{name}.regular_donor_wealth_multiplier keys must be among {", ".join(WEALTH_CATEGORIES)}'
+            )
+        wealth_multipliers = np.array([
+            _require_number(multipliers.get(category, 1.0), f'CHANNELS.{name}.regular_donor_wealth_multiplier.{category}')
+            for category in WEALTH_CATEGORIES
+        ], dtype=float)
+        wealth_multipliers.flags.writeable = False
+
+        compiled[name] = CompiledChannel(
+            name=name,
+            index=index,
+            distribution=data['distribution'],
+            duration=duration,
+            cost_per_reach=_require_number(data.get('cost_per_reach', 0), f'CHANNELS.{name}.cost_per_reach'),
+            # Plain string array, as rng.choice draws from the method names
+            payment=weighted_choices(data['payment'].items(), f'CHANNELS.{name}.payment'),
+            regular_donor_rate=_require_number(
+                data.get('regular_donor_rate', 0.08), f'CHANNELS.{name}.regular_donor_rate'
+            ),
+            regular_donor_monthly_avg=_require_number(
+                data.get('regular_donor_monthly_avg', 30), f'CHANNELS.{name}.regular_donor_monthly_avg'
+            ),
+            wealth_multipliers=wealth_multipliers,
+            campaigns=_compile_campaigns(name, data['campaigns'], channels),
+        )
+    return MappingProxyType(compiled)
+
+
+def compile_campaign_themes(themes) -> CampaignThemes:
+    """Validate CAMPAIGN_THEMES and compile its weights and campaign names.
+
+    Themes are either a list of [theme, weight] pairs or a mapping of themes to
+    their weight and campaign names.
+
+    Args:
+        themes: CAMPAIGN_THEMES configuration
+
+    Returns:
+        CampaignThemes: Weighted themes (None if there are no themes) and the
+        campaign names of each theme (empty when a theme has none)
+    """
+    if not themes:
+        return CampaignThemes(None, MappingProxyType({}))
+    if isinstance(themes, Mapping):
+        options, campaign_names = [], {}
+        for theme, data in themes.items():
+            data = data or {}
+            if not isinstance(data, Mapping):
+                raise ConfigurationError(f'CAMPAIGN_THEMES.{theme} must be a mapping')
+            options.append((theme, data.get('weight', 1.0)))
+            names = data.get('campaign_names', []) or []
+            if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+                raise ConfigurationError(f'CAMPAIGN_THEMES.{theme}.campaign_names must be a list of strings')
+            campaign_names[theme] = tuple(names)
+    else:
+        options, campaign_names = themes, {}
+    choices = weighted_choices(options, 'CAMPAIGN_THEMES', dtype=object)
+    if not all(isinstance(theme, str) for theme in choices.values):
+        raise ConfigurationError('CAMPAIGN_THEMES names must be strings')
+    return CampaignThemes(choices, MappingProxyType(campaign_names))
+
+
+def compile_salutations(salutations) -> SalutationTable:
+    """Validate SALUTATIONS and compile its probabilities.
+
+    Args:
+        salutations: SALUTATIONS configuration (list of civility, gender, probability)
+
+    Returns:
+        SalutationTable: The compiled table
+    """
+    if not isinstance(salutations, list) or not salutations:
+        raise ConfigurationError('SALUTATIONS must be a non-empty list')
+    for salutation in salutations:
+        if not isinstance(salutation, Mapping) or not {'civility', 'gender', 'probability'} <= set(salutation):
+            raise ConfigurationError(f'SALUTATIONS entries need civility, gender and probability, got {salutation!r}')
+    civilities = np.array([sal['civility'] for sal in salutations], dtype=object)
+    genders = np.array([sal['gender'] for sal in salutations], dtype=object)
+    civilities.flags.writeable = False
+    genders.flags.writeable = False
+    choices = weighted_choices(
+        ((index, sal['probability']) for index, sal in enumerate(salutations)), 'SALUTATIONS probability'
+    )
+    return SalutationTable(civilities, genders, choices)
+
+
+def validate_config(config: Mapping, max_workers: int = 0) -> None:
+    """Check that a configuration can be generated from, without generating.
+
+    Args:
+        config (Mapping): Generator configuration (parsed YAML)
+        max_workers (int): Maximum WORKERS allowed (0 for no limit)
+
+    Raises:
+        ConfigurationError: If the configuration is malformed
+    """
+    if not isinstance(config, Mapping):
+        raise ConfigurationError('The configuration must be a mapping')
+    compile_channels(config.get('CHANNELS', {}))
+    compile_campaign_themes(config.get('CAMPAIGN_THEMES', []))
+    compile_salutations(config.get('SALUTATIONS', []))
+    if config.get('DECILE_MODE', 'campaign') not in DECILE_MODES:
+        raise ConfigurationError(f'DECILE_MODE must be one of {", ".join(DECILE_MODES)}, got {config["DECILE_MODE"]!r}')
+    for rate, default in (('GLOBAL_REGULAR_DONOR_RATE', 0.08), ('GLOBAL_CHURN_RATE', 0.99)):
+        _require_number(config.get(rate, default), rate, maximum=1.0)
+    _require_integer(config.get('WORKERS', 1), 'WORKERS', minimum=1, maximum=max_workers)
+    _require_integer(config.get('CONTACT_POOL_SIZE', 2000), 'CONTACT_POOL_SIZE', maximum=MAX_CONTACT_POOL_SIZE)
+    years = _require_integer(config.get('YEARS', 10), 'YEARS', maximum=MAX_YEARS)
+    _require_integer(config.get('FIRST_YEAR', 2014), 'FIRST_YEAR', minimum=MIN_FIRST_YEAR, maximum=MAX_LAST_YEAR - years)
+    if config.get('SEED') is not None:
+        _require_integer(config['SEED'], 'SEED')
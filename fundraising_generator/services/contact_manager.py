@@ -1,17 +1,85 @@
-import random
 import string
+import numpy as np
 from typing import List, Tuple, Dict, Optional
+from .membership import ChannelMembership
+
+# External contact IDs are 8 characters over this alphabet
+CONTACT_ID_ALPHABET = string.ascii_uppercase + string.digits
+CONTACT_ID_LENGTH = 8
+CONTACT_ID_SPACE = len(CONTACT_ID_ALPHABET) ** CONTACT_ID_LENGTH
+# Affine scramble over the ID space so consecutive integers do not look sequential.
+# The multiplier (close to the golden ratio of the space) is coprime with 36, hence invertible.
+_ID_MULTIPLIER = 1743541808669
+_ID_OFFSET = 1234567891
+_ID_INVERSE = pow(_ID_MULTIPLIER, -1, CONTACT_ID_SPACE)
+_ALPHABET_CODES = np.frombuffer(CONTACT_ID_ALPHABET.encode('ascii'), dtype=np.uint8)
+
+
+def _mulmod(values: np.ndarray, factor: int) -> np.ndarray:
+    """Compute (values * factor) mod CONTACT_ID_SPACE without int64 overflow.
+
+    The factor is split in 21-bit halves so every intermediate product fits.
+    """
+    high, low = divmod(factor, 1 << 21)
+    high_part = (values * high % CONTACT_ID_SPACE) * (1 << 21) % CONTACT_ID_SPACE
+    return (high_part + values * low % CONTACT_ID_SPACE) % CONTACT_ID_SPACE
+
+
+def format_contact_ids(contact_ids) -> np.ndarray:
+    """Format integer contact IDs as 8-character external IDs.
+
+    The mapping is a bijection over the 36^8 ID space, so it never collides
+    and can be reversed with parse_contact_ids.
+
+    Args:
+        contact_ids: Integer contact IDs (array-like)
+
+    Returns:
+        np.ndarray: 8-character string IDs
+    """
+    values = (_mulmod(np.asarray(contact_ids, dtype=np.int64), _ID_MULTIPLIER) + _ID_OFFSET) % CONTACT_ID_SPACE
+    codes = np.empty((len(values), CONTACT_ID_LENGTH), dtype=np.uint8)
+    for position in range(CONTACT_ID_LENGTH - 1, -1, -1):
+        values, digits = np.divmod(values, len(CONTACT_ID_ALPHABET))
+        codes[:, position] = _ALPHABET_CODES[digits]
+    return codes.view(f'S{CONTACT_ID_LENGTH}').ravel().astype(str).astype(object)
+
+
+def parse_contact_ids(external_ids) -> np.ndarray:
+    """Convert 8-character external IDs back to integer contact IDs.
+
+    Args:
+        external_ids: IDs produced by format_contact_ids (array-like)
+
+    Returns:
+        np.ndarray: Integer contact IDs
+    """
+    codes = np.asarray(external_ids, dtype=f'S{CONTACT_ID_LENGTH}').view(np.uint8)
+    lookup = np.zeros(256, dtype=np.int64)
+    lookup[_ALPHABET_CODES] = np.arange(len(CONTACT_ID_ALPHABET))
+    values = np.zeros(len(codes) // CONTACT_ID_LENGTH, dtype=np.int64)
+    for digits in lookup[codes.reshape(-1, CONTACT_ID_LENGTH)].T:
+        values = values * len(CONTACT_ID_ALPHABET) + digits
+    # Undo the affine scramble
+    return _mulmod((values - _ID_OFFSET) % CONTACT_ID_SPACE, _ID_INVERSE)
+
 
 class ContactManager:
-    def __init__(self, channels: dict):
+    def __init__(self, channels: dict, rng: Optional[np.random.Generator] = None):
         """Initialize the contact manager with channel configurations.
+
+        Contacts are dense integer IDs allocated from a counter, so they never
+        collide; format_contact_ids turns them into external IDs at export.
         
         Args:
             channels (dict): Channel configurations from YAML
+            rng (np.random.Generator): Random generator for contact selection (a fresh one if omitted)
         """
-        self.existing_contacts: Dict[str, List[str]] = {}
-        self.unused_contacts: Dict[str, List[str]] = {}
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.membership = ChannelMembership(channels.keys(), rng=self.rng)
+        self.unused_contacts: Dict[str, np.ndarray] = {}
         self.channels = channels
+        self.next_contact_id = 0
         self._initialize_contacts()
 
     def _initialize_contacts(self) -> None:
@@ -19,35 +87,39 @@ class ContactManager:
         import sys
         for channel, info in self.channels.items():
             initial_nb = info.get('initial_nb', 0)
-            initial_contacts = [self._generate_unique_contact_id() for _ in range(initial_nb)]
+            initial_contacts = self._allocate_contact_ids(initial_nb)
             
-            self.existing_contacts[channel] = initial_contacts
+            self.membership.add(channel, initial_contacts)
             self.unused_contacts[channel] = initial_contacts.copy()
             
             print(f'Initialized {len(initial_contacts)} contacts for channel {channel}.')
             sys.stdout.flush()
 
-    def _generate_unique_contact_id(self) -> str:
-        """Generate a unique contact ID.
+    def _allocate_contact_ids(self, num_required: int) -> np.ndarray:
+        """Allocate a block of new, unique contact IDs.
         
+        Args:
+            num_required (int): Number of IDs to allocate
+            
         Returns:
-            str: A unique 8-character ID
+            np.ndarray: Consecutive integer IDs never handed out before
         """
-        characters = string.ascii_uppercase + string.digits
-        return ''.join(random.choices(characters, k=8))
+        contact_ids = np.arange(self.next_contact_id, self.next_contact_id + num_required, dtype=np.int64)
+        self.next_contact_id += num_required
+        return contact_ids
 
-    def get_contacts(self, channel: str) -> List[str]:
+    def get_contacts(self, channel: str) -> np.ndarray:
         """Get all contacts from a given channel.
         
         Args:
             channel (str): The channel name
             
         Returns:
-            List[str]: List of contact IDs
+            np.ndarray: Contact IDs
         """
-        return self.existing_contacts.get(channel, [])
+        return self.membership.members(channel)
 
-    def generate_contacts_on_the_go(self, channel: str, num_required: int) -> List[str]:
+    def generate_contacts_on_the_go(self, channel: str, num_required: int) -> np.ndarray:
         """Generate new contacts dynamically for prospecting.
         
         Args:
@@ -55,13 +127,13 @@ class ContactManager:
             num_required (int): Number of contacts needed
             
         Returns:
-            List[str]: List of newly generated contact IDs
+            np.ndarray: Newly generated contact IDs
         """
-        new_contacts = [self._generate_unique_contact_id() for _ in range(num_required)]
-        self.existing_contacts[channel].extend(new_contacts)
+        new_contacts = self._allocate_contact_ids(num_required)
+        self.membership.add(channel, new_contacts)
         return new_contacts
 
-    def get_contacts_from_cross_sell(self, channel: str, cross_sell_info: List[Tuple[str, float]]) -> List[str]:
+    def get_contacts_from_cross_sell(self, channel: str, cross_sell_info: List[Tuple[str, float]]) -> np.ndarray:
         """Get contacts from cross-sell channels based on specified percentages.
         
         Args:
@@ -69,29 +141,29 @@ class ContactManager:
             cross_sell_info (List[Tuple[str, float]]): List of (channel, percentage) tuples
             
         Returns:
-            List[str]: List of cross-sell contact IDs
+            np.ndarray: Deduplicated cross-sell contact IDs, in random order
         """
         cross_sell_contacts = []
         
         for cross_channel, percentage in cross_sell_info:
-            contacts_in_cross_channel = self.get_contacts(cross_channel)
-            cross_channel_num_required = int(len(contacts_in_cross_channel) * (percentage / 100))
+            cross_channel_num_required = int(self.membership.size(cross_channel) * (percentage / 100))
             
             if cross_channel_num_required > 0:
-                selected_contacts = random.sample(
-                    contacts_in_cross_channel, 
-                    cross_channel_num_required
+                cross_sell_contacts.append(
+                    self.membership.sample(cross_channel, cross_channel_num_required)
                 )
-                cross_sell_contacts.extend(selected_contacts)
 
-        return list(set(cross_sell_contacts))
+        if not cross_sell_contacts:
+            return np.empty(0, dtype=np.int64)
+        # Deduplicate, then shuffle so callers can take any prefix as a random subset
+        return self.rng.permutation(np.unique(np.concatenate(cross_sell_contacts)))
 
     def get_or_create_contacts(
         self, 
         campaign_type: str, 
         channel: str, 
         randomness: float
-    ) -> Tuple[int, int, List[str]]:
+    ) -> Tuple[int, int, np.ndarray]:
         """Get or create contacts based on campaign type and apply transformation rate.
         
         Args:
@@ -100,7 +172,7 @@ class ContactManager:
             randomness (float): Random factor to apply to transformation rate
             
         Returns:
-            Tuple[int, int, List[str]]: (number reached, number sent, contact IDs)
+            Tuple[int, int, np.ndarray]: (number reached, number sent, contact IDs)
         """
         channel_info = self.channels[channel]
 
@@ -139,11 +211,9 @@ class ContactManager:
             sys.stdout.flush()
             
             contact_ids = contacts_ids[:nb_sent]
-            self.existing_contacts[channel] = list(
-                set(self.existing_contacts[channel]).union(set(contact_ids[:nb_sent]))
-            )
+            self.membership.add(channel, contact_ids)
             return nb_reach, nb_sent, contact_ids
 
         else:
             print("Unknown campaign type. Please use 'prospecting' or 'retention'.")
-            return 0, 0, []
+            return 0, 0, np.empty(0, dtype=np.int64)
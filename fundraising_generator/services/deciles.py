@@ -0,0 +1,231 @@
+"""
+Amount deciles of the transactions.
+
+The decile of a gift feeds the regular donor probability and, through the
+highest decile of each donor, the contact wealth attributes. It is computed
+in one of three modes (DECILE_MODE in the configuration):
+
+- ``campaign`` (default): deciles within each campaign, and within each batch
+  of monthly donations, as ``pd.qcut`` computes them. Decile 10 means a large
+  gift for that campaign.
+- ``config``: global cut points, the deciles of the campaign gift amounts
+  expected from the configuration (the mix of the channel and campaign type
+  distributions, weighted by their expected volumes). Known before generating.
+- ``sketch``: global cut points, from a mergeable quantile sketch of the
+  campaign gifts generated so far (the campaign being assigned included).
+  Campaigns are merged in their planning order, so the cut points do not
+  depend on the number of workers.
+
+With global cut points, assigning deciles is a search among 9 cut points per
+gift, with no sort. Monthly donations are placed against the cut points in
+force when their donor converted, recorded with the schedule, so they get the
+same deciles whether they are expanded eagerly, lazily or in another process.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+from scipy.special import ndtr
+
+from .compiled_config import DECILE_MODES, ConfigurationError
+from .estimate import expected_campaign_amounts
+
+# Decile levels, as pd.qcut computes them (levels not representable in base 2 are rounded up)
+DECILE_LEVELS = np.linspace(0, 1, 11)
+np.putmask(DECILE_LEVELS, 10 * DECILE_LEVELS != np.arange(11), np.nextafter(DECILE_LEVELS, 1))
+
+# Inner cut points of global deciles: the 10% to 90% quantiles
+CUT_LEVELS = np.arange(1, 10) / 10
+
+# Relative accuracy of the quantile sketch
+SKETCH_ACCURACY = 0.005
+
+
+def amount_deciles(amounts: np.ndarray) -> np.ndarray:
+    """Decile (1 to 10) of each amount within its batch.
+
+    Same result as ``pd.qcut(amounts, 10, labels=False, duplicates='drop') + 1``
+    (equal quantiles merge, so fewer than 10 deciles may be used), computed
+    directly on the array.
+
+    Args:
+        amounts (np.ndarray): Non-empty array of amounts
+
+    Returns:
+        np.ndarray: Integer deciles, or NaN everywhere if all amounts are equal
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    edges = np.unique(np.quantile(amounts, DECILE_LEVELS))
+    if len(edges) < 2:
+        return np.full(len(amounts), np.nan)
+    # Right-closed bins, the lowest one including its left edge
+    return np.clip(np.searchsorted(edges, amounts, side='left'), 1, len(edges) - 1)
+
+
+def assign_deciles(amounts: np.ndarray, cut_points: Optional[np.ndarray]) -> np.ndarray:
+    """Decile (1 to 10) of each amount against global cut points.
+
+    Args:
+        amounts (np.ndarray): Amounts
+        cut_points (np.ndarray): The 9 inner cut points (10% to 90% quantiles), or
+            None to fall back to deciles within the batch
+
+    Returns:
+        np.ndarray: Integer deciles (an amount equal to a cut point falls in the lower decile)
+    """
+    if cut_points is None:
+        return amount_deciles(amounts)
+    return np.searchsorted(cut_points, np.asarray(amounts, dtype=float), side='left') + 1
+
+
+class AmountSketch:
+    """Mergeable quantile sketch of amounts of at least 1.
+
+    Amounts are counted in logarithmic buckets (bucket i covers
+    (gamma^(i-1), gamma^i]), so every quantile is known within
+    SKETCH_ACCURACY relative error, in constant memory. Sketches built on
+    separate chunks merge exactly by adding their counts.
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, amounts: np.ndarray) -> None:
+        """Count a batch of amounts (amounts below 1 are counted as 1).
+
+        Args:
+            amounts (np.ndarray): Amounts
+        """
+        amounts = np.maximum(np.asarray(amounts, dtype=float), 1.0)
+        buckets = np.ceil(np.log(amounts) / self._log_gamma).astype(np.int64)
+        self._add_counts(np.bincount(buckets))
+
+    def merge(self, other: 'AmountSketch') -> None:
+        """Add the counts of another sketch of the same accuracy.
+
+        Args:
+            other (AmountSketch): Sketch to merge into this one
+        """
+        if other.accuracy != self.accuracy:
+            raise ValueError('Only sketches of the same accuracy can be merged')
+        self._add_counts(other.counts)
+
+    def _add_counts(self, counts: np.ndarray) -> None:
+        if len(counts) > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(len(counts) - len(self.counts), dtype=np.int64)])
+        self.counts[:len(counts)] += counts
+
+    def quantiles(self, levels: np.ndarray) -> np.ndarray:
+        """Estimate quantiles of the counted amounts.
+
+        Args:
+            levels (np.ndarray): Quantile levels, between 0 and 1
+
+        Returns:
+            np.ndarray: Estimated quantiles (empty sketch: NaN)
+        """
+        total = len(self)
+        if total == 0:
+            return np.full(len(levels), np.nan)
+        cumulative = np.cumsum(self.counts)
+        buckets = np.searchsorted(cumulative, np.asarray(levels) * (total - 1), side='right')
+        # Middle of the bucket, in relative terms
+        return np.maximum(1.0, 2 * self.gamma ** buckets / (self.gamma + 1))
+
+    def cut_points(self) -> Optional[np.ndarray]:
+        """Decile cut points of the counted amounts (None while empty)."""
+        if not len(self):
+            return None
+        return self.quantiles(CUT_LEVELS)
+
+
+def config_cut_points(config) -> Optional[np.ndarray]:
+    """Decile cut points of the campaign gifts expected from a configuration.
+
+    Solves the quantiles of the expected mix of floored normal distributions
+    (see estimate.expected_campaign_amounts) by bisection.
+
+    Args:
+        config: Generator configuration
+
+    Returns:
+        np.ndarray: The 9 cut points, or None if no campaign gift is expected
+    """
+    mix = expected_campaign_amounts(config)
+    if not mix:
+        return None
+    weights, means, deviations = (np.asarray(values, dtype=float) for values in zip(*mix))
+    weights = weights / weights.sum()
+    spread = deviations > 0
+    safe_deviations = np.where(spread, deviations, 1.0)
+
+    def cdf(x):
+        # Gifts are floored at 1, so only the distribution above 1 matters
+        x = x[:, None]
+        below = np.where(spread, ndtr((x - means) / safe_deviations), x >= means)
+        return (below * weights).sum(axis=1)
+
+    low = np.ones(len(CUT_LEVELS))
+    high = np.full(len(CUT_LEVELS), max(2.0, float((means + 10 * deviations).max())))
+    for _ in range(60):
+        middle = (low + high) / 2
+        below = cdf(middle) >= CUT_LEVELS
+        high = np.where(below, middle, high)
+        low = np.where(below, low, middle)
+    # Levels reached at the floor of 1 stay at 1
+    return np.where(cdf(np.ones(len(CUT_LEVELS))) >= CUT_LEVELS, 1.0, high.round(2))
+
+
+class DecileAssigner:
+    """Assigns the amount deciles of a generation in the configured mode."""
+
+    def __init__(self, mode: str = 'campaign', config_cut_points: Optional[np.ndarray] = None):
+        """Create the assigner.
+
+        Args:
+            mode (str): 'campaign', 'config' or 'sketch'
+            config_cut_points (np.ndarray): Cut points of the 'config' mode
+        """
+        if mode not in DECILE_MODES:
+            raise ConfigurationError(f'DECILE_MODE must be one of {", ".join(DECILE_MODES)}, got {mode!r}')
+        self.mode = mode
+        self.config_cut_points = config_cut_points
+        self.sketch = AmountSketch()
+
+    @classmethod
+    def from_config(cls, config) -> 'DecileAssigner':
+        """Assigner of the DECILE_MODE of a configuration."""
+        mode = config.get('DECILE_MODE', 'campaign')
+        return cls(mode, config_cut_points(config) if mode == 'config' else None)
+
+    def reset(self) -> None:
+        """Forget the gifts of a previous generation."""
+        self.sketch = AmountSketch()
+
+    @property
+    def cut_points(self) -> Optional[np.ndarray]:
+        """Global cut points currently in force (None: deciles within each batch)."""
+        if self.mode == 'config':
+            return self.config_cut_points
+        if self.mode == 'sketch':
+            return self.sketch.cut_points()
+        return None
+
+    def campaign_deciles(self, amounts: np.ndarray) -> np.ndarray:
+        """Deciles of the gifts of one campaign, campaigns being passed in order.
+
+        Args:
+            amounts (np.ndarray): Gift amounts of the campaign
+
+        Returns:
+            np.ndarray: Deciles (1 to 10)
+        """
+        if self.mode == 'sketch':
+            self.sketch.add(amounts)
+        return assign_deciles(amounts, self.cut_points)
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+
+
+class DonorStateTable:
+    """Array-backed per-donor state used by the regular donor conversion pass.
+
+    Contact IDs are dense integers, so a contact's row is its ID and all state
+    lives in NumPy columns indexed by it. A campaign's conversion pass is a
+    handful of array operations instead of a Python loop over dicts.
+
+    Every generated transaction is also folded into a running per-donor
+    rollup (gift count and total, first and last gift, highest decile, gifts
+    per channel), which drives contact enrichment and the donor summary.
+    """
+
+    def __init__(self, capacity: int = 1024, channels: Iterable[str] = ()):
+        """Create an empty table.
+
+        Args:
+            capacity (int): Initial number of rows to allocate
+            channels (Iterable[str]): Known channel names, coded in this order
+        """
+        self._size = 0
+        self._channel_codes: Dict[str, int] = {}
+        self.channel_gifts = np.zeros((0, 0), dtype=np.int32)
+        self._allocate(capacity)
+        for channel_name in channels:
+            self.channel_code(channel_name)
+
+    def _allocate(self, capacity: int) -> None:
+        """Allocate (or grow) the state columns to the given capacity."""
+        columns = {
+            'donation_count': np.zeros(capacity, dtype=np.int32),
+            'first_date': np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]'),
+            'is_regular': np.zeros(capacity, dtype=bool),
+            'conversion_count': np.zeros(capacity, dtype=np.int32),
+            # Running rollup over every transaction, including recurring ones
+            'gift_count': np.zeros(capacity, dtype=np.int32),
+            'total_donated': np.zeros(capacity, dtype=np.float64),
+            'max_decile': np.zeros(capacity, dtype=np.int8),
+            'min_date': np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]'),
+            'max_date': np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]'),
+            'channel_gifts': np.zeros((capacity, len(self._channel_codes)), dtype=np.int32),
+        }
+        for name, column in columns.items():
+            if hasattr(self, name):
+                column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+        self._capacity = capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def num_regular(self) -> int:
+        """Number of donors converted to regular giving."""
+        return int(self.is_regular[:self._size].sum())
+
+    def channel_code(self, channel_name: str) -> int:
+        """Return the code of a channel, registering it if it is new."""
+        code = self._channel_codes.get(channel_name)
+        if code is None:
+            code = self._channel_codes[channel_name] = len(self._channel_codes)
+            self.channel_gifts = np.concatenate(
+                [self.channel_gifts, np.zeros((self._capacity, 1), dtype=np.int32)], axis=1
+            )
+        return code
+
+    def rows(self, contact_ids: np.ndarray) -> np.ndarray:
+        """Return the rows of the given contacts, growing the table if needed.
+
+        Args:
+            contact_ids (np.ndarray): Integer contact IDs
+
+        Returns:
+            np.ndarray: Row index of each contact
+        """
+        rows = np.asarray(contact_ids, dtype=np.int64)
+        if len(rows):
+            needed = int(rows.max()) + 1
+            if needed > self._capacity:
+                self._allocate(max(needed, 2 * self._capacity))
+            self._size = max(self._size, needed)
+        return rows
+
+    def record_donations(self, rows: np.ndarray) -> np.ndarray:
+        """Increment donation counts for the given rows.
+
+        Args:
+            rows (np.ndarray): Row indexes, one per donation
+
+        Returns:
+            np.ndarray: Donation count of each row after the increment
+        """
+        np.add.at(self.donation_count, rows, 1)
+        return self.donation_count[rows]
+
+    def record_first_donations(self, rows: np.ndarray, dates: np.ndarray) -> None:
+        """Store the first donation date of rows that have none yet.
+
+        Args:
+            rows (np.ndarray): Row indexes of first donations
+            dates (np.ndarray): datetime64 donation dates
+        """
+        self.first_date[rows] = dates
+
+    def mark_regular(self, rows: np.ndarray, donation_counts: np.ndarray) -> None:
+        """Flag rows as regular donors and store their count at conversion.
+
+        Args:
+            rows (np.ndarray): Row indexes of converted donors
+            donation_counts (np.ndarray): Donation count at conversion
+        """
+        self.is_regular[rows] = True
+        self.conversion_count[rows] = donation_counts
+
+    def observe_transactions(self, contact_ids: np.ndarray, dates: np.ndarray, deciles: np.ndarray,
+                             amounts: np.ndarray, channel_codes: np.ndarray) -> None:
+        """Fold a chunk of transactions into the running per-donor rollup.
+
+        Args:
+            contact_ids (np.ndarray): Integer contact IDs
+            dates (np.ndarray): datetime64 transaction dates
+            deciles (np.ndarray): Amount deciles
+            amounts (np.ndarray): Donation amounts
+            channel_codes (np.ndarray): Channel of each transaction (or one channel for all), as
+                returned by channel_code
+        """
+        rows = self.rows(contact_ids)
+        dates = np.asarray(dates).astype('datetime64[D]')
+        deciles = np.nan_to_num(np.asarray(deciles, dtype=float), nan=0).astype(np.int8)
+        # Typed operands and integer views keep ufunc.at on its fast loops
+        np.add.at(self.gift_count, rows, np.int32(1))
+        np.add.at(self.total_donated, rows, np.asarray(amounts, dtype=np.float64))
+        np.maximum.at(self.max_decile, rows, deciles)
+        # NaT is the lowest integer: it never wins a maximum, but first dates are seeded before the minimum
+        unset = np.isnat(self.min_date[rows])
+        self.min_date[rows[unset]] = dates[unset]
+        np.minimum.at(self.min_date.view(np.int64), rows, dates.view(np.int64))
+        np.maximum.at(self.max_date.view(np.int64), rows, dates.view(np.int64))
+        num_channels = self.channel_gifts.shape[1]
+        np.add.at(self.channel_gifts.reshape(-1), rows * num_channels + channel_codes, np.int32(1))
+
+    def donors(self) -> np.ndarray:
+        """Contact IDs of every contact with at least one observed transaction."""
+        return np.flatnonzero(~np.isnat(self.min_date[:self._size]))
+
+    def max_deciles(self, contact_ids: np.ndarray) -> np.ndarray:
+        """Highest amount decile of each contact, NaN when all its deciles were unknown."""
+        max_deciles = self.max_decile[contact_ids].astype(float)
+        max_deciles[max_deciles == 0] = np.nan
+        return max_deciles
+
+    def summary(self, contact_ids: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Donor summary, one row per donor, from the running rollup.
+
+        Args:
+            contact_ids (np.ndarray): Donors to summarize (default: every donor), in output order
+
+        Returns:
+            pd.DataFrame: contact_id, nb_donations, total_donated, avg_donation, first_donation,
+            last_donation, max_amount_decile, primary_channel (channel of the most gifts) and is_regular
+        """
+        if contact_ids is None:
+            contact_ids = self.donors()
+        contact_ids = np.asarray(contact_ids, dtype=np.int64)
+        counts = self.gift_count[contact_ids]
+        totals = self.total_donated[contact_ids]
+        max_deciles = self.max_decile[contact_ids]
+        return pd.DataFrame({
+            'contact_id': contact_ids,
+            'nb_donations': counts,
+            'total_donated': totals.round(2),
+            'avg_donation': np.divide(totals, counts, out=np.zeros(len(counts)), where=counts > 0).round(2),
+            'first_donation': self.min_date[contact_ids].astype('datetime64[ns]'),
+            'last_donation': self.max_date[contact_ids].astype('datetime64[ns]'),
+            # A max decile of 0 means every decile of the donor was unknown
+            'max_amount_decile': pd.arrays.IntegerArray(max_deciles, max_deciles == 0),
+            'primary_channel': pd.Categorical.from_codes(
+                self.channel_gifts[contact_ids].argmax(axis=1), categories=list(self._channel_codes)
+            ),
+            'is_regular': self.is_regular[contact_ids],
+        })
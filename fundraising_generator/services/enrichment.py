@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from faker import Faker
+from typing import Dict, List
+
+from .compiled_config import SalutationTable
+from .schema import CONTACT_SCHEMA, apply_schema
+
+# Faker providers sampled for every contact
+POOLED_ATTRIBUTES = (
+    'first_name_male',
+    'first_name_female',
+    'first_name',
+    'last_name',
+    'phone_number',
+    'street_address',
+    'building_number',
+    'postcode',
+    'city',
+    'country',
+)
+
+
+class ContactAttributePools:
+    """Per-locale pools of Faker values used to enrich contacts in batch.
+
+    Each Faker provider is called ``pool_size`` times once; contacts then get
+    their attributes by vectorized index sampling into the pools. Larger pools
+    give more distinct values, smaller pools are faster to build.
+    """
+
+    def __init__(self, fake: Faker, pool_size: int = 2000):
+        """Create empty pools.
+
+        Args:
+            fake (Faker): Localized Faker instance
+            pool_size (int): Number of values per attribute; 0 draws one value per contact
+        """
+        self.fake = fake
+        self.pool_size = pool_size
+        self._pools: Dict[str, np.ndarray] = {}
+
+    def pool(self, attribute: str, min_size: int = 0) -> np.ndarray:
+        """Return the pool of an attribute, building it on first use.
+
+        Args:
+            attribute (str): Faker provider name
+            min_size (int): Required pool size when pooling is disabled
+
+        Returns:
+            np.ndarray: Pool of generated values
+        """
+        size = self.pool_size if self.pool_size > 0 else max(1, min_size)
+        values = self._pools.get(attribute)
+        if values is None or len(values) < size:
+            provider = getattr(self.fake, attribute)
+            values = np.array([provider() for _ in range(size)], dtype=object)
+            self._pools[attribute] = values
+        return values
+
+    def build(self, num_contacts: int) -> Dict[str, np.ndarray]:
+        """Build every pool needed to enrich the given number of contacts.
+
+        Args:
+            num_contacts (int): Number of contacts to enrich
+
+        Returns:
+            Dict[str, np.ndarray]: Pool of each attribute (plain arrays, safe to send to workers)
+        """
+        return {attribute: self.pool(attribute, num_contacts) for attribute in POOLED_ATTRIBUTES}
+
+
+def sample_attribute(rng: np.random.Generator, pools: Dict[str, np.ndarray], attribute: str,
+                     num_contacts: int, pool_size: int, offset: int = 0) -> np.ndarray:
+    """Draw an attribute for a batch of contacts.
+
+    Args:
+        rng (np.random.Generator): Random generator of the batch
+        pools (Dict[str, np.ndarray]): Pools built by ContactAttributePools.build
+        attribute (str): Faker provider name
+        num_contacts (int): Number of values to draw
+        pool_size (int): Configured pool size; 0 means one pooled value per contact
+        offset (int): Position of the batch among all contacts (used when pool_size is 0)
+
+    Returns:
+        np.ndarray: One value per contact
+    """
+    values = pools[attribute]
+    if pool_size <= 0:
+        return values[offset:offset + num_contacts]
+    return values[rng.integers(0, len(values), num_contacts)]
+
+
+def enrich_contact_chunk(rng: np.random.Generator, pools: Dict[str, np.ndarray], pool_size: int, offset: int,
+                         contact_ids: np.ndarray, max_deciles: np.ndarray, first_dates: np.ndarray,
+                         conversion_counts: np.ndarray, salutations: SalutationTable,
+                         wealthy_jobs: List[str], non_wealthy_jobs: List[str]) -> pd.DataFrame:
+    """Assign every contact attribute for a chunk of contacts by vectorized sampling.
+
+    Args:
+        rng (np.random.Generator): Random generator of the chunk
+        pools (Dict[str, np.ndarray]): Pools built by ContactAttributePools.build
+        pool_size (int): Configured pool size
+        offset (int): Position of the chunk among all contacts
+        contact_ids (np.ndarray): Contact IDs
+        max_deciles (np.ndarray): Highest amount decile of each contact
+        first_dates (np.ndarray): datetime64 first transaction dates
+        conversion_counts (np.ndarray): Donation count at regular conversion (0 if never)
+        salutations (SalutationTable): Compiled SALUTATIONS config
+        wealthy_jobs (List[str]): WEALTHY_JOB config
+        non_wealthy_jobs (List[str]): NON_WEALTHY_JOB config
+
+    Returns:
+        pd.DataFrame: Contact records
+    """
+    num_contacts = len(contact_ids)
+
+    def sample(attribute):
+        return sample_attribute(rng, pools, attribute, num_contacts, pool_size, offset)
+
+    # Generate basic contact info
+    salutation_idx = salutations.choices.sample(rng, num_contacts)
+    genders = salutations.genders[salutation_idx]
+
+    # Generate names based on gender
+    first_names = np.where(
+        genders == 'male',
+        sample('first_name_male'),
+        np.where(genders == 'female', sample('first_name_female'), sample('first_name'))
+    )
+
+    # Assign job based on decile
+    jobs = np.where(
+        max_deciles > 7,
+        rng.choice(wealthy_jobs, num_contacts) if wealthy_jobs else '',
+        rng.choice(non_wealthy_jobs, num_contacts) if non_wealthy_jobs else ''
+    )
+
+    address_2 = np.where(rng.random(num_contacts) > 0.5, sample('building_number'), '')
+    first_dates = pd.Series(first_dates)
+
+    contacts = pd.DataFrame({
+        'contact_id': contact_ids,
+        'salutation': salutations.civilities[salutation_idx],
+        'gender': genders,
+        'first_name': first_names,
+        'last_name': sample('last_name'),
+        'phone': sample('phone_number'),
+        'address_1': sample('street_address'),
+        'address_2': address_2,
+        'zip_code': sample('postcode'),
+        'city': sample('city'),
+        'country': sample('country'),
+        'job': jobs,
+        'origin_decile': max_deciles,
+        'Creation_date': first_dates.to_numpy(),
+        'Creation_year': first_dates.dt.year.to_numpy(),
+        'nb_donations_before_regular': conversion_counts
+    })
+    return apply_schema(contacts, CONTACT_SCHEMA)
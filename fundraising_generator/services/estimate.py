@@ -0,0 +1,377 @@
+"""
+Analytic cost estimate of a generation, computed from the configuration alone.
+
+The estimate follows the generator year by year and channel by channel with
+expected values instead of random draws: prospecting campaigns bring
+``max_reach_contact * transformation_rate`` new donors, retention campaigns
+convert ``transformation_rate`` of the cross-sold contacts, and first-time
+donors become regular donors with the generator's probability formula. It is
+used for admission control of generation requests; it is meant to be right
+within a small factor, in a few milliseconds.
+"""
+import copy
+import math
+from collections import defaultdict, namedtuple
+
+from .enrichment import POOLED_ATTRIBUTES
+
+GenerationEstimate = namedtuple('GenerationEstimate', [
+    'transactions',
+    'campaign_transactions',
+    'recurring_transactions',
+    'contacts',
+    'allocated_contacts',
+    'largest_chunk',
+    'peak_memory_bytes',
+    'runtime_seconds',
+])
+
+# Cost model, calibrated on the streamed CSV ZIP export (one year and channel
+# held in memory at a time, plus the per-contact donor state and enrichment)
+BASE_MEMORY_BYTES = 180 * 1024 ** 2
+TRANSACTION_MEMORY_BYTES = 300
+CONTACT_MEMORY_BYTES = 580
+BASE_RUNTIME_SECONDS = 1.5
+TRANSACTION_SECONDS = 2e-5
+CONTACT_SECONDS = 3e-5
+# Faker values of the contact attribute pools, built before enrichment
+FAKER_VALUE_BYTES = 70
+FAKER_VALUE_SECONDS = 2e-5
+# Contacts allocated by initial_nb and prospecting, donors or not: their IDs, the
+# channel membership bitmaps and the donor state rows, sized to the highest ID
+ALLOCATED_CONTACT_BYTES = 170
+ALLOCATED_CONTACT_CHANNEL_BYTES = 11
+ALLOCATED_CONTACT_SECONDS = 1e-7
+
+# First-year volume of a preview, contacts it allocates and campaigns per campaign
+# type (see preview_config)
+PREVIEW_MAX_CAMPAIGN_TRANSACTIONS = 2500
+PREVIEW_MAX_ALLOCATED_CONTACTS = 50000
+PREVIEW_MAX_CAMPAIGNS = 2
+
+# Admission decisions
+SYNC = 'sync'
+BACKGROUND = 'background'
+REJECT = 'reject'
+
+Admission = namedtuple('Admission', ['decision', 'estimate', 'config', 'scale', 'reason'])
+
+# Wealth categories of the amount deciles: 1-4 low, 5-7 medium, 8-10 high
+WEALTH_SHARES = {'low': 0.4, 'medium': 0.3, 'high': 0.3}
+MAX_REGULAR_PROBABILITY = 0.6
+
+# Configuration keys scaled by downscale_config (volumes of contacts reached)
+SCALED_CHANNEL_KEYS = ('initial_nb',)
+SCALED_CAMPAIGN_KEYS = ('max_reach_contact',)
+
+
+def _regular_probability(config, channel_data, year_index):
+    """Expected probability that a first-time donor of a channel becomes regular."""
+    years = config.get('YEARS', 10)
+    base_rate = config.get('GLOBAL_REGULAR_DONOR_RATE', 0.08)
+    channel_rate = channel_data.get('regular_donor_rate', 0.08)
+    multipliers = channel_data.get('regular_donor_wealth_multiplier', {})
+    # Donations are spread over the year: take the middle of it
+    duration_factor = min(1.0, (year_index + 0.5) / max(1, years * 0.6))
+    return sum(
+        share * min(
+            MAX_REGULAR_PROBABILITY,
+            base_rate * channel_rate * multipliers.get(category, 1.0) * (0.5 + 0.5 * duration_factor)
+        )
+        for category, share in WEALTH_SHARES.items()
+    )
+
+
+def _expected_volumes(config):
+    """Follow the generation year by year and channel by channel with expected values.
+
+    Returns:
+        tuple: (campaign_transactions, recurring_transactions, donors, allocated, largest_chunk, rows)
+        where allocated counts the contact IDs handed out (initial_nb and prospects) and
+        rows maps (channel, campaign type or 'recurring') to its expected transactions
+    """
+    years = int(config.get('YEARS', 10))
+    channels = config.get('CHANNELS', {}) or {}
+
+    # Expected channel sizes, contacts allocated so far and contacts that never donated
+    membership = {name: float(data.get('initial_nb', 0)) for name, data in channels.items()}
+    pool = sum(membership.values())
+    never_donated = pool
+    donors = 0.0
+
+    campaign_transactions = 0.0
+    recurring_transactions = 0.0
+    largest_chunk = 0.0
+    rows = defaultdict(float)
+    # Regular donors of each channel giving every month of the current year
+    active_regular = defaultdict(float)
+
+    for year_index in range(years):
+        # Monthly gifts start the month after conversion and run to the end of the calendar
+        months_per_regular = max(0.0, (years + 1 - year_index) * 12 - 6.5)
+        for name, data in channels.items():
+            campaigns = data.get('campaigns', {}) or {}
+            probability = _regular_probability(config, data, year_index)
+            campaign_rows = 0.0
+            regular_donors = 0.0
+
+            prospecting = campaigns.get('prospecting')
+            if prospecting:
+                for _ in range(prospecting.get('nb', 1)):
+                    new_donors = int(prospecting.get('max_reach_contact', 0) * prospecting.get('transformation_rate', 0))
+                    membership[name] += new_donors
+                    pool += new_donors
+                    donors += new_donors
+                    campaign_rows += new_donors
+                    rows[name, 'prospecting'] += new_donors
+                    regular_donors += new_donors * probability
+
+            retention = campaigns.get('retention')
+            if retention:
+                for _ in range(retention.get('nb', 1)):
+                    # Cross-sell percentages are in percent of each channel's contacts
+                    reached = sum(
+                        membership.get(cross_channel, 0.0) * percentage / 100
+                        for cross_channel, percentage in retention.get('cross_sell', [])
+                    )
+                    reached = min(reached, pool)
+                    sent = int(reached * retention.get('transformation_rate', 0))
+                    # Contacts are drawn independently of their history
+                    first_time = sent * never_donated / pool if pool else 0.0
+                    never_donated -= first_time
+                    donors += first_time
+                    if pool:
+                        membership[name] = min(pool, membership[name] + sent * (1 - membership[name] / pool))
+                    campaign_rows += sent
+                    rows[name, 'retention'] += sent
+                    regular_donors += first_time * probability
+
+            recurring_rows = regular_donors * months_per_regular
+            rows[name, 'recurring'] += recurring_rows
+            campaign_transactions += campaign_rows
+            recurring_transactions += recurring_rows
+            # A chunk holds the monthly gifts dated in its year: 12 per earlier regular donor,
+            # 5.5 on average for the donors converted during the year
+            chunk_recurring_rows = active_regular[name] * 12 + regular_donors * 5.5
+            largest_chunk = max(largest_chunk, campaign_rows + chunk_recurring_rows)
+            active_regular[name] += regular_donors
+
+    # Recurring-only chunks of the year after the last generated one
+    largest_chunk = max([largest_chunk] + [count * 12 for count in active_regular.values()])
+
+    return campaign_transactions, recurring_transactions, donors, pool, largest_chunk, dict(rows)
+
+
+def estimate_generation(config):
+    """
+    Estimate the volume and cost of a generation without running it.
+
+    Args:
+        config: Generator configuration (parsed YAML)
+
+    Returns:
+        GenerationEstimate: Expected transaction, recurring, contact and allocated contact
+        counts, rows of the largest (year, channel) chunk, peak memory in bytes and runtime
+        in seconds
+    """
+    campaign_transactions, recurring_transactions, donors, allocated, largest_chunk, _ = _expected_volumes(config)
+    channels = len(config.get('CHANNELS', {}) or {})
+    # One Faker call per pooled attribute and pool entry (per contact without pooling)
+    pool_size = config.get('CONTACT_POOL_SIZE', 2000)
+    faker_values = len(POOLED_ATTRIBUTES) * (pool_size if pool_size > 0 else donors)
+
+    transactions = campaign_transactions + recurring_transactions
+    peak_memory = (
+        BASE_MEMORY_BYTES
+        + largest_chunk * TRANSACTION_MEMORY_BYTES
+        + donors * CONTACT_MEMORY_BYTES
+        + faker_values * FAKER_VALUE_BYTES
+        + allocated * (ALLOCATED_CONTACT_BYTES + channels * ALLOCATED_CONTACT_CHANNEL_BYTES)
+    )
+    runtime = (
+        BASE_RUNTIME_SECONDS + transactions * TRANSACTION_SECONDS + donors * CONTACT_SECONDS
+        + faker_values * FAKER_VALUE_SECONDS + allocated * ALLOCATED_CONTACT_SECONDS
+    )
+    return GenerationEstimate(
+        transactions=int(round(transactions)),
+        campaign_transactions=int(round(campaign_transactions)),
+        recurring_transactions=int(round(recurring_transactions)),
+        contacts=int(round(donors)),
+        allocated_contacts=int(round(allocated)),
+        largest_chunk=int(round(largest_chunk)),
+        peak_memory_bytes=int(peak_memory),
+        runtime_seconds=round(runtime, 1),
+    )
+
+
+def expected_campaign_amounts(config):
+    """
+    Expected mix of the campaign gift amount distributions of a generation.
+
+    Gifts of a channel and campaign type are drawn from a normal distribution
+    (avg_donation, std_deviation) floored at 1.
+
+    Args:
+        config: Generator configuration
+
+    Returns:
+        list: (expected transactions, mean, standard deviation) of each channel and campaign type
+    """
+    _, _, _, _, _, rows = _expected_volumes(config)
+    channels = config.get('CHANNELS', {}) or {}
+    mix = []
+    for (name, kind), count in rows.items():
+        if kind == 'recurring' or count <= 0:
+            continue
+        campaign_info = channels[name]['campaigns'][kind]
+        mix.append((count, campaign_info.get('avg_donation', 50), campaign_info.get('std_deviation', 10)))
+    return mix
+
+
+def downscale_config(config, factor):
+    """
+    Scale down the contact volumes of a configuration.
+
+    Transaction and contact counts are roughly proportional to the initial
+    channel sizes and to the prospecting reach, so scaling both by ``factor``
+    scales the generation by about the same factor.
+
+    Args:
+        config: Generator configuration
+        factor: Scale factor, between 0 and 1
+
+    Returns:
+        A scaled copy of the configuration
+    """
+    scaled = copy.deepcopy(config)
+    for data in (scaled.get('CHANNELS') or {}).values():
+        for key in SCALED_CHANNEL_KEYS:
+            if key in data:
+                data[key] = int(math.floor(data[key] * factor))
+        for campaign_info in (data.get('campaigns') or {}).values():
+            for key in SCALED_CAMPAIGN_KEYS:
+                if key in campaign_info:
+                    campaign_info[key] = max(1, int(math.floor(campaign_info[key] * factor)))
+    if 'INITIAL_DONOR_DATABASE_SIZE' in scaled:
+        scaled['INITIAL_DONOR_DATABASE_SIZE'] = int(math.floor(scaled['INITIAL_DONOR_DATABASE_SIZE'] * factor))
+    return scaled
+
+
+def preview_config(config, max_campaign_transactions=PREVIEW_MAX_CAMPAIGN_TRANSACTIONS,
+                   max_campaigns=PREVIEW_MAX_CAMPAIGNS, max_allocated_contacts=PREVIEW_MAX_ALLOCATED_CONTACTS):
+    """
+    Cut a configuration down so that its first year is small enough for a preview.
+
+    At most one year is generated, each campaign type runs at most max_campaigns
+    times (building a campaign has a fixed cost, whatever its size), and the
+    contact volumes are then scaled down to the transaction and contact budgets.
+
+    Args:
+        config: Generator configuration
+        max_campaign_transactions: Maximum expected campaign transactions in the first year
+        max_campaigns: Maximum number of campaigns per channel and campaign type
+        max_allocated_contacts: Maximum expected contacts allocated (initial_nb and prospects)
+
+    Returns:
+        A reduced copy of the configuration
+    """
+    reduced = copy.deepcopy(config)
+    # A configuration generating no year at all previews no year either
+    reduced['YEARS'] = min(reduced.get('YEARS', 10), 1)
+    for data in (reduced.get('CHANNELS') or {}).values():
+        for campaign_info in (data.get('campaigns') or {}).values():
+            if isinstance(campaign_info, dict):
+                campaign_info['nb'] = min(campaign_info.get('nb', 1), max_campaigns)
+    first_year = estimate_generation(reduced)
+    scale = 1.0
+    if first_year.campaign_transactions > max_campaign_transactions:
+        scale = max_campaign_transactions / first_year.campaign_transactions
+    if first_year.allocated_contacts > max_allocated_contacts:
+        scale = min(scale, max_allocated_contacts / first_year.allocated_contacts)
+    if scale == 1.0:
+        return reduced
+    return downscale_config(reduced, scale)
+
+
+def _fitting_scale(estimate, max_transactions, max_memory_bytes):
+    """Largest scale factor (at most 1) that keeps an estimate within the hard limits."""
+    scale = 1.0
+    if max_transactions and estimate.transactions > max_transactions:
+        scale = min(scale, max_transactions / estimate.transactions)
+    variable_memory = estimate.peak_memory_bytes - BASE_MEMORY_BYTES
+    if max_memory_bytes and estimate.peak_memory_bytes > max_memory_bytes:
+        scale = min(scale, max(0.0, max_memory_bytes - BASE_MEMORY_BYTES) / variable_memory)
+    return scale
+
+
+def admit_generation(config, max_transactions=0, max_memory_bytes=0, max_sync_seconds=0, downscale=False):
+    """
+    Decide how to run a generation request from its estimate.
+
+    Requests over the hard limits (transactions, peak memory) are rejected,
+    or downscaled to fit when ``downscale`` is set (and still rejected if the
+    downscaled estimate does not fit). Requests expected to run
+    longer than ``max_sync_seconds`` go to the background job queue. A limit
+    of 0 disables it.
+
+    Args:
+        config: Generator configuration
+        max_transactions: Maximum expected number of transactions
+        max_memory_bytes: Maximum expected peak memory
+        max_sync_seconds: Maximum expected runtime of a synchronous request
+        downscale: Scale oversized configurations down instead of rejecting them
+
+    Returns:
+        Admission: decision (SYNC, BACKGROUND or REJECT), estimate, configuration to
+        generate (downscaled or not), scale applied (1.0 if none) and reason
+    """
+    estimate = estimate_generation(config)
+    scale = _fitting_scale(estimate, max_transactions, max_memory_bytes)
+    if scale < 1.0:
+        if not downscale or scale <= 0.0:
+            return Admission(REJECT, estimate, config, 1.0, _limit_reason(estimate, max_transactions, max_memory_bytes))
+        # Volumes are only roughly linear in the scale: refine on the scaled estimate
+        scaled_config, scaled = config, estimate
+        total_scale = 1.0
+        for _ in range(3):
+            step = _fitting_scale(scaled, max_transactions, max_memory_bytes)
+            if step >= 1.0:
+                break
+            total_scale *= step * 0.98
+            scaled_config = downscale_config(config, total_scale)
+            scaled = estimate_generation(scaled_config)
+        scale = round(total_scale, 4)
+        if _fitting_scale(scaled, max_transactions, max_memory_bytes) < 1.0:
+            # Fixed costs (contact pools, minimum reach) do not scale down: no scale fits
+            return Admission(
+                REJECT, scaled, config, scale,
+                f'{_limit_reason(scaled, max_transactions, max_memory_bytes)}, even scaled down by {scale}'
+            )
+        config, estimate = scaled_config, scaled
+
+    if max_sync_seconds and estimate.runtime_seconds > max_sync_seconds:
+        return Admission(
+            BACKGROUND, estimate, config, scale,
+            f'Expected runtime of {estimate.runtime_seconds:.0f}s exceeds {max_sync_seconds}s'
+        )
+    return Admission(SYNC, estimate, config, scale, None)
+
+
+def _limit_reason(estimate, max_transactions, max_memory_bytes):
+    if max_transactions and estimate.transactions > max_transactions:
+        return f'Expected {estimate.transactions:,} transactions exceeds the limit of {max_transactions:,}'
+    return (
+        f'Expected peak memory of {estimate.peak_memory_bytes / 1024 ** 2:,.0f} MB exceeds '
+        f'the limit of {max_memory_bytes / 1024 ** 2:,.0f} MB'
+    )
+
+
+def get_generation_limits():
+    """Admission limits from the Django settings (GENERATION_MAX_TRANSACTIONS,
+    GENERATION_MAX_MEMORY_BYTES, GENERATION_MAX_SYNC_SECONDS)."""
+    from django.conf import settings
+    return {
+        'max_transactions': getattr(settings, 'GENERATION_MAX_TRANSACTIONS', 0),
+        'max_memory_bytes': getattr(settings, 'GENERATION_MAX_MEMORY_BYTES', 0),
+        'max_sync_seconds': getattr(settings, 'GENERATION_MAX_SYNC_SECONDS', 0),
+    }
@@ -0,0 +1,237 @@
+"""
+CSV export helpers shared by the API view and the demo script.
+
+Every table is exported under several header schemas (Salesforce NPC and
+the original column names). The schemas only differ in the header line, so
+each chunk's CSV body is formatted once: it is written to the first entry
+and spooled, then replayed under the other headers. Date columns are
+formatted through a per-archive cache of ISO day strings.
+"""
+import io
+import tempfile
+import zipfile
+from itertools import groupby
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+# Entries of a generated dataset archive, per chunk kind: (name prefix, header schema).
+# The schema is a Salesforce mapping data type, or None for the original column names.
+DATASET_SCHEMAS = {
+    'transactions': (('Gift_Transaction', 'transactions'), ('transactions', None)),
+    'contacts': (('Contact', 'contacts'), ('contacts', None)),
+    'campaigns': (('Campaign', 'campaigns'), ('campaigns', None)),
+    'donors': (('Gift_Summary', 'gift_summary'), ('donors', None)),
+}
+
+# Bytes of a spooled CSV body kept in memory before it rolls over to disk
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def csv_header(columns, schema=None):
+    """
+    Format the header line of a CSV export.
+
+    Args:
+        columns: Original column names
+        schema: Salesforce mapping data type (e.g. 'transactions'), or None for the original names
+
+    Returns:
+        The header line, quoted and terminated like the body written by pandas
+    """
+    from .salesforce_mapper import get_salesforce_column_mapping
+
+    if schema is not None:
+        mapping = get_salesforce_column_mapping(schema)
+        columns = [mapping.get(column, column) for column in columns]
+    return pd.DataFrame(columns=columns).to_csv(index=False)
+
+
+class ZipStream(io.RawIOBase):
+    """Write-only, non-seekable sink for a ZIP archive built on the fly.
+
+    zipfile falls back to data descriptors on non-seekable outputs, so an
+    archive written here can be sent as it is produced: ``drain`` hands over
+    the bytes written since the previous call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and forget the bytes written so far."""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class DateFormatter:
+    """Cached ISO formatting of day-resolution dates.
+
+    Generated dates span a few years, so they repeat heavily: the strings of
+    the days seen so far are kept in a table indexed by day number, and a
+    date column is formatted with one array lookup.
+    """
+
+    def __init__(self):
+        self._first_day = 0
+        self._strings = np.empty(0, dtype=object)
+
+    def _day_strings(self, first_day: int, last_day: int) -> np.ndarray:
+        """Return the string table, extended to cover the given days if needed."""
+        cached_last_day = self._first_day + len(self._strings) - 1
+        if not len(self._strings) or first_day < self._first_day or last_day > cached_last_day:
+            if len(self._strings):
+                first_day, last_day = min(first_day, self._first_day), max(last_day, cached_last_day)
+            days = np.arange(first_day, last_day + 1).astype('datetime64[D]')
+            self._strings = np.datetime_as_string(days).astype(object)
+            self._first_day = first_day
+        return self._strings
+
+    def format(self, values: np.ndarray):
+        """Format datetime64 values as 'YYYY-MM-DD' strings, NaT as missing values (None).
+
+        Args:
+            values (np.ndarray): datetime64 values
+
+        Returns:
+            np.ndarray: Object array of strings, or None if a value has a time
+            of day (pandas then formats the column itself)
+        """
+        days = values.astype('datetime64[D]')
+        valid = ~np.isnat(days)
+        if (days[valid] != values[valid]).any():
+            return None
+        formatted = np.full(len(days), None, dtype=object)
+        if valid.any():
+            day_numbers = days[valid].view(np.int64)
+            strings = self._day_strings(int(day_numbers.min()), int(day_numbers.max()))
+            formatted[valid] = strings[day_numbers - self._first_day]
+        return formatted
+
+    def format_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Frame with its day-resolution date columns replaced by their strings."""
+        formatted = {}
+        for column in frame.columns:
+            if pd.api.types.is_datetime64_dtype(frame[column].dtype):
+                strings = self.format(frame[column].to_numpy())
+                if strings is not None:
+                    formatted[column] = strings
+        return frame.assign(**formatted) if formatted else frame
+
+
+def _write_csv_entry(zip_file, sink, arcname, frames, schema, spool, date_formatter):
+    """
+    Write frames as one CSV entry, formatting each body once and spooling it.
+
+    Yields the archive bytes drained from the sink after each chunk, and
+    returns the original columns (None if there was no frame with columns).
+    """
+    columns = None
+    with zip_file.open(arcname, 'w', force_zip64=True) as entry:
+        writer = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+        for frame in frames:
+            # Skip column-less placeholders, and empty chunks once the header is out
+            if len(frame.columns) == 0 or (frame.empty and columns is not None):
+                continue
+            if columns is None:
+                columns = list(frame.columns)
+                writer.write(csv_header(columns, schema))
+            body = date_formatter.format_frame(frame).to_csv(index=False, header=False)
+            writer.write(body)
+            spool.write(body)
+            writer.flush()
+            yield sink.drain()
+        writer.flush()
+        writer.detach()
+    return columns
+
+
+def _copy_csv_entry(zip_file, sink, arcname, header, spool):
+    """Write a spooled CSV body under another header, yielding the drained archive bytes per block."""
+    with zip_file.open(arcname, 'w', force_zip64=True) as entry:
+        writer = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+        writer.write(header)
+        spool.seek(0)
+        for block in iter(lambda: spool.read(COPY_BLOCK_SIZE), ''):
+            writer.write(block)
+            writer.flush()
+            yield sink.drain()
+        writer.flush()
+        writer.detach()
+
+
+def iter_dataset_zip(chunks, timestamp):
+    """
+    Stream a generated dataset as a ZIP archive, chunk by chunk.
+
+    Each transactions or contacts chunk is compressed into the Salesforce NPC
+    entry as soon as it arrives. Its body is spooled (to disk once large) and
+    written again under the original header after every Salesforce entry, so
+    memory stays bounded by one chunk and each chunk is serialized once.
+
+    Args:
+        chunks: GenerationChunk iterable, as yielded by FundraisingDataGenerator.iter_generate
+        timestamp: Suffix of the entry names
+
+    Yields:
+        bytes: Successive pieces of the archive
+    """
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        copies = []
+        date_formatter = DateFormatter()
+        for kind, group in groupby(chunks, key=attrgetter('kind')):
+            (first_name, first_schema), *other_schemas = DATASET_SCHEMAS[kind]
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', encoding='utf-8', newline='')
+            columns = yield from _write_csv_entry(
+                zip_file, sink, f'{first_name}_{timestamp}.csv', (chunk.frame for chunk in group), first_schema, spool,
+                date_formatter
+            )
+            if columns is None:
+                spool.close()
+                continue
+            copies.append((spool, [
+                (f'{name}_{timestamp}.csv', csv_header(columns, schema)) for name, schema in other_schemas
+            ]))
+
+        # Other header schemas (original format files, kept for backward compatibility)
+        for spool, entries in copies:
+            with spool:
+                for arcname, header in entries:
+                    yield from _copy_csv_entry(zip_file, sink, arcname, header, spool)
+    yield sink.drain()
+
+
+def iter_dataset_archive(chunks, timestamp, output_format='csv', campaign_table=False):
+    """
+    Stream a generated dataset as a ZIP archive in the requested output format.
+
+    Args:
+        chunks: GenerationChunk iterable, as yielded by FundraisingDataGenerator.iter_generate
+        timestamp: Suffix of the CSV entry names
+        output_format: 'csv', 'parquet' or 'arrow'
+        campaign_table: CSV only, export campaigns as a separate Campaign table
+
+    Returns:
+        Iterator of bytes: Successive pieces of the archive
+    """
+    if output_format != 'csv':
+        # Parquet / Arrow IPC files partitioned by year and channel
+        from .columnar import iter_columnar_zip
+        return iter_columnar_zip(chunks, output_format)
+    if campaign_table:
+        # Campaign columns exported once per campaign, transactions keep a campaign_id
+        from .campaigns import normalize_campaigns
+        chunks = normalize_campaigns(chunks)
+    return iter_dataset_zip(chunks, timestamp)
@@ -1,16 +1,27 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
-import string
+from collections import namedtuple
+from functools import partial
 from faker import Faker
-from scipy.spatial import KDTree
-try:
-    from dateutil.relativedelta import relativedelta
-except ImportError:
-    # Fallback if dateutil not available
-    relativedelta = None
-from .contact_manager import ContactManager
+from .contact_manager import ContactManager, format_contact_ids
+from .accumulator import TransactionAccumulator
+from .compiled_config import compile_campaign_themes, compile_channels, compile_salutations
+from .deciles import DecileAssigner
+from .recurring import RecurringCalendar, RecurringSchedule, expand_schedule_batch, schedule_batch_gifts
+from .donor_state import DonorStateTable
+from .enrichment import ContactAttributePools
+from .schema import TRANSACTION_SCHEMA, apply_schema, concat_frames, decile_values, schema_frame
+from .workers import (
+    CONTACT_CHUNK_SIZE, CONTACT_SELECTION, FAKER_SEED, PREVIEW_SAMPLE, SEQUENTIAL_DRAWS, WorkerPool,
+    draw_campaign_batch, enrich_contacts_task, substream
+)
+
+# A bounded piece of the dataset produced by FundraisingDataGenerator.iter_generate
+GenerationChunk = namedtuple('GenerationChunk', ['kind', 'year', 'channel', 'frame'])
+
+# Default donor sample size of FundraisingDataGenerator.preview
+PREVIEW_MAX_DONORS = 200
+
 
 class FundraisingDataGenerator:
     def __init__(self, config):
@@ -20,12 +31,18 @@ class FundraisingDataGenerator:
         import sys
         sys.stdout.flush()
         self.load_config()
+        # Root of the random substreams; a fixed SEED gives reproducible output whatever WORKERS is.
+        # Every draw goes through per-instance generators, so concurrent instances never interfere.
+        self.entropy = np.random.SeedSequence(self.SEED).entropy
+        self.rng = substream(self.entropy, SEQUENTIAL_DRAWS)
         print("      → Initializing contact manager...")
         sys.stdout.flush()
-        self.contact_manager = ContactManager(self.CHANNELS)
+        self.contact_manager = ContactManager(self.CHANNELS, rng=substream(self.entropy, CONTACT_SELECTION))
         print("      → Initializing Faker...")
         sys.stdout.flush()
         self.fake = Faker(self.LOCALISATION)
+        self.fake.seed_instance(int(substream(self.entropy, FAKER_SEED).integers(0, 2**31 - 1)))
+        self.contact_pools = ContactAttributePools(self.fake, self.CONTACT_POOL_SIZE)
         print("      ✓ Generator ready")
         sys.stdout.flush()
 
@@ -38,60 +55,52 @@ class FundraisingDataGenerator:
         self.GLOBAL_REGULAR_DONOR_RATE = self.config.get('GLOBAL_REGULAR_DONOR_RATE', 0.08)
         self.CHANNELS = self.config.get('CHANNELS', {})
         self.CAMPAIGN_THEMES = self.config.get('CAMPAIGN_THEMES', [])
-        self.CAMPAIGN_THEME_CONFIG = {}
-        self.CAMPAIGN_THEME_CHOICES = []
-        if isinstance(self.CAMPAIGN_THEMES, dict):
-            self.CAMPAIGN_THEME_CONFIG = self.CAMPAIGN_THEMES
-            self.CAMPAIGN_THEME_CHOICES = [
-                (theme, data.get('weight', 1.0))
-                for theme, data in self.CAMPAIGN_THEME_CONFIG.items()
-            ]
-        else:
-            self.CAMPAIGN_THEME_CHOICES = self.CAMPAIGN_THEMES
+        # Validated sampling tables, compiled once: a malformed configuration fails here
+        self.COMPILED_CHANNELS = compile_channels(self.CHANNELS)
+        self.COMPILED_THEMES = compile_campaign_themes(self.CAMPAIGN_THEMES)
         self.WHERE_POSSIBILITIES = self.config.get('WHERE_POSSIBILITIES', [])
         self.WHO_POSSIBILITIES = self.config.get('WHO_POSSIBILITIES', [])
         self.WHAT_POSSIBILITIES = self.config.get('WHAT_POSSIBILITIES', [])
         self.SALUTATIONS = self.config.get('SALUTATIONS', [])
+        self.COMPILED_SALUTATIONS = compile_salutations(self.SALUTATIONS)
         self.WEALTHY_JOB = self.config.get('WEALTHY_JOB', [])
         self.NON_WEALTHY_JOB = self.config.get('NON_WEALTHY_JOB', [])
         self.LOCALISATION = self.config.get('LOCALISATION', 'fr_FR')
-        # Track regular donors to avoid duplicate monthly generation
-        self.regular_donors = set()
-
-    def select_by_probability(self, options):
-        """Select an option based on the given probabilities"""
-        choices, weights = zip(*options)
-        total_weight = sum(weights)
-        if total_weight != 1.0:
-            weights = [w / total_weight for w in weights]
-        return random.choices(choices, weights, k=1)[0]
-
-    def _generate_campaign_metadata(self, channel_name, channel_data, campaign_type, campaign_info, current_year):
+        # Keep recurring donations as schedules and expand them only on export
+        self.LAZY_RECURRING = self.config.get('LAZY_RECURRING', False)
+        # Size of the per-attribute Faker value pools used for contact enrichment (0 = one value per contact)
+        self.CONTACT_POOL_SIZE = self.config.get('CONTACT_POOL_SIZE', 2000)
+        # Seed of the random substreams (None draws fresh entropy) and number of worker processes
+        self.SEED = self.config.get('SEED')
+        self.WORKERS = self.config.get('WORKERS', 1)
+        # Amount deciles within each campaign, or against global cut points (DECILE_MODE)
+        self.decile_assigner = DecileAssigner.from_config(self.config)
+        # Export the per-donor rollup as a donor summary table
+        self.DONOR_SUMMARY = self.config.get('DONOR_SUMMARY', False)
+        # Per-donor state (donation counts, first donation, regular status) and rollup
+        self.donor_state = DonorStateTable(channels=self.CHANNELS)
+        # Month calendar used to expand recurring donations
+        self.recurring_calendar = RecurringCalendar(self.FIRST_YEAR, self.YEARS)
+        self.recurring_schedule = RecurringSchedule(self.recurring_calendar)
+
+    def _generate_campaign_metadata(self, channel_name, channel, campaign_type, campaign_info, current_year):
         """Generate metadata for a campaign"""
         code_source = {}
         
         # Select theme
-        if self.CAMPAIGN_THEME_CHOICES:
-            code_source['theme'] = self.select_by_probability(self.CAMPAIGN_THEME_CHOICES)
+        if self.COMPILED_THEMES.choices is not None:
+            code_source['theme'] = self.COMPILED_THEMES.choices.sample(self.rng)
         else:
             code_source['theme'] = "General"
-        
-        # Select options for where, who, and what
-        num_where_options = random.randint(1, 3)
-        num_who_options = random.randint(1, 3)
-        num_what_options = random.randint(1, 3)
 
         # Generate random start date and duration
-        start_day = random.randint(1, 365)
-        start_date = datetime(current_year, 1, 1) + timedelta(days=start_day)
-        end_date = start_date + timedelta(days=channel_data['duration'])
-        
-        campaign_names = []
-        if self.CAMPAIGN_THEME_CONFIG:
-            campaign_names = self.CAMPAIGN_THEME_CONFIG.get(code_source['theme'], {}).get('campaign_names', [])
+        start_day = int(self.rng.integers(1, 366))
+        start_date = np.datetime64(f'{current_year}-01-01', 'D') + start_day
+        end_date = start_date + channel.duration
         
+        campaign_names = self.COMPILED_THEMES.campaign_names.get(code_source['theme'], ())
         if campaign_names:
-            selected_campaign_name = random.choice(campaign_names)
+            selected_campaign_name = campaign_names[self.rng.integers(len(campaign_names))]
         else:
             selected_campaign_name = code_source['theme']
 
@@ -106,462 +115,506 @@ class FundraisingDataGenerator:
         
         return code_source
 
-    def generate_transaction_dates(self, num_transactions, distribution, start_date, end_date):
-        """Generate transaction dates based on distribution"""
-        dates = []
-        total_days = (end_date - start_date).days
-
-        for _ in range(num_transactions):
-            if distribution == "regular":
-                random_day = random.randint(0, total_days)
-            elif distribution == "inverted_exponential":
-                random_day = total_days - int(random.expovariate(1.0 / (total_days // 2)))
-            elif distribution == "exponential":
-                random_day = int(random.expovariate(1.0 / (total_days // 2)))
-            else:
-                random_day = random.randint(0, total_days)
-            
-            random_day = max(0, min(random_day, total_days))
-            dates.append(start_date + timedelta(days=random_day))
-        
-        return dates
-
-    def _create_campaign_transactions(self, nb_reach, nb_sent, contact_ids, code_source, 
-                                   channel_name, channel_data, campaign_type):
-        """Create transactions for a campaign"""
-        num_transactions = len(contact_ids)
-        if num_transactions == 0:
-            return pd.DataFrame()
-
-        # Generate transaction dates
-        transaction_dates = self.generate_transaction_dates(
-            num_transactions, 
-            channel_data['distribution'],
-            code_source['start'],
-            code_source['end']
-        )
-
-        # Create base transaction data
-        transactions_data = {
-            'date': transaction_dates,
-            'campaign_start': code_source['start'],
-            'campaign_end': code_source['end'],
-            'channel': channel_name,
-            'campaign_name': code_source['name'],
-            'campaign_type': campaign_type,
-            'donation_amount': [
-                max(1, random.gauss(code_source['avg_donation'], code_source['std_deviation']))
-                for _ in range(num_transactions)
-            ],
-            'cost': nb_reach * channel_data['cost_per_reach'] / num_transactions,
-            'reactivity': nb_reach / num_transactions,
-            'contact_id': contact_ids
+    def _campaign_draw_task(self, num_transactions, code_source, channel, key):
+        """Describe the independent draws of a campaign as a work unit"""
+        return {
+            'entropy': self.entropy,
+            'key': key,
+            'num_transactions': num_transactions,
+            'distribution': channel.distribution,
+            'start': code_source['start'],
+            'end': code_source['end'],
+            'avg_donation': code_source['avg_donation'],
+            'std_deviation': code_source['std_deviation'],
+            'payment': channel.payment,
         }
 
-        # Add payment methods
-        transactions_data['payment_method'] = [
-            self.select_by_probability(list(channel_data['payment'].items()))
-            for _ in range(num_transactions)
-        ]
-
-        # Create DataFrame
-        transactions_campaign = pd.DataFrame(transactions_data)
-        transactions_campaign['donation_amount'] = transactions_campaign['donation_amount'].round(2)
-        transactions_campaign['cost'] = transactions_campaign['cost'].round(2)
-        transactions_campaign['reactivity'] = transactions_campaign['reactivity'].round(2)
-        
-        # Calculate deciles
-        transactions_campaign['amount_decile'] = pd.qcut(
-            transactions_campaign['donation_amount'], 
-            10, 
-            labels=False, 
-            duplicates='drop'
-        ) + 1
-
-        return transactions_campaign
-
-    def _calculate_wealth_category(self, decile):
-        """Calculate wealth category from decile"""
-        if decile >= 8:
-            return 'high'
-        elif decile >= 5:
-            return 'medium'
-        else:
-            return 'low'
-
-    def _calculate_regular_donor_probability(self, contact_id, donation_date, amount_decile, channel_data):
-        """Calculate probability that a donor becomes regular based on wealth + duration + channel"""
+    def _calculate_regular_donor_probability(self, donation_dates, amount_deciles, channel):
+        """Calculate, for a batch of donations, the probability that each donor becomes regular
+        based on wealth + duration + channel"""
         # Base rate
         base_rate = self.GLOBAL_REGULAR_DONOR_RATE
         
         # Channel-specific rate
-        channel_rate = channel_data.get('regular_donor_rate', 0.08)
+        channel_rate = channel.regular_donor_rate
         
-        # Wealth multiplier
-        wealth_category = self._calculate_wealth_category(amount_decile)
-        wealth_multiplier = channel_data.get('regular_donor_wealth_multiplier', {}).get(wealth_category, 1.0)
+        # Wealth multiplier, looked up by wealth category (0 low, 1 medium, 2 high)
+        deciles = np.asarray(amount_deciles)
+        wealth_index = (deciles >= 5).astype(np.intp) + (deciles >= 8)
+        wealth_multiplier = channel.wealth_multipliers[wealth_index]
         
         # Duration factor (based on how early in the period the donation occurs)
         # Earlier donations (longer tenure) have higher probability
-        years_since_start = (donation_date.year - self.FIRST_YEAR) + (donation_date.timetuple().tm_yday / 365.25)
+        dates = np.asarray(donation_dates).astype('datetime64[D]')
+        years = dates.astype('datetime64[Y]')
+        day_of_year = (dates - years.astype('datetime64[D]')).astype(np.int64) + 1
+        years_since_start = (years.astype(np.int64) + 1970 - self.FIRST_YEAR) + (day_of_year / 365.25)
         max_years = self.YEARS
-        duration_factor = min(1.0, (years_since_start / max(1, max_years * 0.6)))  # Normalize to 60% of period
+        duration_factor = np.minimum(1.0, years_since_start / max(1, max_years * 0.6))  # Normalize to 60% of period
         
         # Combined probability formula
         probability = base_rate * channel_rate * wealth_multiplier * (0.5 + 0.5 * duration_factor)
         
         # Cap at reasonable maximum (60% to allow for higher rates)
-        probability = min(probability, 0.6)
+        probability = np.minimum(probability, 0.6)
         
         return probability
 
-    def _generate_monthly_donations(self, contact_id, first_donation_date, channel_name, channel_data, 
-                                   campaign_name, campaign_start, campaign_end):
-        """Generate all monthly donations for a regular donor"""
-        # Get monthly donation amount
-        monthly_avg = channel_data.get('regular_donor_monthly_avg', 30)
-        monthly_std = monthly_avg * 0.3  # 30% standard deviation
-        
-        # Start from the month after first donation (same day of month, or 1st if day > 28)
-        if first_donation_date.day > 28:
-            day_of_month = 1
-        else:
-            day_of_month = first_donation_date.day
-        
-        # Calculate next month
-        if first_donation_date.month == 12:
-            start_date = datetime(first_donation_date.year + 1, 1, day_of_month)
-        else:
-            start_date = datetime(first_donation_date.year, first_donation_date.month + 1, day_of_month)
-        
-        # End date: end of generation period
-        end_date = datetime(self.FIRST_YEAR + self.YEARS, 12, 31)
-        
-        # Calculate number of months
-        months_diff = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
-        if end_date.day >= day_of_month:
-            months_diff += 1
-        
-        if months_diff <= 0:
-            return []
-        
-        # Pre-generate all dates efficiently
-        dates = []
-        current_date = start_date
-        for _ in range(months_diff):
-            if current_date > end_date:
-                break
-            dates.append(current_date)
-            # Move to next month
-            if current_date.month == 12:
-                current_date = datetime(current_date.year + 1, 1, day_of_month)
-            else:
-                current_date = datetime(current_date.year, current_date.month + 1, day_of_month)
-        
-        # Pre-generate payment methods (more efficient)
-        payment_methods_list = list(channel_data['payment'].items())
-        
-        # Generate all donations at once using list comprehensions (much faster)
-        monthly_donations = [
-            {
-                'date': date,
-                'campaign_start': campaign_start,
-                'campaign_end': campaign_end,
-                'channel': channel_name,
-                'campaign_name': f"Monthly Recurring - {campaign_name}",
-                'campaign_type': 'recurring',
-                'donation_amount': round(max(1, random.gauss(monthly_avg, monthly_std)), 2),
-                'cost': round(channel_data['cost_per_reach'] * 0.1, 2),
-                'reactivity': 1.00,
-                'contact_id': contact_id,
-                'payment_method': self.select_by_probability(payment_methods_list)
-            }
-            for date in dates
-        ]
-        
-        return monthly_donations
-
     def _create_campaign_transactions(self, nb_reach, nb_sent, contact_ids, code_source, 
-                                   channel_name, channel_data, campaign_type):
-        """Create transactions for a campaign"""
+                                   channel_name, channel, campaign_type, draws=None):
+        """Create transactions for a campaign from its drawn dates, amounts and payment methods"""
         num_transactions = len(contact_ids)
         if num_transactions == 0:
             return pd.DataFrame()
 
-        # Generate transaction dates
-        transaction_dates = self.generate_transaction_dates(
-            num_transactions, 
-            channel_data['distribution'],
-            code_source['start'],
-            code_source['end']
-        )
+        if draws is None:
+            draws = draw_campaign_batch(self._campaign_draw_task(num_transactions, code_source, channel, key=()))
 
-        # Create base transaction data
         transactions_data = {
-            'date': transaction_dates,
+            'date': draws['date'],
             'campaign_start': code_source['start'],
             'campaign_end': code_source['end'],
             'channel': channel_name,
             'campaign_name': code_source['name'],
             'campaign_type': campaign_type,
-            'donation_amount': [
-                max(1, random.gauss(code_source['avg_donation'], code_source['std_deviation']))
-                for _ in range(num_transactions)
-            ],
-            'cost': nb_reach * channel_data['cost_per_reach'] / num_transactions,
+            'donation_amount': draws['donation_amount'],
+            'cost': nb_reach * channel.cost_per_reach / num_transactions,
             'reactivity': nb_reach / num_transactions,
-            'contact_id': contact_ids
+            'contact_id': contact_ids,
+            'payment_method': draws['payment_method']
         }
 
-        # Add payment methods
-        transactions_data['payment_method'] = [
-            self.select_by_probability(list(channel_data['payment'].items()))
-            for _ in range(num_transactions)
-        ]
+        # Calculate deciles (on the drawn amounts, before the compact cast)
+        campaign_deciles = self.decile_assigner.campaign_deciles(draws['donation_amount'])
+        transactions_data['amount_decile'] = campaign_deciles
 
-        # Create DataFrame
-        transactions_campaign = pd.DataFrame(transactions_data)
-        
-        # Calculate deciles
-        transactions_campaign['amount_decile'] = pd.qcut(
-            transactions_campaign['donation_amount'], 
-            10, 
-            labels=False, 
-            duplicates='drop'
-        ) + 1
-
-        # Determine regular donors and generate monthly donations
+        # Create DataFrame, directly in the compact schema
+        transactions_campaign = schema_frame(transactions_data, TRANSACTION_SCHEMA)
+
+        # Determine regular donors in one batch over the campaign
         # Only check on first donation per contact
-        monthly_transactions_list = []
-        regular_donors_this_campaign = 0
-        
-        # Use itertuples for better performance
-        for row in transactions_campaign.itertuples():
-            contact_id = row.contact_id
-            donation_date = row.date
-            amount_decile = row.amount_decile
-            # Update donation count
-            current_count = self.contact_donation_counts.get(contact_id, 0) + 1
-            self.contact_donation_counts[contact_id] = current_count
-            
-            # Skip if already a regular donor
-            if contact_id in self.regular_donors:
-                continue
-            
-            # Check if this is the first donation for this contact
-            is_first_donation = contact_id not in self.contact_first_donations
-            if is_first_donation:
-                self.contact_first_donations[contact_id] = {
-                    'date': donation_date,
-                    'decile': amount_decile,
-                    'channel': channel_name,
-                    'campaign': code_source['name']
-                }
-            
-            # Only determine regular status on first donation
-            if is_first_donation:
-                # Calculate probability of becoming regular donor
-                probability = self._calculate_regular_donor_probability(
-                    contact_id, donation_date, amount_decile, channel_data
-                )
-                
-                # Determine if becomes regular donor
-                if random.random() < probability:
-                    self.regular_donors.add(contact_id)
-                    regular_donors_this_campaign += 1
-                    self.regular_donor_conversion_counts[contact_id] = current_count
-                    
-                    # Generate all monthly donations starting from month after first donation
-                    monthly_donations = self._generate_monthly_donations(
-                        contact_id,
-                        donation_date,
-                        channel_name,
-                        channel_data,
-                        code_source['name'],
-                        code_source['start'],
-                        code_source['end']
-                    )
-                    
-                    if monthly_donations:
-                        monthly_transactions_list.extend(monthly_donations)
-        
-        if regular_donors_this_campaign > 0:
-            total_monthly = len(monthly_transactions_list)
+        rows = self.donor_state.rows(contact_ids)
+        donation_counts = self.donor_state.record_donations(rows)
+
+        # A contact's first donation is only recorded once, and regular donors are skipped
+        _, first_positions = np.unique(rows, return_index=True)
+        is_candidate = np.zeros(num_transactions, dtype=bool)
+        is_candidate[first_positions] = True
+        is_candidate &= ~self.donor_state.is_regular[rows] & np.isnat(self.donor_state.first_date[rows])
+
+        candidates = np.flatnonzero(is_candidate)
+        donation_dates = np.asarray(draws['date']).astype('datetime64[D]')
+        self.donor_state.record_first_donations(rows[candidates], donation_dates[candidates])
+
+        # Calculate probability of becoming regular donor and draw all conversions at once
+        probabilities = self._calculate_regular_donor_probability(
+            donation_dates[candidates], campaign_deciles[candidates], channel
+        )
+        converted = candidates[self.rng.random(len(candidates)) < probabilities]
+        self.donor_state.mark_regular(rows[converted], donation_counts[converted])
+        new_regular_donors = np.asarray(contact_ids)[converted]
+        new_regular_dates = donation_dates[converted]
+
+        # Record the schedules of every donor converted in this campaign at once
+        # (monthly rows are expanded later, per channel and year, or lazily at export)
+        if len(new_regular_donors):
+            batch = self.recurring_schedule.add_batch(
+                new_regular_donors,
+                new_regular_dates,
+                channel,
+                code_source['name'],
+                code_source['start'],
+                code_source['end'],
+                seed=self.rng.integers(0, 2**31 - 1),
+                decile_cut_points=self.decile_assigner.cut_points
+            )
+            total_monthly = int(batch['num_months'].sum())
+
             if total_monthly > 0:
                 import sys
-                print(f"         → Generated {regular_donors_this_campaign} regular donors with {total_monthly:,} monthly donations")
+                print(f"         → Generated {len(new_regular_donors)} regular donors with {total_monthly:,} monthly donations")
                 sys.stdout.flush()
-        
-        # Add monthly donations to transactions
-        if monthly_transactions_list:
-            monthly_df = pd.DataFrame(monthly_transactions_list)
-            # Calculate deciles for monthly donations
-            monthly_df['amount_decile'] = pd.qcut(
-                monthly_df['donation_amount'], 
-                10, 
-                labels=False, 
-                duplicates='drop'
-            ) + 1
-            transactions_campaign = pd.concat([transactions_campaign, monthly_df], ignore_index=True)
 
         return transactions_campaign
 
-    def _generate_contacts(self, transactions):
-        """Generate contact information for all transactions"""
+    def _generate_contacts(self, contact_ids=None, contact_pools=None):
+        """Generate contact information for the given donors (default: every donor),
+        from the per-donor rollup of the donor state, with the given Faker value
+        pools (default: the generator's pools)"""
         import sys
         print("\n👥 Generating contacts from transactions...")
         sys.stdout.flush()
-        # Group transactions by contact_id and get their maximum decile
-        grouped_transactions = transactions.groupby('contact_id')['amount_decile'].max().reset_index()
-        
-        total_contacts = len(grouped_transactions)
+        if contact_ids is None:
+            contact_ids = self.donor_state.donors()
+
+        total_contacts = len(contact_ids)
         print(f"   → Preparing {total_contacts:,} contacts")
         sys.stdout.flush()
 
-        transactions_dates = transactions[['contact_id', 'date']].groupby('contact_id')['date'].min()
-        
-        contacts_data = []
-        sal_civilities = [sal['civility'] for sal in self.SALUTATIONS]
-        sal_probabilities = [sal['probability'] for sal in self.SALUTATIONS]
-        
-        for idx, row in enumerate(grouped_transactions.itertuples(), 1):
-            contact_id = row.contact_id
-            max_decile = row.amount_decile
-            
-            # Generate basic contact info
-            chosen_salutation = np.random.choice(sal_civilities, p=sal_probabilities)
-            chosen_gender = next(sal['gender'] for sal in self.SALUTATIONS 
-                                 if sal['civility'] == chosen_salutation)
-
-            # Generate name based on gender
-            if chosen_gender == "male":
-                first_name = self.fake.first_name_male()
-            elif chosen_gender == "female":
-                first_name = self.fake.first_name_female()
-            else:
-                first_name = self.fake.first_name()
-
-            # Assign job based on decile
-            job = np.random.choice(self.WEALTHY_JOB if max_decile > 7 else self.NON_WEALTHY_JOB)
-
-            # Find first transaction date (pre-computed for performance)
-            first_transaction_date = transactions_dates[contact_id]
-
-            # Create contact record
-            contact_data = {
-                'contact_id': contact_id,
-                'salutation': chosen_salutation,
-                'gender': chosen_gender,
-                'first_name': first_name,
-                'last_name': self.fake.last_name(),
-                'phone': self.fake.phone_number(),
-                'address_1': self.fake.street_address(),
-                'address_2': self.fake.building_number() if random.random() > 0.5 else '',
-                'zip_code': self.fake.postcode(),
-                'city': self.fake.city(),
-                'country': self.fake.country(),
-                'job': job,
-                'origin_decile': max_decile,
-                'Creation_date': first_transaction_date,
-                'Creation_year': first_transaction_date.year,
-                'nb_donations_before_regular': self.regular_donor_conversion_counts.get(contact_id, 0)
-            }
-            
-            contacts_data.append(contact_data)
-
-            if idx % 5000 == 0 or idx == total_contacts:
-                print(f"      → Generated {idx:,}/{total_contacts:,} contacts")
-                sys.stdout.flush()
+        # Enrich contacts in fixed-size chunks, each with its own random substream
+        tasks = self._contact_enrichment_tasks(contact_ids, contact_pools)
+        contact_chunks = self.worker_pool.map(enrich_contacts_task, tasks)
+        if contact_chunks:
+            contacts_df = concat_frames(contact_chunks)
+        else:
+            contacts_df = pd.DataFrame()
 
-        print(f"   ✓ Contacts generation completed ({len(contacts_data):,} records)")
+        print(f"   ✓ Contacts generation completed ({len(contacts_df):,} records)")
         sys.stdout.flush()
-        return pd.DataFrame(contacts_data)
+        return contacts_df
+
+    def _contact_enrichment_tasks(self, contact_ids, contact_pools=None):
+        """Split contacts into fixed-size enrichment work units, with their rollup from the donor state"""
+        if contact_pools is None:
+            contact_pools = self.contact_pools
+        total_contacts = len(contact_ids)
+        pools = contact_pools.build(total_contacts)
+        max_deciles = self.donor_state.max_deciles(contact_ids)
+        first_dates = self.donor_state.min_date[contact_ids].astype('datetime64[ns]')
+        conversion_counts = self.donor_state.conversion_count[contact_ids]
+        return [
+            {
+                'entropy': self.entropy,
+                'chunk': chunk,
+                'pools': pools,
+                'pool_size': contact_pools.pool_size,
+                'offset': start,
+                'contact_ids': contact_ids[start:start + CONTACT_CHUNK_SIZE],
+                'max_deciles': max_deciles[start:start + CONTACT_CHUNK_SIZE],
+                'first_dates': first_dates[start:start + CONTACT_CHUNK_SIZE],
+                'conversion_counts': conversion_counts[start:start + CONTACT_CHUNK_SIZE],
+                'salutations': self.COMPILED_SALUTATIONS,
+                'wealthy_jobs': self.WEALTHY_JOB,
+                'non_wealthy_jobs': self.NON_WEALTHY_JOB,
+            }
+            for chunk, start in enumerate(range(0, total_contacts, CONTACT_CHUNK_SIZE))
+        ]
+
+    def _reset_generation_state(self):
+        """Reset donor state (first donations, donation counts, regular status) for a new generation"""
+        self.donor_state = DonorStateTable(channels=self.CHANNELS)
+        self.recurring_schedule = RecurringSchedule(self.recurring_calendar)
+        self.decile_assigner.reset()
 
     def generate(self):
         """Generate fundraising dataset"""
         import sys
         print(f"\n🔄 Starting data generation for {self.YEARS} years ({self.FIRST_YEAR} to {self.FIRST_YEAR + self.YEARS - 1})...")
         sys.stdout.flush()
-        transactions = pd.DataFrame()
-        # Reset regular donors tracking for new generation
-        self.regular_donors = set()
-        # Track first donation per contact to determine regular status only once
-        self.contact_first_donations = {}
-        # Track donation counts per contact and conversion stats
-        self.contact_donation_counts = {}
-        self.regular_donor_conversion_counts = {}
-
-        # Iterate through each year
-        for year in range(self.YEARS):
-            current_year = self.FIRST_YEAR + year
-            print(f"\n📅 Processing year {current_year} ({year + 1}/{self.YEARS})...")
-            sys.stdout.flush()
-            
-            # Generate transactions for each channel
-            for channel_name, channel_data in self.CHANNELS.items():
-                print(f"   → Generating transactions for channel: {channel_name}")
+        transactions = TransactionAccumulator()
+        self._reset_generation_state()
+
+        with WorkerPool(self.WORKERS) as self.worker_pool:
+            # Iterate through each year
+            for year in range(self.YEARS):
+                current_year = self.FIRST_YEAR + year
+                print(f"\n📅 Processing year {current_year} ({year + 1}/{self.YEARS})...")
                 sys.stdout.flush()
-                transactions_before = len(transactions)
-                transactions = self._generate_channel_transactions(
-                    transactions, channel_name, channel_data, current_year
-                )
-                transactions_added = len(transactions) - transactions_before
-                print(f"   ✓ Added {transactions_added:,} transactions for {channel_name}")
+                
+                # Generate transactions for each channel
+                for channel_name, channel_data in self.CHANNELS.items():
+                    print(f"   → Generating transactions for channel: {channel_name}")
+                    sys.stdout.flush()
+                    transactions_before = len(transactions)
+                    self._generate_channel_transactions(
+                        transactions, channel_name, channel_data, current_year
+                    )
+                    transactions_added = len(transactions) - transactions_before
+                    print(f"   ✓ Added {transactions_added:,} transactions for {channel_name}")
+                    sys.stdout.flush()
+
+            # Monthly gifts run one year past the generated years
+            if not self.LAZY_RECURRING:
+                for channel_name in self.CHANNELS:
+                    self._expand_recurring_year(transactions, channel_name, self.FIRST_YEAR + self.YEARS)
+
+            transactions = transactions.to_frame()
+            contacts_df = self._summarize_and_generate_contacts(transactions)
+
+        # Contacts are integer IDs internally; external 8-character IDs are only produced for output
+        self._format_contact_ids(transactions)
+        self._format_contact_ids(contacts_df)
+
+        return transactions, contacts_df
+
+    def iter_generate(self):
+        """Generate the dataset as a stream of bounded chunks.
+
+        Yields one transactions chunk per year and channel (its campaign gifts,
+        then the monthly gifts of the channel's regular donors dated in that
+        year), a recurring-only chunk per channel for the year after the last
+        generated one, then the contacts in chunks. With LAZY_RECURRING the
+        year and channel chunks only hold the campaign gifts, and the monthly
+        gifts follow as recurring-only chunks per calendar year and channel,
+        expanded from the schedules once every campaign is generated. Only the
+        donor state and the compact recurring schedules are kept across
+        chunks, so memory does not grow with the number of transactions.
+
+        Yields:
+            GenerationChunk: (kind, year, channel, frame) with kind 'transactions' or 'contacts'
+        """
+        import sys
+        print(f"\n🔄 Streaming data generation for {self.YEARS} years ({self.FIRST_YEAR} to {self.FIRST_YEAR + self.YEARS - 1})...")
+        sys.stdout.flush()
+        self._reset_generation_state()
+
+        with WorkerPool(self.WORKERS) as self.worker_pool:
+            for year in range(self.YEARS):
+                current_year = self.FIRST_YEAR + year
+                print(f"\n📅 Processing year {current_year} ({year + 1}/{self.YEARS})...")
                 sys.stdout.flush()
 
+                for channel_name, channel_data in self.CHANNELS.items():
+                    chunk = TransactionAccumulator()
+                    self._generate_channel_transactions(chunk, channel_name, channel_data, current_year)
+                    transactions_chunk = chunk.to_frame()
+                    if not transactions_chunk.empty:
+                        yield GenerationChunk(
+                            'transactions', current_year, channel_name,
+                            self._format_transactions_chunk(transactions_chunk)
+                        )
+
+            # Monthly gifts run one year past the generated years; lazy schedules are
+            # only expanded now, for every calendar year
+            if self.LAZY_RECURRING:
+                recurring_years = self.recurring_calendar.calendar_years
+            else:
+                recurring_years = [self.FIRST_YEAR + self.YEARS]
+            for recurring_year in recurring_years:
+                for channel_name in self.CHANNELS:
+                    chunk = self._expand_recurring_year(TransactionAccumulator(), channel_name, recurring_year)
+                    transactions_chunk = chunk.to_frame()
+                    if not transactions_chunk.empty:
+                        yield GenerationChunk(
+                            'transactions', recurring_year, channel_name,
+                            self._format_transactions_chunk(transactions_chunk)
+                        )
+
+            # Final contacts pass, driven by the per-donor rollup
+            contact_ids = self.donor_state.donors()
+            print(f"\n👥 Generating {len(contact_ids):,} contacts...")
+            sys.stdout.flush()
+            tasks = self._contact_enrichment_tasks(contact_ids)
+            # Enrich at most one chunk per worker at a time to keep memory bounded
+            for start in range(0, len(tasks), self.worker_pool.workers):
+                for contacts_chunk in self.worker_pool.map(
+                    enrich_contacts_task, tasks[start:start + self.worker_pool.workers]
+                ):
+                    yield GenerationChunk('contacts', None, None, self._format_contact_ids(contacts_chunk))
+
+            if self.DONOR_SUMMARY:
+                for summary_chunk in self.iter_donor_summary():
+                    yield GenerationChunk('donors', None, None, summary_chunk)
+
+    def preview(self, max_donors=PREVIEW_MAX_DONORS):
+        """Generate a small, statistically faithful slice of the dataset.
+
+        Only the first year is generated (none when YEARS is 0), with the
+        regular channel and campaign logic; monthly gifts are cut at the end
+        of that year. A
+        uniform sample of at most max_donors donors is kept with all their
+        transactions, and only their contacts are enriched.
+
+        Args:
+            max_donors (int): Maximum number of donors in the slice
+
+        Returns:
+            tuple: (transactions, contacts) DataFrames with external contact IDs
+        """
+        self._reset_generation_state()
+        transactions = TransactionAccumulator()
+        # A configuration generating no year at all previews no year either
+        channels = self.CHANNELS.items() if self.YEARS > 0 else ()
+        with WorkerPool(1) as self.worker_pool:
+            for channel_name, channel_data in channels:
+                self._generate_channel_transactions(
+                    transactions, channel_name, channel_data, self.FIRST_YEAR, expand_recurring=True
+                )
+            transactions = transactions.to_frame()
+            if transactions.empty:
+                return transactions, pd.DataFrame()
+
+            donors = transactions['contact_id'].unique()
+            if len(donors) > max_donors:
+                sample = substream(self.entropy, PREVIEW_SAMPLE).choice(donors, max_donors, replace=False)
+                transactions = transactions[transactions['contact_id'].isin(sample)]
+            transactions = transactions.sort_values('date', kind='stable').reset_index(drop=True)
+            # Few contacts: one Faker value per contact is faster than building the full pools
+            contacts = self._generate_contacts(
+                np.unique(transactions['contact_id'].to_numpy()), ContactAttributePools(self.fake, 0)
+            )
+
+        self._format_contact_ids(transactions)
+        self._format_contact_ids(contacts)
+        return transactions, contacts
+
+    def _summarize_and_generate_contacts(self, transactions):
+        """Print the generation summary and generate the contacts"""
+        import sys
+
+        if self.LAZY_RECURRING:
+            # Monthly rows are not materialized: the rollup only draws the gifts of the schedules,
+            # year by year and at most one batch per worker at a time to keep memory bounded
+            for year in self.recurring_calendar.calendar_years:
+                batches = self.recurring_schedule.batches_in_year(year)
+                draw_gifts = partial(schedule_batch_gifts, self.recurring_calendar, year=year)
+                for start in range(0, len(batches), self.worker_pool.workers):
+                    batch_slice = batches[start:start + self.worker_pool.workers]
+                    for batch, gifts in zip(batch_slice, self.worker_pool.map(draw_gifts, batch_slice)):
+                        self.donor_state.observe_transactions(
+                            gifts['contact_id'], gifts['date'], gifts['amount_decile'], gifts['donation_amount'],
+                            self.donor_state.channel_code(batch['channel'])
+                        )
+
         print(f"\n📊 Generation summary:")
         sys.stdout.flush()
-        unique_contacts = transactions['contact_id'].nunique()
+        unique_contacts = len(self.donor_state.donors())
         print(f"   • Total transactions: {len(transactions):,}")
+        if self.LAZY_RECURRING:
+            print(f"   • Recurring donations (lazy schedules): {len(self.recurring_schedule):,}")
         print(f"   • Unique contacts: {unique_contacts:,}")
-        print(f"   • Regular donors identified: {len(self.regular_donors):,}")
+        print(f"   • Regular donors identified: {self.donor_state.num_regular:,}")
         if unique_contacts > 0:
-            regular_rate = len(self.regular_donors) / unique_contacts
+            regular_rate = self.donor_state.num_regular / unique_contacts
             print(f"   • Regular donor rate: {regular_rate:.2%}")
         sys.stdout.flush()
         
         print(f"\n👥 Generating contact information...")
-        # Generate contacts data based on transactions
-        contacts_df = self._generate_contacts(transactions)
+        # Generate contacts data from the donor rollup
+        contacts_df = self._generate_contacts()
         print(f"   ✓ Generated {len(contacts_df):,} contacts")
-
-        return transactions, contacts_df
-
-    def _generate_channel_transactions(self, transactions, channel_name, channel_data, current_year):
-        """Generate transactions for a specific channel"""
-        total_campaigns = sum(campaign_info.get('nb', 1) for campaign_info in channel_data['campaigns'].values())
+        return contacts_df
+
+    def iter_donor_summary(self, chunk_size=CONTACT_CHUNK_SIZE):
+        """Yield the donor summary of the last generation in bounded chunks.
+
+        One row per donor, from the per-donor rollup of every transaction:
+        nb_donations, total_donated, avg_donation, first_donation,
+        last_donation, max_amount_decile, primary_channel and is_regular.
+
+        Args:
+            chunk_size (int): Donors per chunk
+
+        Yields:
+            pd.DataFrame: Donor summary rows, with external contact IDs
+        """
+        contact_ids = self.donor_state.donors()
+        for start in range(0, len(contact_ids), chunk_size):
+            yield self._format_contact_ids(self.donor_state.summary(contact_ids[start:start + chunk_size]))
+
+    def iter_transaction_frames(self, transactions):
+        """Yield the transactions returned by generate(), followed by the
+        recurring donations when they are kept as lazy schedules"""
+        yield transactions
+        if self.LAZY_RECURRING:
+            for monthly_df in self.recurring_schedule.iter_frames():
+                yield self._format_transactions_chunk(monthly_df)
+
+    def _observe_transactions(self, frame):
+        """Fold a chunk of transactions into the per-donor rollup of the donor state"""
+        if not frame.empty:
+            channels = frame['channel'].array
+            channel_codes = np.array(
+                [self.donor_state.channel_code(channel_name) for channel_name in channels.categories], dtype=np.intp
+            )
+            self.donor_state.observe_transactions(
+                frame['contact_id'].to_numpy(),
+                frame['date'].to_numpy(),
+                decile_values(frame['amount_decile']),
+                frame['donation_amount'].to_numpy(),
+                channel_codes[channels.codes]
+            )
+
+    def _format_transactions_chunk(self, frame):
+        """Prepare a transactions chunk for output: external contact IDs, and
+        the compact schema so that every chunk is written the same way"""
+        apply_schema(frame, TRANSACTION_SCHEMA)
+        return self._format_contact_ids(frame)
+
+    def _format_contact_ids(self, frame):
+        """Replace integer contact IDs with their external 8-character form (in place)"""
+        if 'contact_id' in frame.columns:
+            frame['contact_id'] = format_contact_ids(frame['contact_id'].to_numpy())
+        return frame
+
+    def _generate_channel_transactions(self, transactions, channel_name, channel_data, current_year,
+                                       expand_recurring=None):
+        """Generate transactions for a specific channel into the given accumulator
+
+        Campaigns are first planned sequentially (metadata and contacts), their
+        independent draws then run on the worker pool, and the conversion pass
+        is finally applied in campaign order.
+        """
+        import sys
+        channel = self.COMPILED_CHANNELS[channel_name]
+        total_campaigns = sum(campaign_info.get('nb', 1) for _, campaign_info in channel.campaigns)
         campaign_count = 0
+        planned_campaigns = []
         
-        for campaign_type, campaign_info in channel_data['campaigns'].items():
+        for campaign_type, campaign_info in channel.campaigns:
             num_campaigns = campaign_info.get('nb', 1)
             
             for campaign_num in range(num_campaigns):
                 campaign_count += 1
-                import sys
                 if campaign_count % 5 == 0 or campaign_count == 1:
                     print(f"      → Campaign {campaign_count}/{total_campaigns} ({campaign_type})...")
                     sys.stdout.flush()
                 
                 # Get campaign metadata
                 code_source = self._generate_campaign_metadata(
-                    channel_name, channel_data, campaign_type, campaign_info, current_year
+                    channel_name, channel, campaign_type, campaign_info, current_year
                 )
 
-                # Generate contacts and transactions
-                randomness = random.uniform(0.85, 1.15)
+                # Generate contacts
+                randomness = self.rng.uniform(0.85, 1.15)
                 nb_reach, nb_sent, contact_ids = self.contact_manager.get_or_create_contacts(
                     campaign_type, channel_name, randomness
                 )
 
-                if contact_ids:
-                    transactions_before = len(transactions)
-                    transactions_campaign = self._create_campaign_transactions(
-                        nb_reach, nb_sent, contact_ids, code_source,
-                        channel_name, channel_data, campaign_type
+                if len(contact_ids):
+                    planned_campaigns.append(
+                        (campaign_count, campaign_type, code_source, nb_reach, nb_sent, contact_ids)
                     )
-                    transactions = pd.concat([transactions, transactions_campaign], ignore_index=True)
-                    if campaign_count % 5 == 0:
-                        print(f"         ✓ Added {len(transactions) - transactions_before:,} transactions")
-                        sys.stdout.flush()
-        
-        return transactions
\ No newline at end of file
+
+        # Draw dates, amounts and payment methods of every campaign, possibly in parallel
+        campaign_draws = self.worker_pool.map(draw_campaign_batch, [
+            self._campaign_draw_task(
+                len(contact_ids), code_source, channel, key=(current_year, channel.index, campaign_number)
+            )
+            for campaign_number, _, code_source, _, _, contact_ids in planned_campaigns
+        ])
+
+        for (campaign_number, campaign_type, code_source, nb_reach, nb_sent, contact_ids), draws in zip(
+            planned_campaigns, campaign_draws
+        ):
+            transactions_before = len(transactions)
+            transactions_campaign = self._create_campaign_transactions(
+                nb_reach, nb_sent, contact_ids, code_source,
+                channel_name, channel, campaign_type, draws=draws
+            )
+            transactions.append(transactions_campaign)
+            self._observe_transactions(transactions_campaign)
+            if campaign_number % 5 == 0:
+                print(f"         ✓ Added {len(transactions) - transactions_before:,} transactions")
+                sys.stdout.flush()
+
+        # Expand the monthly gifts of the channel's regular donors dated in this year;
+        # lazy mode keeps only the schedules and expands them at export time
+        if expand_recurring is None:
+            expand_recurring = not self.LAZY_RECURRING
+        if expand_recurring:
+            self._expand_recurring_year(transactions, channel_name, current_year)
+        
+        return transactions
+
+    def _expand_recurring_year(self, transactions, channel_name, current_year):
+        """Expand the monthly gifts of a channel's recurring schedules dated in one
+        calendar year into the given accumulator"""
+        for monthly_df in self.worker_pool.map(
+            partial(expand_schedule_batch, self.recurring_calendar, year=current_year),
+            self.recurring_schedule.batches_in_year(current_year, channel_name)
+        ):
+            if not monthly_df.empty:
+                transactions.append(monthly_df)
+                self._observe_transactions(monthly_df)
+        return transactions
@@ -0,0 +1,404 @@
+"""
+Asynchronous generation jobs.
+
+Jobs run on a local process pool, so no external broker is needed. Their
+state lives on disk, one directory per job holding ``job.json`` and, once
+done, the ``artifact.zip``. Any web worker can therefore report the status
+of, or serve, a job started by another one. Finished jobs are deleted once
+older than the retention period.
+
+Each queue holds a lock file for as long as its process lives. Jobs left
+queued or running by a process that stopped (e.g. a restart) are found
+through their owner's released lock and marked as failed.
+
+Job processes are spawned rather than forked: the queue lives in a threaded
+web process, which cannot be forked safely. A job then runs its generation
+with the WORKERS of its configuration, on its own worker pool, so a queue
+uses up to GENERATION_JOB_WORKERS times WORKERS processes.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: job owners cannot be checked there
+    fcntl = None
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+ARTIFACT_NAME = 'artifact.zip'
+# Directory of the owner lock files, inside the store
+OWNERS_DIR = '.owners'
+
+# Share of the progress of each stage: transactions up to the contacts share,
+# 1.0 is only reached once the archive is complete
+STAGE_PROGRESS = {'contacts': 0.9, 'donors': 0.95}
+
+# Finished jobs (and their artifacts) are kept this long by default
+DEFAULT_RETENTION_SECONDS = 24 * 3600
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """On-disk store of job states and artifacts."""
+
+    def __init__(self, root: str):
+        """Create the store.
+
+        Args:
+            root (str): Directory holding one sub-directory per job
+        """
+        self.root = root
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def artifact_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), ARTIFACT_NAME)
+
+    def create(self, options: dict, owner: Optional[str] = None) -> dict:
+        """Register a new queued job.
+
+        Args:
+            options (dict): Output options of the job (output_format, campaign_table, seed)
+            owner (str): Owner token of the queue running the job (see register_owner)
+
+        Returns:
+            dict: The job state
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        job = {
+            'job_id': job_id,
+            'status': QUEUED,
+            'stage': QUEUED,
+            'progress': 0.0,
+            'options': options,
+            'seed': None,
+            'filename': None,
+            'error': None,
+            'owner': owner,
+            'created_at': _now(),
+            'updated_at': _now(),
+        }
+        self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the state of a job, or None if it does not exist."""
+        # Job IDs are hex strings; anything else cannot name a job directory
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(os.path.join(self.job_dir(job_id), 'job.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def update(self, job_id: str, **fields) -> dict:
+        """Update fields of a job state.
+
+        Args:
+            job_id (str): The job
+            **fields: Fields to set
+
+        Returns:
+            dict: The updated state
+        """
+        job = self.get(job_id)
+        job.update(fields, updated_at=_now())
+        self._write(job)
+        return job
+
+    def register_owner(self):
+        """Register the calling process as the owner of the jobs it queues.
+
+        The owner's lock file stays locked for as long as the returned file
+        is open, i.e. until the process exits.
+
+        Returns:
+            tuple: (owner token, open lock file to keep referenced)
+        """
+        token = uuid.uuid4().hex
+        if fcntl is None:
+            return token, None
+        directory = os.path.join(self.root, OWNERS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        lock_file = open(os.path.join(directory, token), 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return token, lock_file
+
+    def owner_alive(self, token: Optional[str]) -> bool:
+        """Whether the process that registered an owner token is still running."""
+        if token is None:
+            # Jobs queued before owners were recorded
+            return False
+        if fcntl is None:
+            return True
+        path = os.path.join(self.root, OWNERS_DIR, token)
+        try:
+            lock_file = open(path)
+        except FileNotFoundError:
+            return False
+        with lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        # The lock was free: its process is gone
+        os.remove(path)
+        return False
+
+    def fail_orphaned_jobs(self) -> int:
+        """Mark the queued or running jobs whose owner process stopped as failed.
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        failed = 0
+        owners = {}
+        for job_id in os.listdir(self.root):
+            job = self.get(job_id)
+            if job is None or job['status'] not in (QUEUED, RUNNING):
+                continue
+            owner = job.get('owner')
+            if owner not in owners:
+                owners[owner] = self.owner_alive(owner)
+            if not owners[owner]:
+                self.update(job_id, status=FAILED, error='Interrupted: the process running the job stopped')
+                failed += 1
+        # Lock files of stopped processes that left no job behind
+        owners_dir = os.path.join(self.root, OWNERS_DIR)
+        if os.path.isdir(owners_dir):
+            for token in os.listdir(owners_dir):
+                if token not in owners:
+                    self.owner_alive(token)
+        return failed
+
+    def cleanup(self, retention_seconds: float) -> int:
+        """Fail orphaned jobs, then delete the finished jobs last updated more
+        than retention_seconds ago.
+
+        Args:
+            retention_seconds (float): Retention period of finished jobs (0 keeps them forever)
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        self.fail_orphaned_jobs()
+        if retention_seconds <= 0 or not os.path.isdir(self.root):
+            return 0
+        now = datetime.now(timezone.utc)
+        deleted = 0
+        for job_id in os.listdir(self.root):
+            job = self.get(job_id)
+            if job is None or job['status'] not in (SUCCEEDED, FAILED):
+                continue
+            if (now - datetime.fromisoformat(job['updated_at'])).total_seconds() > retention_seconds:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                deleted += 1
+        return deleted
+
+    def _write(self, job: dict) -> None:
+        # Write then rename, so readers never see a partial state
+        directory = self.job_dir(job['job_id'])
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, os.path.join(directory, 'job.json'))
+
+
+def run_generation_job(root: str, job_id: str, config_data: dict, cache=None) -> None:
+    """Run one generation job and store its artifact (executed in a pool worker).
+
+    Args:
+        root (str): JobStore directory
+        job_id (str): The job
+        config_data (dict): Generator configuration (SEED already applied)
+        cache (DatasetCache): Cache of generated archives (default: the one of the Django settings)
+    """
+    from .cache import archive_entry_suffix, dataset_cache_key, get_dataset_cache
+    from .export import iter_dataset_archive
+    from .generator import FundraisingDataGenerator
+
+    store = JobStore(root)
+    options = store.get(job_id)['options']
+    try:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if cache is None:
+            cache = get_dataset_cache()
+        cache_key = dataset_cache_key(config_data, options['output_format'], options['campaign_table'])
+        cached_file = cache.open(cache_key)
+        if cached_file is not None:
+            with cached_file, open(store.artifact_path(job_id), 'wb') as f:
+                shutil.copyfileobj(cached_file, f)
+            store.update(
+                job_id, status=SUCCEEDED, stage='done', progress=1.0, seed=str(config_data['SEED']),
+                filename=f'fundraising_data_{timestamp}.zip'
+            )
+            return
+
+        generator = FundraisingDataGenerator(config_data)
+        store.update(job_id, status=RUNNING, stage='transactions', seed=str(generator.entropy))
+
+        channel_names = list(generator.CHANNELS)
+        # Monthly gifts run one year past the generated years; lazy schedules are
+        # expanded in a second pass over every calendar year
+        campaign_steps = generator.YEARS * len(channel_names) if generator.LAZY_RECURRING else 0
+        total_steps = campaign_steps + (generator.YEARS + 1) * len(channel_names)
+
+        def track_progress(chunks):
+            # One step per year and channel, then the contacts and donor stages
+            stage = 'transactions'
+            offset = 0
+            previous_step = 0
+            for chunk in chunks:
+                if chunk.kind == 'transactions':
+                    step = offset + (chunk.year - generator.FIRST_YEAR) * len(channel_names) \
+                        + channel_names.index(chunk.channel) + 1
+                    if step <= previous_step:
+                        # Back to the first years: the lazy recurring pass started
+                        offset = campaign_steps
+                        step += offset
+                    previous_step = step
+                    store.update(job_id, progress=round(STAGE_PROGRESS['contacts'] * step / total_steps, 4))
+                elif chunk.kind != stage:
+                    stage = chunk.kind
+                    store.update(job_id, stage=stage, progress=STAGE_PROGRESS[stage])
+                yield chunk
+
+        partial_path = store.artifact_path(job_id) + '.part'
+        with open(partial_path, 'wb') as f:
+            for data in iter_dataset_archive(
+                track_progress(generator.iter_generate()),
+                archive_entry_suffix(config_data, timestamp),
+                options['output_format'],
+                options['campaign_table']
+            ):
+                f.write(data)
+        os.replace(partial_path, store.artifact_path(job_id))
+        cache.store_file(cache_key, store.artifact_path(job_id))
+        store.update(
+            job_id, status=SUCCEEDED, stage='done', progress=1.0,
+            filename=f'fundraising_data_{timestamp}.zip'
+        )
+    except Exception as e:
+        traceback.print_exc()
+        sys.stderr.flush()
+        store.update(job_id, status=FAILED, error=str(e))
+
+
+class JobQueue:
+    """Local process pool executing generation jobs.
+
+    The pool is created on first submission, so processes that never
+    receive a job (e.g. management commands) do not start workers. Its
+    processes are spawned, since forking the threaded web process is unsafe.
+    A pool broken by a crashed worker is replaced on the next submission.
+    Jobs orphaned by a stopped process are failed when a queue starts.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+                 cache=None):
+        """Create the queue.
+
+        Args:
+            store (JobStore): Where job states and artifacts are kept
+            workers (int): Maximum number of concurrent generations
+            retention_seconds (float): How long finished jobs are kept (0 keeps them forever)
+            cache (DatasetCache): Cache of generated archives, handed to the spawned
+                workers (default: the one of the Django settings, looked up by each job)
+        """
+        self.store = store
+        self.workers = max(1, int(workers))
+        self.retention_seconds = retention_seconds
+        self.cache = cache
+        self._executor = None
+        self._lock = threading.Lock()
+        self.owner, self._owner_lock = store.register_owner()
+        store.cleanup(retention_seconds)
+
+    def submit(self, config_data: dict, options: dict) -> dict:
+        """Queue a generation.
+
+        Args:
+            config_data (dict): Generator configuration
+            options (dict): output_format, campaign_table and seed of the request
+
+        Returns:
+            dict: The queued job state
+        """
+        self.store.cleanup(self.retention_seconds)
+        job = self.store.create(options, owner=self.owner)
+        with self._lock:
+            try:
+                future = self._submit(job['job_id'], config_data)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory) and took the pool down: start a new one
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                try:
+                    future = self._submit(job['job_id'], config_data)
+                except BrokenProcessPool as e:
+                    self._executor = None
+                    return self.store.update(job['job_id'], status=FAILED, error=f'Generation workers unavailable: {e}')
+        future.add_done_callback(lambda done: self._check_crash(job['job_id'], done))
+        return job
+
+    def _submit(self, job_id: str, config_data: dict):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor.submit(run_generation_job, self.store.root, job_id, config_data, self.cache)
+
+    def _check_crash(self, job_id: str, future) -> None:
+        # A worker killed mid-job (e.g. out of memory) never records its failure itself
+        error = future.exception()
+        if error is not None and self.store.get(job_id)['status'] in (QUEUED, RUNNING):
+            self.store.update(job_id, status=FAILED, error=f'Generation worker crashed: {error}')
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue configured from the Django settings
+    (GENERATION_JOBS_DIR, GENERATION_JOB_WORKERS, GENERATION_JOB_RETENTION_SECONDS)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            from django.conf import settings
+            from .cache import get_dataset_cache
+            root = str(getattr(settings, 'GENERATION_JOBS_DIR', os.path.join(settings.BASE_DIR, 'generation_jobs')))
+            os.makedirs(root, exist_ok=True)
+            _queue = JobQueue(
+                JobStore(root),
+                getattr(settings, 'GENERATION_JOB_WORKERS', 2),
+                getattr(settings, 'GENERATION_JOB_RETENTION_SECONDS', DEFAULT_RETENTION_SECONDS),
+                # Spawned workers do not inherit the configured settings
+                get_dataset_cache()
+            )
+        return _queue
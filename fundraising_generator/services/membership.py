@@ -0,0 +1,121 @@
+import numpy as np
+from typing import Dict, Iterable, Optional
+
+
+class ChannelMembership:
+    """Persistent contact x channel membership index.
+
+    Each channel keeps a bitmap over the contact ID space (so inserts skip
+    existing members in O(1) each) and an append-only array of its members
+    (for O(k) sampling).
+    Inserting k contacts costs O(k), whatever the size of the channel.
+    """
+
+    def __init__(self, channels: Iterable[str], capacity: int = 1024, rng: Optional[np.random.Generator] = None):
+        """Create empty memberships for the given channels.
+
+        Args:
+            channels (Iterable[str]): Channel names
+            capacity (int): Initial size of the contact ID space
+            rng (np.random.Generator): Random generator used for sampling
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._capacity = capacity
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        self._members: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        for channel in channels:
+            self._bitmaps[channel] = np.zeros(capacity, dtype=bool)
+            self._members[channel] = np.empty(capacity, dtype=np.int64)
+            self._counts[channel] = 0
+
+    def _ensure_capacity(self, max_contact_id: int) -> None:
+        """Grow every bitmap geometrically to cover the given contact ID."""
+        if max_contact_id < self._capacity:
+            return
+        capacity = max(max_contact_id + 1, 2 * self._capacity)
+        for channel, bitmap in self._bitmaps.items():
+            grown = np.zeros(capacity, dtype=bool)
+            grown[:len(bitmap)] = bitmap
+            self._bitmaps[channel] = grown
+        self._capacity = capacity
+
+    def add(self, channel: str, contact_ids: np.ndarray) -> None:
+        """Add contacts to a channel, ignoring those already members.
+
+        Args:
+            channel (str): The channel name
+            contact_ids (np.ndarray): Integer contact IDs
+        """
+        contact_ids = np.asarray(contact_ids, dtype=np.int64)
+        if len(contact_ids) == 0:
+            return
+        self._ensure_capacity(int(contact_ids.max()))
+
+        bitmap = self._bitmaps[channel]
+        new_ids = contact_ids[~bitmap[contact_ids]]
+        if len(new_ids) == 0:
+            return
+        # Duplicates inside the batch itself
+        new_ids = new_ids[np.sort(np.unique(new_ids, return_index=True)[1])]
+        bitmap[new_ids] = True
+
+        count = self._counts[channel]
+        members = self._members[channel]
+        if count + len(new_ids) > len(members):
+            grown = np.empty(max(count + len(new_ids), 2 * len(members)), dtype=np.int64)
+            grown[:count] = members[:count]
+            members = self._members[channel] = grown
+        members[count:count + len(new_ids)] = new_ids
+        self._counts[channel] = count + len(new_ids)
+
+    def size(self, channel: str) -> int:
+        """Number of contacts in a channel."""
+        return self._counts.get(channel, 0)
+
+    def members(self, channel: str) -> np.ndarray:
+        """Contacts of a channel, in insertion order (read-only view).
+
+        Args:
+            channel (str): The channel name
+
+        Returns:
+            np.ndarray: Integer contact IDs
+        """
+        if channel not in self._members:
+            return np.empty(0, dtype=np.int64)
+        view = self._members[channel][:self._counts[channel]]
+        view.flags.writeable = False
+        return view
+
+    def sample(self, channel: str, k: int) -> np.ndarray:
+        """Sample k distinct contacts of a channel in O(k).
+
+        Args:
+            channel (str): The channel name
+            k (int): Number of contacts to sample
+
+        Returns:
+            np.ndarray: Sampled contact IDs
+        """
+        count = self.size(channel)
+        k = min(k, count)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        return self._members[channel][_sample_indexes(self.rng, count, k)]
+
+
+def _sample_indexes(rng: np.random.Generator, population: int, k: int) -> np.ndarray:
+    """Draw k distinct indexes from range(population).
+
+    Small samples draw random integers and drop repeats, which costs O(k)
+    instead of permuting the whole population.
+    """
+    if 2 * k > population:
+        return rng.permutation(population)[:k]
+    indexes = np.empty(0, dtype=np.int64)
+    while len(indexes) < k:
+        draws = rng.integers(0, population, int((k - len(indexes)) * 1.1) + 8)
+        indexes = np.concatenate([indexes, draws])
+        indexes = indexes[np.sort(np.unique(indexes, return_index=True)[1])]
+    return indexes[:k]
@@ -0,0 +1,324 @@
+"""
+PostgreSQL bulk-load sink of generated datasets.
+
+Generated chunks are streamed into one table per chunk kind (transactions,
+contacts, campaigns, donors) with ``COPY ... FROM STDIN``, in CSV or binary
+form, inside a single transaction. Tables are created from the dtypes of
+their first chunk. Indexes are only built once everything is loaded, one
+connection per table so that the tables are indexed in parallel.
+psycopg2 is an optional dependency, only needed for this sink.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psycopg2
+    from psycopg2 import sql
+except ImportError:
+    # PostgreSQL sink disabled if psycopg2 is not available
+    psycopg2 = None
+
+from .export import DateFormatter
+
+COPY_FORMATS = ('csv', 'binary')
+
+# Explicit NULL marker of CSV loads: unquoted empty fields would otherwise load as NULL,
+# while binary loads (and the frames) keep empty strings as they are
+CSV_NULL = '\\N'
+IF_EXISTS_OPTIONS = ('fail', 'replace', 'append')
+
+# Indexes built after the load, per chunk kind: (columns, unique). Indexes on
+# columns missing from a table (e.g. campaign_id without a campaign table) are skipped.
+TABLE_INDEXES = {
+    'transactions': (
+        (('contact_id',), False),
+        (('date',), False),
+        (('campaign_name',), False),
+        (('campaign_id',), False),
+        (('channel',), False),
+    ),
+    'contacts': ((('contact_id',), True),),
+    'campaigns': ((('campaign_id',), True), (('campaign_name',), False)),
+    'donors': ((('contact_id',), True),),
+}
+
+# Binary COPY framing
+BINARY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+BINARY_HEADER = BINARY_SIGNATURE + np.array([0, 0], dtype='>i4').tobytes()
+BINARY_TRAILER = np.array([-1], dtype='>i2').tobytes()
+# Binary dates are days since 2000-01-01
+POSTGRES_EPOCH_DAY = int(np.datetime64('2000-01-01', 'D').astype(np.int64))
+
+
+def postgres_available():
+    """Whether psycopg2 is installed, i.e. datasets can be loaded into PostgreSQL."""
+    return psycopg2 is not None
+
+
+def _require_psycopg2():
+    if psycopg2 is None:
+        raise ImportError('Loading into PostgreSQL requires psycopg2 (pip install psycopg2-binary)')
+
+
+def column_type(dtype) -> str:
+    """PostgreSQL type of a column of the given pandas dtype.
+
+    Date columns hold days, float32 columns map to real so that CSV and
+    binary loads store the same values; anything else non-numeric is text.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'text'
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'date'
+    if pd.api.types.is_integer_dtype(dtype):
+        # Unsigned values need the next signed width
+        size = np.dtype(dtype.numpy_dtype if hasattr(dtype, 'numpy_dtype') else dtype).itemsize
+        size *= 2 if pd.api.types.is_unsigned_integer_dtype(dtype) else 1
+        return 'smallint' if size <= 2 else 'integer' if size <= 4 else 'bigint'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'real' if np.dtype(dtype) == np.float32 else 'double precision'
+    return 'text'
+
+
+# Big-endian binary layout of the fixed-width types
+BINARY_FIXED_TYPES = {
+    'boolean': '?',
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'date': '>i4',
+}
+
+
+def _binary_field(series: pd.Series, sql_type: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode a column as binary COPY fields.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (byte length of each field, -1 for NULL;
+        concatenated bytes of the non-NULL fields)
+    """
+    null = series.isna().to_numpy()
+    if sql_type in BINARY_FIXED_TYPES:
+        if sql_type == 'date':
+            values = series.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')[~null]
+            values = values.astype(np.int64) - POSTGRES_EPOCH_DAY
+        elif sql_type == 'boolean':
+            values = series.to_numpy(dtype=bool, na_value=False)[~null]
+        else:
+            values = series.to_numpy(dtype=BINARY_FIXED_TYPES[sql_type][1:], na_value=0)[~null]
+        encoded = np.ascontiguousarray(values.astype(BINARY_FIXED_TYPES[sql_type]))
+        lengths = np.where(null, -1, encoded.dtype.itemsize).astype(np.int64)
+        return lengths, encoded.view(np.uint8).reshape(-1)
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Encode each category once, then gather the bytes of every row
+        categories = [str(category).encode('utf-8') for category in series.cat.categories]
+        category_lengths = np.array([len(category) for category in categories], dtype=np.int64)
+        category_bytes = np.frombuffer(b''.join(categories), dtype=np.uint8)
+        codes = series.cat.codes.to_numpy()[~null]
+        field_lengths = category_lengths[codes]
+        starts = np.concatenate([[0], np.cumsum(category_lengths)[:-1]])[codes]
+        offsets = np.concatenate([[0], np.cumsum(field_lengths)[:-1]])
+        source = np.repeat(starts - offsets, field_lengths) + np.arange(field_lengths.sum())
+        payload = category_bytes[source]
+    else:
+        # One encode call for the whole column; text never contains NUL, so it separates the values
+        text = '\x00'.join(map(str, series.to_numpy(dtype=object)[~null])) + '\x00'
+        encoded = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+        separators = np.flatnonzero(encoded == 0)
+        field_lengths = np.diff(np.concatenate([[-1], separators])) - 1
+        payload = np.delete(encoded, separators)
+    lengths = np.full(len(series), -1, dtype=np.int64)
+    lengths[~null] = field_lengths
+    return lengths, payload
+
+
+def encode_binary_copy(frame: pd.DataFrame, sql_types: List[str]) -> bytes:
+    """Encode a chunk in the PostgreSQL binary COPY format.
+
+    Fields are built column by column and scattered into their rows with
+    array operations, without a Python loop over the rows.
+
+    Args:
+        frame (pd.DataFrame): Chunk to encode
+        sql_types (List[str]): PostgreSQL type of each column, as given by column_type
+
+    Returns:
+        bytes: COPY stream (header, tuples and trailer)
+    """
+    num_rows = len(frame)
+    fields = [_binary_field(frame[column], sql_type) for column, sql_type in zip(frame.columns, sql_types)]
+    # Each tuple is a field count, then per field its length and its bytes
+    field_sizes = np.stack([4 + np.maximum(lengths, 0) for lengths, _ in fields], axis=1)
+    row_sizes = 2 + field_sizes.sum(axis=1)
+    row_starts = np.concatenate([[0], np.cumsum(row_sizes)[:-1]])
+    field_starts = row_starts[:, None] + 2 + np.cumsum(field_sizes, axis=1) - field_sizes
+
+    body = np.empty(int(row_sizes.sum()), dtype=np.uint8)
+    field_count = np.frombuffer(np.array(len(fields), dtype='>i2').tobytes(), dtype=np.uint8)
+    body[row_starts[:, None] + np.arange(2)] = field_count
+    for column_index, (lengths, payload) in enumerate(fields):
+        starts = field_starts[:, column_index]
+        body[starts[:, None] + np.arange(4)] = lengths.astype('>i4').view(np.uint8).reshape(num_rows, 4)
+        present = lengths > 0
+        if present.any():
+            data_starts = starts[present] + 4
+            data_lengths = lengths[present]
+            offsets = np.concatenate([[0], np.cumsum(data_lengths)[:-1]])
+            body[np.repeat(data_starts - offsets, data_lengths) + np.arange(len(payload))] = payload
+    return BINARY_HEADER + body.tobytes() + BINARY_TRAILER
+
+
+class PostgresSink:
+    """Loads generated chunks into PostgreSQL tables with COPY."""
+
+    def __init__(self, dsn: str, table_prefix: str = '', copy_format: str = 'csv',
+                 if_exists: str = 'fail', index_workers: Optional[int] = None):
+        """Create the sink.
+
+        Args:
+            dsn (str): libpq connection string or postgresql:// URL
+            table_prefix (str): Prefix of the table names (e.g. 'demo_' for demo_transactions)
+            copy_format (str): 'csv' or 'binary'
+            if_exists (str): When a table exists: 'fail', 'replace' (drop it) or 'append'
+            index_workers (int): Connections building indexes (default: one per table)
+        """
+        _require_psycopg2()
+        if copy_format not in COPY_FORMATS:
+            raise ValueError(f'copy_format must be one of {", ".join(COPY_FORMATS)}, got {copy_format!r}')
+        if if_exists not in IF_EXISTS_OPTIONS:
+            raise ValueError(f'if_exists must be one of {", ".join(IF_EXISTS_OPTIONS)}, got {if_exists!r}')
+        self.dsn = dsn
+        self.table_prefix = table_prefix
+        self.copy_format = copy_format
+        self.if_exists = if_exists
+        self.index_workers = index_workers
+        # Columns of each loaded table and their PostgreSQL types, per chunk kind
+        self.tables: Dict[str, List[str]] = {}
+        self.column_types: Dict[str, List[str]] = {}
+
+    def table_name(self, kind: str) -> str:
+        """Name of the table of a chunk kind."""
+        return f'{self.table_prefix}{kind}'
+
+    def load(self, chunks: Iterable) -> Dict[str, int]:
+        """Load chunks into their tables, in one transaction, then build the indexes.
+
+        Args:
+            chunks: GenerationChunk iterable, as yielded by FundraisingDataGenerator.iter_generate
+
+        Returns:
+            Dict[str, int]: Rows loaded per table
+        """
+        row_counts = {}
+        date_formatter = DateFormatter()
+        connection = psycopg2.connect(self.dsn)
+        try:
+            with connection, connection.cursor() as cursor:
+                for chunk in chunks:
+                    # Skip column-less placeholders; an empty chunk still creates its table
+                    if len(chunk.frame.columns) == 0:
+                        continue
+                    if chunk.kind not in self.tables:
+                        self._create_table(cursor, chunk.kind, chunk.frame)
+                    if chunk.frame.empty:
+                        continue
+                    self._copy(cursor, chunk.kind, chunk.frame, date_formatter)
+                    table = self.table_name(chunk.kind)
+                    row_counts[table] = row_counts.get(table, 0) + len(chunk.frame)
+        finally:
+            connection.close()
+        self.create_indexes()
+        return row_counts
+
+    def _create_table(self, cursor, kind: str, frame: pd.DataFrame) -> None:
+        """Create the table of a chunk kind from the dtypes of its first chunk."""
+        table = sql.Identifier(self.table_name(kind))
+        sql_types = [column_type(dtype) for dtype in frame.dtypes]
+        if self.if_exists == 'replace':
+            cursor.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(table))
+        cursor.execute(sql.SQL('CREATE TABLE {}{} ({})').format(
+            sql.SQL('IF NOT EXISTS ') if self.if_exists == 'append' else sql.SQL(''),
+            table,
+            sql.SQL(', ').join(
+                sql.SQL('{} {}').format(sql.Identifier(column), sql.SQL(sql_type))
+                for column, sql_type in zip(frame.columns, sql_types)
+            )
+        ))
+        self.tables[kind] = list(frame.columns)
+        self.column_types[kind] = sql_types
+
+    def _copy(self, cursor, kind: str, frame: pd.DataFrame, date_formatter: DateFormatter) -> None:
+        """COPY one chunk into its table."""
+        if self.copy_format == 'binary':
+            options = sql.SQL('FORMAT binary')
+            sql_types = dict(zip(self.tables[kind], self.column_types[kind]))
+            data = encode_binary_copy(frame, [sql_types[column] for column in frame.columns])
+        else:
+            options = sql.SQL('FORMAT csv, NULL {}').format(sql.Literal(CSV_NULL))
+            data = date_formatter.format_frame(frame).to_csv(index=False, header=False, na_rep=CSV_NULL)
+            data = data.encode('utf-8')
+        statement = sql.SQL('COPY {} ({}) FROM STDIN WITH ({})').format(
+            sql.Identifier(self.table_name(kind)),
+            sql.SQL(', ').join(map(sql.Identifier, frame.columns)),
+            options
+        ).as_string(cursor)
+        cursor.copy_expert(statement, io.BytesIO(data))
+
+    def index_statements(self, kind: str) -> List:
+        """CREATE INDEX statements of a loaded table."""
+        table = self.table_name(kind)
+        statements = []
+        for columns, unique in TABLE_INDEXES.get(kind, ()):
+            if not set(columns) <= set(self.tables[kind]):
+                continue
+            statements.append(sql.SQL('CREATE {}INDEX IF NOT EXISTS {} ON {} ({})').format(
+                sql.SQL('UNIQUE ') if unique else sql.SQL(''),
+                sql.Identifier(f'{table}_{"_".join(columns)}_idx'),
+                sql.Identifier(table),
+                sql.SQL(', ').join(map(sql.Identifier, columns))
+            ))
+        return statements
+
+    def create_indexes(self) -> None:
+        """Build the indexes of the loaded tables, the tables in parallel, and analyze them."""
+        kinds = list(self.tables)
+        if not kinds:
+            return
+        with ThreadPoolExecutor(max_workers=self.index_workers or len(kinds)) as pool:
+            # psycopg2 releases the GIL while the server works, so threads are enough
+            for future in [pool.submit(self._index_table, kind) for kind in kinds]:
+                future.result()
+
+    def _index_table(self, kind: str) -> None:
+        connection = psycopg2.connect(self.dsn)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for statement in self.index_statements(kind):
+                    cursor.execute(statement)
+                cursor.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(self.table_name(kind))))
+        finally:
+            connection.close()
+
+
+def load_dataset_to_postgres(chunks: Iterable, dsn: str, **options) -> Dict[str, int]:
+    """Load a generated dataset into PostgreSQL.
+
+    Args:
+        chunks: GenerationChunk iterable
+        dsn (str): libpq connection string or postgresql:// URL
+        **options: table_prefix, copy_format, if_exists and index_workers (see PostgresSink)
+
+    Returns:
+        Dict[str, int]: Rows loaded per table
+    """
+    return PostgresSink(dsn, **options).load(chunks)
@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Optional, Tuple
+
+from .compiled_config import CompiledChannel
+from .deciles import assign_deciles
+from .schema import TRANSACTION_SCHEMA, schema_frame
+
+
+class RecurringCalendar:
+    """Month-offset calendar covering the generation window.
+
+    Month indexes are counted from January of the first generated year. The
+    calendar runs up to December of ``first_year + years``, which is where
+    recurring donations stop.
+    """
+
+    def __init__(self, first_year: int, years: int):
+        """Precompute the first day of every month in the window.
+
+        Args:
+            first_year (int): First generated year
+            years (int): Number of generated years
+        """
+        self.first_year = first_year
+        self.years = years
+        self.origin = np.datetime64(f'{first_year}-01', 'M')
+        # One extra month so a donation in the last month still has a "next month"
+        num_months = (years + 1) * 12 + 1
+        self.month_starts = (self.origin + np.arange(num_months)).astype('datetime64[D]')
+        self.last_month_index = (years + 1) * 12 - 1
+        self.end_date = np.datetime64(f'{first_year + years}-12-31', 'D')
+
+    @property
+    def calendar_years(self) -> range:
+        """Calendar years holding monthly gifts: the generated years and the following one."""
+        return range(self.first_year, self.first_year + self.years + 1)
+
+    def month_index(self, dates: np.ndarray) -> np.ndarray:
+        """Convert dates to month indexes relative to the calendar origin.
+
+        Args:
+            dates (np.ndarray): datetime64 values
+
+        Returns:
+            np.ndarray: Integer month indexes
+        """
+        months = np.asarray(dates).astype('datetime64[M]')
+        return (months - self.origin).astype(np.int64)
+
+    def schedule_from_first_donations(self, first_donation_dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Derive recurring schedules from first donation dates.
+
+        Monthly gifts start the month after the first donation, on the same
+        day of month (or the 1st when that day is after the 28th), and run
+        until the end of the calendar.
+
+        Args:
+            first_donation_dates (np.ndarray): datetime64 first donation dates
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (start month index, day of month, number of months)
+        """
+        dates = np.asarray(first_donation_dates).astype('datetime64[D]')
+        day_of_month = (dates - dates.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64) + 1
+        day_of_month = np.where(day_of_month > 28, 1, day_of_month)
+        start_month = self.month_index(dates) + 1
+        num_months = np.clip(self.last_month_index - start_month + 1, 0, None)
+        return start_month, day_of_month, num_months
+
+    def clip_to_year(self, start_month: np.ndarray, num_months: np.ndarray, year: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Restrict schedules to their months within one calendar year.
+
+        Args:
+            start_month (np.ndarray): Month index of the first monthly gift
+            num_months (np.ndarray): Number of monthly gifts
+            year (int): Calendar year
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (month index of the first gift in the year, number of gifts in the year)
+        """
+        first_month = (year - self.first_year) * 12
+        start = np.maximum(np.asarray(start_month, dtype=np.int64), first_month)
+        end = np.minimum(np.asarray(start_month, dtype=np.int64) + num_months, first_month + 12)
+        return start, np.clip(end - start, 0, None)
+
+    def expand(self, contact_ids: np.ndarray, start_month: np.ndarray, day_of_month: np.ndarray,
+               num_months: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Expand recurring schedules into one row per monthly gift.
+
+        Args:
+            contact_ids (np.ndarray): Contact of each schedule
+            start_month (np.ndarray): Month index of the first monthly gift
+            day_of_month (np.ndarray): Day of month of the gifts
+            num_months (np.ndarray): Number of monthly gifts
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (contact ID per row, datetime64 date per row)
+        """
+        num_months = np.asarray(num_months, dtype=np.int64)
+        total = int(num_months.sum())
+        if total == 0:
+            return np.asarray(contact_ids)[:0], np.empty(0, dtype='datetime64[D]')
+
+        # Offset of each row within its schedule: 0, 1, ..., n-1 for every schedule
+        schedule_starts = np.repeat(np.cumsum(num_months) - num_months, num_months)
+        row_offsets = np.arange(total) - schedule_starts
+
+        month_indexes = np.repeat(start_month, num_months) + row_offsets
+        days = np.repeat(np.asarray(day_of_month, dtype=np.int64) - 1, num_months)
+        dates = self.month_starts[month_indexes] + days.astype('timedelta64[D]')
+        return np.repeat(contact_ids, num_months), dates
+
+
+class RecurringSchedule:
+    """Compact table of recurring donation schedules.
+
+    Each batch holds the donors converted in one campaign: one entry per
+    donor with its start month, day of month and month count, plus the
+    campaign-level amount parameters and a seed. Monthly rows are only
+    materialized one calendar year of a batch at a time, and expanding the
+    same year of a batch always yields the same rows.
+    """
+
+    def __init__(self, calendar: RecurringCalendar):
+        self.calendar = calendar
+        self._batches: List[dict] = []
+
+    def add_batch(self, contact_ids: np.ndarray, first_donation_dates: np.ndarray, channel: CompiledChannel,
+                  campaign_name: str, campaign_start, campaign_end, seed: int,
+                  decile_cut_points: Optional[np.ndarray] = None) -> dict:
+        """Record the schedules of the donors converted in a campaign.
+
+        Args:
+            contact_ids (np.ndarray): Converted contact IDs
+            first_donation_dates (np.ndarray): datetime64 first donation dates
+            channel (CompiledChannel): Compiled configuration of the campaign's channel
+            campaign_name (str): Name of the converting campaign
+            campaign_start: Campaign start date
+            campaign_end: Campaign end date
+            seed (int): Seed used to draw amounts and payment methods
+            decile_cut_points (np.ndarray): Global decile cut points in force, or None
+                for deciles within the batch
+
+        Returns:
+            dict: The recorded batch
+        """
+        start_month, day_of_month, num_months = self.calendar.schedule_from_first_donations(
+            first_donation_dates
+        )
+        monthly_avg = channel.regular_donor_monthly_avg
+        batch = {
+            'contact_id': np.asarray(contact_ids),
+            'start_month': start_month.astype(np.int32),
+            'day_of_month': day_of_month.astype(np.int8),
+            'num_months': num_months.astype(np.int32),
+            'channel': channel.name,
+            'campaign_name': campaign_name,
+            'campaign_start': campaign_start,
+            'campaign_end': campaign_end,
+            'monthly_avg': monthly_avg,
+            'monthly_std': monthly_avg * 0.3,  # 30% standard deviation
+            'cost': round(channel.cost_per_reach * 0.1, 2),
+            # Read-only table, shared by the batches of the channel
+            'payment': channel.payment,
+            'seed': int(seed),
+            'decile_cut_points': decile_cut_points,
+        }
+        batch['years'] = self._batch_years(batch)
+        self._batches.append(batch)
+        return batch
+
+    def _batch_years(self, batch: dict) -> range:
+        """Calendar years in which a batch has monthly gifts."""
+        active = batch['num_months'] > 0
+        if not active.any():
+            return range(0)
+        first_month = int(batch['start_month'][active].min())
+        last_month = int((batch['start_month'][active] + batch['num_months'][active]).max()) - 1
+        return range(self.calendar.first_year + first_month // 12, self.calendar.first_year + last_month // 12 + 1)
+
+    def batches_in_year(self, year: int, channel_name: Optional[str] = None) -> List[dict]:
+        """Batches with monthly gifts in a calendar year, in recording order.
+
+        Args:
+            year (int): Calendar year
+            channel_name (str): Only the batches of this channel (default: every channel)
+
+        Returns:
+            List[dict]: Matching batches
+        """
+        return [
+            batch for batch in self._batches
+            if year in batch['years'] and (channel_name is None or batch['channel'] == channel_name)
+        ]
+
+    def __len__(self) -> int:
+        """Number of monthly rows the schedules expand to."""
+        return int(sum(batch['num_months'].sum() for batch in self._batches))
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        """Yield the monthly donations year by year, one frame per batch and year.
+
+        Yields:
+            pd.DataFrame: Monthly donations of one batch in one calendar year
+        """
+        for year in self.calendar.calendar_years:
+            for batch in self.batches_in_year(year):
+                monthly_df = expand_schedule_batch(self.calendar, batch, year)
+                if not monthly_df.empty:
+                    yield monthly_df
+
+
+def _draw_schedule_batch(calendar: RecurringCalendar, batch: dict, year: int):
+    """Monthly rows of a batch dated in one calendar year and their amounts,
+    drawn from the batch seed and the year.
+
+    Returns:
+        tuple: (contact ID per row, datetime64 date per row, amounts, generator
+        positioned after the amounts)
+    """
+    start_month, num_months = calendar.clip_to_year(batch['start_month'], batch['num_months'], year)
+    row_contact_ids, dates = calendar.expand(batch['contact_id'], start_month, batch['day_of_month'], num_months)
+    rng = np.random.default_rng([batch['seed'], year])
+    amounts = np.maximum(1, rng.normal(batch['monthly_avg'], batch['monthly_std'], len(dates))).round(2)
+    return row_contact_ids, dates, amounts, rng
+
+
+def schedule_batch_gifts(calendar: RecurringCalendar, batch: dict, year: int) -> dict:
+    """Gifts of one batch in one year as the donor rollup needs them, without building the frame.
+
+    Same contact IDs, dates, amounts and deciles as expand_schedule_batch
+    (payment methods are not drawn).
+
+    Args:
+        calendar (RecurringCalendar): Calendar the batch was scheduled on
+        batch (dict): Batch returned by RecurringSchedule.add_batch
+        year (int): Calendar year of the gifts
+
+    Returns:
+        dict: 'contact_id', 'date', 'donation_amount' (as exported, float32) and 'amount_decile' arrays
+    """
+    row_contact_ids, dates, amounts, _ = _draw_schedule_batch(calendar, batch, year)
+    return {
+        'contact_id': row_contact_ids,
+        'date': dates,
+        'donation_amount': amounts.astype(np.float32),
+        'amount_decile': assign_deciles(amounts, batch['decile_cut_points']) if len(amounts) else amounts,
+    }
+
+
+def expand_schedule_batch(calendar: RecurringCalendar, batch: dict, year: int) -> pd.DataFrame:
+    """Materialize the monthly donation rows of one batch dated in one calendar year.
+
+    This is a pure function of the batch and the year (amounts and payment
+    methods come from the batch seed and the year), so batch years can be
+    expanded in any order or process.
+
+    Args:
+        calendar (RecurringCalendar): Calendar the batch was scheduled on
+        batch (dict): Batch returned by RecurringSchedule.add_batch
+        year (int): Calendar year of the rows
+
+    Returns:
+        pd.DataFrame: Monthly donations with the transaction columns
+    """
+    row_contact_ids, dates, amounts, rng = _draw_schedule_batch(calendar, batch, year)
+    num_donations = len(dates)
+    if num_donations == 0:
+        return pd.DataFrame()
+
+    return schema_frame({
+        'date': dates,
+        'campaign_start': batch['campaign_start'],
+        'campaign_end': batch['campaign_end'],
+        'channel': batch['channel'],
+        'campaign_name': f"Monthly Recurring - {batch['campaign_name']}",
+        'campaign_type': 'recurring',
+        'donation_amount': amounts,
+        'cost': batch['cost'],
+        'reactivity': 1.00,
+        'contact_id': row_contact_ids,
+        'payment_method': batch['payment'].sample(rng, num_donations),
+        # Deciles of the monthly donations of the year, on the amounts before the compact cast
+        'amount_decile': assign_deciles(amounts, batch['decile_cut_points']),
+    }, TRANSACTION_SCHEMA)
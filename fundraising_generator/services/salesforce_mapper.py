@@ -29,10 +29,13 @@ CONTACT_FIELD_MAPPING = {
 
 # Mapping for Gift Transaction summary fields (rollup/summary fields)
 GIFT_SUMMARY_FIELD_MAPPING = {
+    'contact_id': 'Contact::Id',
     'nb_donations': 'Gift_Transaction__c::Total_Gifts__c',
     'total_donated': 'Gift_Transaction__c::Total_Amount__c',
     'avg_donation': 'Gift_Transaction__c::Average_Gift_Amount__c',
     'first_donation': 'Gift_Transaction__c::First_Gift_Date__c',
+    'last_donation': 'Gift_Transaction__c::Last_Gift_Date__c',
+    'max_amount_decile': 'Gift_Transaction__c::Max_Amount_Decile__c',
     'primary_channel': 'Gift_Transaction__c::Primary_Channel__c',
     'is_regular': 'Gift_Transaction__c::Is_Regular_Donor__c',
 }
@@ -51,6 +54,19 @@ GIFT_TRANSACTION_FIELD_MAPPING = {
     'contact_id': 'Contact::Id',
     'payment_method': 'Gift_Transaction__c::Payment_Method__c',
     'amount_decile': 'Gift_Transaction__c::Amount_Decile__c',
+    'campaign_id': 'Campaign::Id',
+}
+
+# Mapping for Campaign object fields (normalized export: one row per campaign)
+CAMPAIGN_FIELD_MAPPING = {
+    'campaign_id': 'Campaign::Id',
+    'campaign_name': 'Campaign::Name',
+    'campaign_type': 'Campaign::Type',
+    'channel': 'Campaign::Channel__c',
+    'campaign_start': 'Campaign::StartDate',
+    'campaign_end': 'Campaign::EndDate',
+    'cost': 'Campaign::Cost_Per_Contact__c',
+    'reactivity': 'Campaign::Response_Rate__c',
 }
 
 # Additional fields that may appear in analysis data
@@ -74,7 +90,8 @@ def map_dataframe_columns(df, mapping_dict):
         mapping_dict: Dictionary mapping old column names to new Salesforce format names
     
     Returns:
-        DataFrame with renamed columns
+        DataFrame with renamed columns (column dtypes, e.g. the compact
+        categorical / Int8 / float32 schema, are kept as they are)
     """
     # Create rename dictionary with only columns that exist in the DataFrame
     rename_dict = {old: new for old, new in mapping_dict.items() if old in df.columns}
@@ -89,7 +106,7 @@ def get_salesforce_column_mapping(data_type='analysis'):
     Get the appropriate column mapping based on data type.
     
     Args:
-        data_type: Type of data - 'contacts', 'transactions', 'analysis', or 'gift_summary'
+        data_type: Type of data - 'contacts', 'transactions', 'campaigns', 'analysis', or 'gift_summary'
     
     Returns:
         Dictionary mapping internal column names to Salesforce NPC format
@@ -97,6 +114,7 @@ def get_salesforce_column_mapping(data_type='analysis'):
     mappings = {
         'contacts': CONTACT_FIELD_MAPPING,
         'transactions': GIFT_TRANSACTION_FIELD_MAPPING,
+        'campaigns': CAMPAIGN_FIELD_MAPPING,
         'analysis': ANALYSIS_FIELD_MAPPING,
         'gift_summary': GIFT_SUMMARY_FIELD_MAPPING,
     }
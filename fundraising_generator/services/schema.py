@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import Any, Dict, Iterable
+
+# Compact dtypes of the transaction columns (contact_id is an integer during
+# generation and an 8-character string once formatted for output)
+TRANSACTION_SCHEMA: Dict[str, str] = {
+    'date': 'datetime64[s]',
+    'campaign_start': 'datetime64[s]',
+    'campaign_end': 'datetime64[s]',
+    'channel': 'category',
+    'campaign_name': 'category',
+    'campaign_type': 'category',
+    'donation_amount': 'float32',
+    'cost': 'float32',
+    'reactivity': 'float32',
+    'payment_method': 'category',
+    # Nullable: deciles are unknown (NA) when a campaign is too small to cut
+    'amount_decile': 'Int8',
+}
+
+# Compact dtypes of the contact columns (names and addresses stay strings)
+CONTACT_SCHEMA: Dict[str, str] = {
+    'salutation': 'category',
+    'gender': 'category',
+    'country': 'category',
+    'job': 'category',
+    'origin_decile': 'Int8',
+    'Creation_date': 'datetime64[s]',
+    'Creation_year': 'int16',
+    'nb_donations_before_regular': 'int16',
+}
+
+
+def apply_schema(frame: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Cast the columns of a frame to their compact dtypes (in place).
+
+    Args:
+        frame (pd.DataFrame): Transactions or contacts
+        schema (Dict[str, str]): TRANSACTION_SCHEMA or CONTACT_SCHEMA
+
+    Returns:
+        pd.DataFrame: The same frame
+    """
+    for column, dtype in schema.items():
+        if column in frame.columns and frame[column].dtype != dtype:
+            frame[column] = frame[column].astype(dtype)
+    return frame
+
+def _schema_column(value: Any, dtype: str, length: int):
+    """Build a column directly in its compact dtype (scalars are broadcast)."""
+    if dtype == 'category':
+        if np.ndim(value) == 0:
+            # Constant column: a single category, no per-row strings
+            return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), [value])
+        return pd.Categorical(value)
+    if np.ndim(value) == 0:
+        value = np.full(length, np.datetime64(value) if dtype.startswith('datetime64') else value)
+    if dtype == 'Int8':
+        return pd.array(value, dtype=dtype)
+    return np.asarray(value).astype(dtype, copy=False)
+
+
+def schema_frame(data: Dict[str, Any], schema: Dict[str, str]) -> pd.DataFrame:
+    """Build a frame with its columns already in their compact dtypes.
+
+    Equivalent to apply_schema(pd.DataFrame(data), schema), without
+    materializing (and then converting) string and float64 columns first.
+
+    Args:
+        data (Dict[str, Any]): Column values, arrays or scalars to broadcast
+        schema (Dict[str, str]): TRANSACTION_SCHEMA or CONTACT_SCHEMA
+
+    Returns:
+        pd.DataFrame: The frame
+    """
+    length = max(len(value) for value in data.values() if np.ndim(value))
+    return pd.DataFrame({
+        column: _schema_column(value, schema[column], length) if column in schema else value
+        for column, value in data.items()
+    })
+
+
+def concat_frames(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate chunks, keeping categorical columns categorical.
+
+    pd.concat falls back to strings when chunks have different categories,
+    so the categories of each categorical column are unified first.
+
+    Args:
+        frames (Iterable[pd.DataFrame]): Chunks with identical columns
+
+    Returns:
+        pd.DataFrame: All rows, with a fresh index
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    columns = frames[0].columns
+    categoricals = {}
+    for column in columns:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            try:
+                categoricals[column] = union_categoricals([frame[column] for frame in frames])
+            except TypeError:
+                # Categories of different types (e.g. empty chunks): unify them one frame at a time
+                categories = pd.Index(
+                    np.concatenate([frame[column].cat.categories.to_numpy() for frame in frames])
+                ).unique()
+                categoricals[column] = pd.Categorical(
+                    np.concatenate([frame[column].to_numpy(dtype=object) for frame in frames]),
+                    categories=categories
+                )
+    if not categoricals:
+        return pd.concat(frames, ignore_index=True)
+    result = pd.concat([frame.drop(columns=list(categoricals)) for frame in frames], ignore_index=True)
+    for column, values in categoricals.items():
+        result[column] = values
+    return result[columns]
+
+
+def decile_values(deciles: pd.Series) -> np.ndarray:
+    """Deciles as a float array, with NaN for unknown ones."""
+    return deciles.to_numpy(dtype=float, na_value=np.nan)
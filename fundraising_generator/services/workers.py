@@ -0,0 +1,166 @@
+"""
+Independent work units of the generator and the pool that runs them.
+
+Every unit draws from its own random substream, derived from the generator
+seed and a key describing the unit (e.g. year, channel, campaign). Results
+therefore do not depend on which process runs a unit, nor on the number of
+workers.
+"""
+import multiprocessing
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List
+
+from .compiled_config import WeightedChoices
+from .enrichment import enrich_contact_chunk
+
+# Substream families, used as the first element of substream keys
+CAMPAIGN_DRAWS = 0
+CONTACT_ENRICHMENT = 1
+SEQUENTIAL_DRAWS = 2
+CONTACT_SELECTION = 3
+FAKER_SEED = 4
+PREVIEW_SAMPLE = 5
+
+# Contacts are enriched in fixed-size chunks so the chunking (and thus the
+# substreams) is the same whatever the number of workers
+CONTACT_CHUNK_SIZE = 50000
+
+# Upper bound of the worker processes of a pool, whatever the configuration asks for
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def substream(entropy: int, *key: int) -> np.random.Generator:
+    """Create the random generator of a work unit.
+
+    Args:
+        entropy (int): Root entropy of the generation (its seed)
+        *key (int): Integers identifying the unit
+
+    Returns:
+        np.random.Generator: Generator independent from every other key
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=key))
+
+
+def draw_day_offsets(rng: np.random.Generator, num_transactions: int, distribution: str, total_days: int) -> np.ndarray:
+    """Draw day offsets within a campaign window in one array pass"""
+    scale = max(1, total_days // 2)
+    if distribution == "inverted_exponential":
+        day_offsets = total_days - rng.exponential(scale, num_transactions).astype(np.int64)
+    elif distribution == "exponential":
+        day_offsets = rng.exponential(scale, num_transactions).astype(np.int64)
+    else:
+        day_offsets = rng.integers(0, total_days + 1, num_transactions)
+
+    return np.clip(day_offsets, 0, total_days)
+
+
+def draw_donation_amounts(rng: np.random.Generator, num_transactions: int, avg_donation: float,
+                          std_deviation: float) -> np.ndarray:
+    """Draw donation amounts from a normal distribution floored at 1"""
+    return np.maximum(1, rng.normal(avg_donation, std_deviation, num_transactions))
+
+
+def draw_payment_methods(rng: np.random.Generator, num_transactions: int, payment: WeightedChoices) -> np.ndarray:
+    """Draw payment methods for a batch of transactions from the compiled channel table"""
+    return payment.sample(rng, num_transactions)
+
+
+def draw_campaign_batch(task: dict) -> dict:
+    """Draw the dates, amounts and payment methods of one campaign.
+
+    Args:
+        task (dict): entropy, key, num_transactions, distribution, start, end,
+            avg_donation, std_deviation and payment table of the campaign
+            (start and end as datetime64[D] days)
+
+    Returns:
+        dict: 'date', 'donation_amount' and 'payment_method' arrays
+    """
+    rng = substream(task['entropy'], CAMPAIGN_DRAWS, *task['key'])
+    num_transactions = task['num_transactions']
+    total_days = int((task['end'] - task['start']).astype(np.int64))
+    day_offsets = draw_day_offsets(rng, num_transactions, task['distribution'], total_days)
+    return {
+        'date': task['start'] + day_offsets.astype('timedelta64[D]'),
+        'donation_amount': draw_donation_amounts(
+            rng, num_transactions, task['avg_donation'], task['std_deviation']
+        ),
+        'payment_method': draw_payment_methods(rng, num_transactions, task['payment']),
+    }
+
+
+def enrich_contacts_task(task: dict):
+    """Enrich one chunk of contacts with its own substream.
+
+    Args:
+        task (dict): entropy, chunk index and the arguments of enrich_contact_chunk
+
+    Returns:
+        pd.DataFrame: Contact records of the chunk
+    """
+    task = dict(task)
+    rng = substream(task.pop('entropy'), CONTACT_ENRICHMENT, task.pop('chunk'))
+    return enrich_contact_chunk(rng, **task)
+
+
+class WorkerPool:
+    """Ordered map over work units, in-process or on a process pool.
+
+    With one worker units run inline; otherwise they are spread over a
+    ProcessPoolExecutor of spawned processes. Both paths return results in
+    submission order.
+    """
+
+    def __init__(self, workers: int = 1):
+        """Create the pool.
+
+        Args:
+            workers (int): Number of worker processes (1 runs everything inline),
+                capped at MAX_WORKERS
+        """
+        self.workers = min(max(1, int(workers or 1)), MAX_WORKERS)
+        self._executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            # Spawn rather than fork: pools are started from the web server threads,
+            # whose locks a forked child could inherit in a held state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker processes, if any."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def map(self, function: Callable, tasks: Iterable) -> List:
+        """Run a function over tasks and return the results in order.
+
+        Args:
+            function (Callable): Picklable top-level function
+            tasks (Iterable): Picklable task arguments
+
+        Returns:
+            List: One result per task
+        """
+        tasks = list(tasks)
+        if self._executor is None or len(tasks) <= 1:
+            return list(map(function, tasks))
+        chunksize = max(1, len(tasks) // (4 * self.workers))
+        return list(self._executor.map(function, tasks, chunksize=chunksize))
+
+
+def get_max_workers() -> int:
+    """Maximum WORKERS of a generation request, from the Django settings
+    (GENERATION_MAX_WORKERS, 0 for MAX_WORKERS). Pools still never exceed MAX_WORKERS."""
+    from django.conf import settings
+    return getattr(settings, 'GENERATION_MAX_WORKERS', 1) or MAX_WORKERS
@@ -0,0 +1,36 @@
+"""
+Shared fixtures of the generator tests.
+"""
+import contextlib
+import io
+import os
+
+import pytest
+import yaml
+
+from fundraising_generator.services.estimate import downscale_config
+from fundraising_generator.services.generator import FundraisingDataGenerator
+
+DEMO_CONFIG = os.path.join(os.path.dirname(__file__), '..', '..', 'demo_config_en.yml')
+
+
+@pytest.fixture(scope='module')
+def demo_config():
+    """The demo configuration, as loaded from its YAML file."""
+    with open(DEMO_CONFIG, encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope='module')
+def small_config(demo_config):
+    """The demo configuration scaled down to two seeded years of a few thousand transactions."""
+    config = downscale_config(demo_config, 0.05)
+    config.update({'YEARS': 2, 'SEED': 7, 'CONTACT_POOL_SIZE': 100})
+    return config
+
+
+@pytest.fixture(scope='module')
+def small_chunks(small_config):
+    """Every chunk of a streamed generation of the small configuration."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(FundraisingDataGenerator(small_config).iter_generate())
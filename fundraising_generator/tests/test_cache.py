@@ -0,0 +1,105 @@
+"""
+Tests of the on-disk cache of generated dataset archives.
+"""
+import contextlib
+import io
+import os
+import zipfile
+
+import pytest
+
+from fundraising_generator.services.cache import DatasetCache, archive_entry_suffix, dataset_cache_key
+from fundraising_generator.services.export import iter_dataset_archive
+from fundraising_generator.services.generator import FundraisingDataGenerator
+
+
+def generate_archive(config, output_format='csv', timestamp='20240101_000000'):
+    """Archive pieces of a generation, built as the API and the demo script build them."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(iter_dataset_archive(
+            FundraisingDataGenerator(config).iter_generate(), archive_entry_suffix(config, timestamp), output_format
+        ))
+
+
+def test_same_seed_is_a_byte_identical_hit(small_config, tmp_path):
+    cache = DatasetCache(str(tmp_path), 64 * 1024 ** 2)
+    key = dataset_cache_key(small_config)
+    assert cache.open(key) is None
+
+    streamed = b''.join(cache.store_stream(key, generate_archive(small_config)))
+    with cache.open(key) as cached:
+        assert cached.read() == streamed
+    # Entry names carry the seed, not the time of the first generation
+    with zipfile.ZipFile(io.BytesIO(streamed)) as archive:
+        assert all(name.endswith('_seed7.csv') for name in archive.namelist())
+
+
+def test_key_covers_seed_and_output_options_but_not_workers(small_config):
+    key = dataset_cache_key(small_config)
+    assert dataset_cache_key(dict(small_config, SEED=8)) != key
+    assert dataset_cache_key(small_config, 'parquet') != key
+    assert dataset_cache_key(small_config, campaign_table=True) != key
+    assert dataset_cache_key(dict(small_config, LAZY_RECURRING=True)) != key
+    assert dataset_cache_key(dict(small_config, WORKERS=4)) == key
+
+
+def test_unseeded_requests_are_never_cached(small_config, tmp_path):
+    cache = DatasetCache(str(tmp_path), 64 * 1024 ** 2)
+    config = dict(small_config, SEED=None)
+    assert dataset_cache_key(config) is None
+    assert archive_entry_suffix(config, '20240101_000000') == '20240101_000000'
+    assert b''.join(cache.store_stream(None, [b'archive'])) == b'archive'
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_interrupted_stream_is_not_cached(tmp_path):
+    cache = DatasetCache(str(tmp_path), 1024)
+
+    def failing_archive():
+        yield b'start'
+        raise RuntimeError('generation failed')
+
+    with pytest.raises(RuntimeError):
+        list(cache.store_stream('ab' * 32, failing_archive()))
+    assert cache.open('ab' * 32) is None
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_eviction_keeps_the_most_recently_used_archives(tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'), 250)
+    keys = [str(number) * 64 for number in range(3)]
+    for age, key in enumerate(keys[:2]):
+        source = tmp_path / f'{key}.zip'
+        source.write_bytes(b'x' * 100)
+        cache.store_file(key, str(source))
+        os.utime(cache.path(key), (1000 + age, 1000 + age))
+
+    # A hit makes the oldest archive the most recently used one
+    cache.open(keys[0]).close()
+    list(cache.store_stream(keys[2], [b'x' * 100]))
+
+    assert cache.open(keys[1]) is None
+    for key in (keys[0], keys[2]):
+        with cache.open(key) as cached:
+            assert cached.read() == b'x' * 100
+    total = sum(os.path.getsize(os.path.join(directory, name))
+                for directory, _, files in os.walk(cache.root) for name in files)
+    assert total <= cache.max_bytes
+
+
+def test_open_archive_survives_eviction(tmp_path):
+    cache = DatasetCache(str(tmp_path), 1024)
+    key = 'cd' * 32
+    list(cache.store_stream(key, [b'archive']))
+    cached = cache.open(key)
+    os.remove(cache.path(key))
+    with cached:
+        assert cached.read() == b'archive'
+    assert cache.open(key) is None
+
+
+def test_disabled_cache_never_hits(small_config, tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'), 0)
+    key = dataset_cache_key(small_config)
+    assert b''.join(cache.store_stream(key, [b'archive'])) == b'archive'
+    assert cache.open(key) is None
@@ -0,0 +1,67 @@
+"""
+Tests of the normalized Campaign table export.
+"""
+import pandas as pd
+
+from fundraising_generator.services.campaigns import CAMPAIGN_COLUMNS, CampaignCatalog, normalize_campaigns
+from fundraising_generator.services.generator import GenerationChunk
+from fundraising_generator.services.schema import TRANSACTION_SCHEMA, concat_frames, schema_frame
+
+
+def campaign_rows(names):
+    """Transactions of the named campaigns, one row per name."""
+    return schema_frame({
+        'date': pd.to_datetime(['2020-01-05'] * len(names)).to_numpy(),
+        'campaign_start': '2020-01-01',
+        'campaign_end': '2020-02-01',
+        'channel': 'Mail',
+        'campaign_name': names,
+        'campaign_type': 'prospecting',
+        'donation_amount': range(len(names)),
+        'cost': 0.5,
+        'reactivity': 2.0,
+        'contact_id': [f'{position:08d}' for position in range(len(names))],
+        'payment_method': 'card',
+        'amount_decile': [1] * len(names),
+    }, TRANSACTION_SCHEMA)
+
+
+def test_campaign_ids_follow_first_appearance_across_chunks():
+    catalog = CampaignCatalog()
+    first = catalog.normalize(campaign_rows(['B', 'A', 'B']))
+    second = catalog.normalize(campaign_rows(['A', 'C', 'C']))
+    # IDs are not sorted by campaign, and a campaign keeps its ID in later chunks
+    assert first['campaign_id'].tolist() == [1, 2, 1]
+    assert second['campaign_id'].tolist() == [2, 3, 3]
+    assert list(first.columns) == ['date', 'campaign_id', 'donation_amount', 'contact_id', 'payment_method',
+                                   'amount_decile']
+    assert catalog.to_frame()[['campaign_id', 'campaign_name']].values.tolist() == [[1, 'B'], [2, 'A'], [3, 'C']]
+
+
+def test_empty_chunk_keeps_the_normalized_columns():
+    catalog = CampaignCatalog()
+    normalized = catalog.normalize(campaign_rows(['A']).iloc[:0])
+    assert list(normalized.columns) == list(catalog.normalize(campaign_rows(['A'])).columns)
+    assert len(catalog) == 1
+
+
+def test_campaign_ids_join_back_to_the_transactions(small_chunks):
+    chunks = list(normalize_campaigns(iter(small_chunks)))
+    assert [chunk.kind for chunk in chunks[:-1]] == [chunk.kind for chunk in small_chunks]
+    assert chunks[-1].kind == 'campaigns'
+    campaigns = chunks[-1].frame
+    assert campaigns['campaign_id'].tolist() == list(range(1, len(campaigns) + 1))
+    assert not campaigns[CAMPAIGN_COLUMNS].duplicated().any()
+
+    original = concat_frames([chunk.frame for chunk in small_chunks if chunk.kind == 'transactions'])
+    normalized = concat_frames([chunk.frame for chunk in chunks if chunk.kind == 'transactions'])
+    assert set(CAMPAIGN_COLUMNS).isdisjoint(normalized.columns)
+    joined = normalized.merge(campaigns, on='campaign_id', how='left', validate='many_to_one')
+    pd.testing.assert_frame_equal(joined[original.columns], original, check_categorical=False)
+
+
+def test_other_chunks_pass_through():
+    contacts = GenerationChunk('contacts', None, None, pd.DataFrame({'contact_id': ['AAAAAAAA']}))
+    chunks = list(normalize_campaigns([contacts]))
+    assert chunks[0] is contacts
+    assert chunks[1].kind == 'campaigns' and chunks[1].frame.empty
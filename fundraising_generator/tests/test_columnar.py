@@ -0,0 +1,91 @@
+"""
+Tests of the Parquet / Arrow IPC output: partitioned writes read back with
+pyarrow's Hive partitioning.
+"""
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from fundraising_generator.services.columnar import (
+    columnar_available, iter_columnar_zip, read_columnar_dataset, write_columnar_dataset
+)
+from fundraising_generator.services.schema import concat_frames
+
+pytestmark = pytest.mark.skipif(not columnar_available(), reason='pyarrow is not installed')
+
+
+def comparable(frame, columns):
+    """Rows of the given columns in a canonical order, categories and dates as plain values."""
+    frame = frame[columns].copy()
+    for column in columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(object)
+        elif pd.api.types.is_datetime64_dtype(frame[column].dtype):
+            frame[column] = frame[column].astype('datetime64[s]')
+    return frame.sort_values(columns, kind='stable').reset_index(drop=True)
+
+
+def generated(chunks, kind):
+    return concat_frames([chunk.frame for chunk in chunks if chunk.kind == kind])
+
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_round_trip_through_year_and_channel_partitions(small_chunks, tmp_path, output_format):
+    write_columnar_dataset(small_chunks, str(tmp_path), output_format)
+    transactions = generated(small_chunks, 'transactions')
+
+    years = sorted(transactions['date'].dt.year.unique())
+    assert sorted(os.listdir(tmp_path / 'transactions')) == [f'year={year}' for year in years]
+    for year in years:
+        channels = transactions.loc[transactions['date'].dt.year == year, 'channel'].unique()
+        assert sorted(os.listdir(tmp_path / 'transactions' / f'year={year}')) == \
+            sorted(f'channel={channel}' for channel in channels)
+
+    read = read_columnar_dataset(str(tmp_path / 'transactions'), output_format)
+    # Partition values come back as columns, read from the paths
+    assert (read['year'].astype(int) == read['date'].dt.year).all()
+    for column in ('channel', 'campaign_name', 'campaign_type', 'payment_method', 'year'):
+        assert isinstance(read[column].dtype, pd.CategoricalDtype), column
+    assert str(read['amount_decile'].dtype) == 'Int8'
+    assert str(read['donation_amount'].dtype) == 'float32'
+    pd.testing.assert_frame_equal(
+        comparable(read, list(transactions.columns)), comparable(transactions, list(transactions.columns))
+    )
+
+    contacts = generated(small_chunks, 'contacts')
+    read_contacts = read_columnar_dataset(str(tmp_path / 'contacts'), output_format)
+    pd.testing.assert_frame_equal(
+        comparable(read_contacts, list(contacts.columns)), comparable(contacts, list(contacts.columns))
+    )
+
+
+def test_column_projection(small_chunks, tmp_path):
+    write_columnar_dataset(small_chunks, str(tmp_path), 'parquet')
+    read = read_columnar_dataset(str(tmp_path / 'transactions'), 'parquet', ['donation_amount', 'channel', 'unknown'])
+    # Unknown columns are ignored, partition columns can be selected like the others
+    assert list(read.columns) == ['donation_amount', 'channel']
+    assert len(read) == len(generated(small_chunks, 'transactions'))
+
+
+def test_channel_names_are_escaped_in_paths(small_chunks, tmp_path):
+    chunks = [
+        chunk._replace(frame=chunk.frame.assign(
+            channel=chunk.frame['channel'].cat.rename_categories(lambda name: f'{name} / été')
+        )) if chunk.kind == 'transactions' else chunk
+        for chunk in small_chunks
+    ]
+    write_columnar_dataset(chunks, str(tmp_path), 'parquet')
+    read = read_columnar_dataset(str(tmp_path / 'transactions'), 'parquet', ['channel'])
+    assert set(read['channel'].astype(str)) == set(generated(chunks, 'transactions')['channel'].astype(str))
+
+
+def test_zip_holds_the_dataset_files(small_chunks, tmp_path):
+    data = b''.join(iter_columnar_zip(small_chunks, 'parquet'))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+        archive.extractall(tmp_path)
+    read = read_columnar_dataset(str(tmp_path / 'transactions'), 'parquet', ['contact_id'])
+    assert len(read) == len(generated(small_chunks, 'transactions'))
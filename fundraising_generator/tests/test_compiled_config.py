@@ -0,0 +1,106 @@
+"""
+Tests of the compiled sampling tables and of the configuration validation.
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from fundraising_generator.services.compiled_config import (
+    ConfigurationError, compile_campaign_themes, compile_channels, compile_salutations, validate_config,
+    weighted_choices
+)
+
+
+def test_weighted_choices_draw_like_rng_choice():
+    options = [('card', 3), ('check', 0), ('transfer', 1.5), ('cash', 0.5)]
+    table = weighted_choices(options, 'payment')
+    values = [value for value, _ in options]
+    weights = np.array([weight for _, weight in options], dtype=float)
+
+    single = table.sample(np.random.default_rng(1))
+    assert single == np.random.default_rng(1).choice(values, p=weights / weights.sum())
+    drawn = table.sample(np.random.default_rng(2), 10000)
+    assert (drawn == np.random.default_rng(2).choice(values, 10000, p=weights / weights.sum())).all()
+    # A zero weight is never drawn, the others in proportion to their weight
+    assert 'check' not in drawn
+    assert abs((drawn == 'card').mean() - 0.6) < 0.02
+
+
+def test_compiled_tables_are_read_only(demo_config):
+    channels = compile_channels(demo_config['CHANNELS'])
+    assert list(channels) == list(demo_config['CHANNELS'])
+    channel = next(iter(channels.values()))
+    with pytest.raises(TypeError):
+        channels['Other'] = channel
+    with pytest.raises(ValueError):
+        channel.payment.cumulative[0] = 0.0
+    with pytest.raises(TypeError):
+        dict(channel.campaigns)[channel.campaigns[0][0]]['nb'] = 0
+
+    themes = compile_campaign_themes(demo_config['CAMPAIGN_THEMES'])
+    assert themes.choices.cumulative[-1] == 1.0
+    salutations = compile_salutations(demo_config['SALUTATIONS'])
+    assert len(salutations.civilities) == len(salutations.choices.values) == len(demo_config['SALUTATIONS'])
+
+
+def test_demo_config_is_valid(demo_config):
+    validate_config(demo_config, max_workers=2)
+
+
+def first_channel(config):
+    return next(iter(config['CHANNELS'].values()))
+
+
+def first_campaign(config):
+    return next(iter(first_channel(config)['campaigns'].values()))
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda config: config.update(CHANNELS={}), 'CHANNELS must be a non-empty mapping'),
+    (lambda config: first_channel(config).update(distribution='normal'), 'distribution must be one of'),
+    (lambda config: first_channel(config).pop('duration'), 'duration is required'),
+    (lambda config: first_channel(config).update(duration=-1), 'duration must be a non-negative number'),
+    (lambda config: first_channel(config).update(initial_nb='1000'), 'initial_nb must be an integer >= 0'),
+    (lambda config: first_channel(config).update(initial_nb=-1), 'initial_nb must be an integer >= 0'),
+    (lambda config: first_channel(config).update(initial_nb=1.5), 'initial_nb must be an integer >= 0'),
+    (lambda config: first_channel(config).update(payment=['card']), 'payment must be a mapping'),
+    (lambda config: first_channel(config).update(payment={'card': 0}), 'weights must not all be 0'),
+    (lambda config: first_channel(config).update(payment={'card': -1}), 'weight of \'card\' must be a number'),
+    (lambda config: first_channel(config).update(regular_donor_wealth_multiplier={'rich': 2}),
+     'regular_donor_wealth_multiplier keys'),
+    (lambda config: first_channel(config).update(campaigns={'upsell': {}}), 'campaign type must be one of'),
+    (lambda config: first_campaign(config).update(nb=1.5), 'nb must be a non-negative integer'),
+    (lambda config: first_campaign(config).pop('transformation_rate'), 'transformation_rate is required'),
+    (lambda config: first_campaign(config).update(cross_sell=[['Unknown', 10]]), 'unknown channel'),
+    (lambda config: config.update(CAMPAIGN_THEMES=[['Theme', 'heavy']]), 'weight of \'Theme\' must be a number'),
+    (lambda config: config.update(SALUTATIONS=[]), 'SALUTATIONS must be a non-empty list'),
+    (lambda config: config.update(SALUTATIONS=[{'civility': 'Mr'}]), 'need civility, gender and probability'),
+    (lambda config: config.update(DECILE_MODE='global'), 'DECILE_MODE must be one of'),
+    (lambda config: config.update(GLOBAL_REGULAR_DONOR_RATE='high'), 'GLOBAL_REGULAR_DONOR_RATE must be a number'),
+    (lambda config: config.update(GLOBAL_REGULAR_DONOR_RATE=-0.1), 'GLOBAL_REGULAR_DONOR_RATE must be a number >= 0'),
+    (lambda config: config.update(GLOBAL_CHURN_RATE=None), 'GLOBAL_CHURN_RATE must be a number'),
+    (lambda config: config.update(GLOBAL_CHURN_RATE=1.5), 'GLOBAL_CHURN_RATE must be at most 1'),
+    (lambda config: config.update(WORKERS=0), 'WORKERS must be an integer >= 1'),
+    (lambda config: config.update(WORKERS=3), 'WORKERS must be at most 2'),
+    (lambda config: config.update(CONTACT_POOL_SIZE=-1), 'CONTACT_POOL_SIZE must be an integer >= 0'),
+    (lambda config: config.update(CONTACT_POOL_SIZE=200000), 'CONTACT_POOL_SIZE must be at most'),
+    (lambda config: config.update(YEARS=-1), 'YEARS must be an integer >= 0'),
+    (lambda config: config.update(YEARS=2.5), 'YEARS must be an integer'),
+    (lambda config: config.update(YEARS=1000), 'YEARS must be at most 100'),
+    (lambda config: config.update(FIRST_YEAR='2014'), 'FIRST_YEAR must be an integer'),
+    (lambda config: config.update(FIRST_YEAR=999), 'FIRST_YEAR must be an integer >= 1000'),
+    (lambda config: config.update(FIRST_YEAR=9995, YEARS=10), 'FIRST_YEAR must be at most 9989'),
+    (lambda config: config.update(SEED=-1), 'SEED must be an integer >= 0'),
+    (lambda config: config.update(SEED='abc'), 'SEED must be an integer'),
+    (lambda config: config.update(SEED=True), 'SEED must be an integer'),
+])
+def test_invalid_config_is_rejected(demo_config, change, message):
+    config = copy.deepcopy(demo_config)
+    change(config)
+    with pytest.raises(ConfigurationError, match=message):
+        validate_config(config, max_workers=2)
+
+
+def test_unset_seed_is_valid(demo_config):
+    validate_config(dict(demo_config, SEED=None))
@@ -0,0 +1,65 @@
+"""
+Tests of the external contact IDs: the affine bijection over the 36^8 ID
+space, checked against exact Python integer arithmetic.
+"""
+import numpy as np
+import pytest
+
+from fundraising_generator.services.contact_manager import (
+    _ID_INVERSE, _ID_MULTIPLIER, _ID_OFFSET, CONTACT_ID_ALPHABET, CONTACT_ID_LENGTH, CONTACT_ID_SPACE, _mulmod,
+    format_contact_ids, parse_contact_ids
+)
+
+# The lowest and highest IDs, a dense range, and random IDs over the whole space
+EDGE_IDS = np.concatenate([
+    np.arange(0, 1000),
+    np.arange(CONTACT_ID_SPACE - 1000, CONTACT_ID_SPACE),
+    np.random.default_rng(0).integers(0, CONTACT_ID_SPACE, 10000),
+]).astype(np.int64)
+
+
+def exact_format(contact_id):
+    value = (contact_id * _ID_MULTIPLIER + _ID_OFFSET) % CONTACT_ID_SPACE
+    digits = []
+    for _ in range(CONTACT_ID_LENGTH):
+        value, digit = divmod(value, len(CONTACT_ID_ALPHABET))
+        digits.append(CONTACT_ID_ALPHABET[digit])
+    return ''.join(reversed(digits))
+
+
+@pytest.mark.parametrize('factor', [_ID_MULTIPLIER, _ID_INVERSE, CONTACT_ID_SPACE - 1, 1, (1 << 21) + 1])
+def test_mulmod_matches_exact_arithmetic(factor):
+    expected = [int(value) * factor % CONTACT_ID_SPACE for value in EDGE_IDS]
+    assert _mulmod(EDGE_IDS, factor).tolist() == expected
+
+
+def test_multiplier_is_invertible():
+    assert _ID_MULTIPLIER * _ID_INVERSE % CONTACT_ID_SPACE == 1
+
+
+def test_format_matches_exact_arithmetic():
+    formatted = format_contact_ids(EDGE_IDS)
+    assert formatted.tolist() == [exact_format(int(value)) for value in EDGE_IDS]
+    assert all(len(contact_id) == CONTACT_ID_LENGTH for contact_id in formatted)
+    assert set(''.join(formatted)) <= set(CONTACT_ID_ALPHABET)
+
+
+def test_round_trip_and_uniqueness():
+    formatted = format_contact_ids(EDGE_IDS)
+    np.testing.assert_array_equal(parse_contact_ids(formatted), EDGE_IDS)
+    assert len(set(formatted)) == len(np.unique(EDGE_IDS))
+    # Consecutive integers do not give similar IDs
+    assert len({contact_id[:4] for contact_id in format_contact_ids(np.arange(100))}) > 90
+
+
+def test_parse_inverts_every_external_id():
+    # IDs formatted independently of format_contact_ids, and the highest external ID, parse back
+    external = np.array([exact_format(int(value)) for value in EDGE_IDS[1000:2000]], dtype=object)
+    assert format_contact_ids(parse_contact_ids(external)).tolist() == external.tolist()
+    assert parse_contact_ids(np.array(['99999999'], dtype=object)).tolist() == \
+        [(CONTACT_ID_SPACE - 1 - _ID_OFFSET) * _ID_INVERSE % CONTACT_ID_SPACE]
+
+
+def test_empty_ids():
+    assert len(format_contact_ids(np.empty(0, dtype=np.int64))) == 0
+    assert len(parse_contact_ids(np.empty(0, dtype=object))) == 0
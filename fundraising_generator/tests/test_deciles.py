@@ -0,0 +1,96 @@
+"""
+Tests of the amount deciles: the batch computation against pd.qcut, and the
+global cut points of the sketch and config modes against exact quantiles.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from fundraising_generator.services.deciles import (
+    CUT_LEVELS, SKETCH_ACCURACY, AmountSketch, DecileAssigner, amount_deciles, assign_deciles, config_cut_points
+)
+from fundraising_generator.services.estimate import expected_campaign_amounts
+
+
+def qcut_deciles(amounts):
+    return pd.qcut(amounts, 10, labels=False, duplicates='drop') + 1
+
+
+@pytest.mark.parametrize('size', [2, 3, 10, 11, 97, 1000, 20000])
+def test_batch_deciles_match_qcut(size):
+    rng = np.random.default_rng(size)
+    amounts = np.maximum(1, rng.normal(50, 20, size))
+    np.testing.assert_array_equal(amount_deciles(amounts), qcut_deciles(amounts))
+    # Gifts rounded to a few values, as donors pick round amounts: quantiles merge
+    rounded = np.round(amounts, -1)
+    if len(np.unique(rounded)) > 1:
+        np.testing.assert_array_equal(amount_deciles(rounded), qcut_deciles(rounded))
+    # Amounts as exported (float32) and widened back
+    widened = amounts.astype(np.float32).astype(float)
+    np.testing.assert_array_equal(amount_deciles(widened), qcut_deciles(widened))
+
+
+def test_equal_amounts_have_no_decile():
+    assert np.isnan(amount_deciles(np.full(5, 20.0))).all()
+    assert np.isnan(amount_deciles(np.array([35.0]))).all()
+
+
+def test_amounts_on_a_cut_point_fall_in_the_lower_decile():
+    cut_points = np.arange(10, 100, 10, dtype=float)
+    deciles = assign_deciles(np.array([1, 10, 10.01, 55, 90, 90.01, 1000]), cut_points)
+    assert deciles.tolist() == [1, 1, 2, 6, 9, 10, 10]
+    amounts = np.arange(1.0, 21.0)
+    np.testing.assert_array_equal(assign_deciles(amounts, None), qcut_deciles(amounts))
+
+
+def test_sketch_quantiles_within_accuracy():
+    rng = np.random.default_rng(3)
+    amounts = np.concatenate([np.maximum(1, rng.normal(50, 20, 100000)), rng.lognormal(5, 1, 50000)])
+    sketch = AmountSketch()
+    sketch.add(amounts)
+    assert len(sketch) == len(amounts)
+    # The sketch estimates the order statistic at rank level * (n - 1)
+    exact = np.quantile(amounts, CUT_LEVELS, method='lower')
+    assert np.abs(sketch.cut_points() / exact - 1).max() <= SKETCH_ACCURACY
+
+
+def test_sketches_merge_exactly():
+    rng = np.random.default_rng(4)
+    first, second = rng.lognormal(4, 1, 1000), rng.lognormal(6, 0.5, 3000)
+    merged = AmountSketch()
+    merged.add(first)
+    other = AmountSketch()
+    other.add(second)
+    merged.merge(other)
+    whole = AmountSketch()
+    whole.add(np.concatenate([second, first]))
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    with pytest.raises(ValueError):
+        merged.merge(AmountSketch(accuracy=0.01))
+
+
+def test_config_cut_points_match_the_expected_gift_mix(demo_config):
+    mix = expected_campaign_amounts(demo_config)
+    rng = np.random.default_rng(5)
+    weights = np.array([count for count, _, _ in mix])
+    counts = rng.multinomial(1000000, weights / weights.sum())
+    gifts = np.concatenate([
+        np.maximum(1, rng.normal(mean, deviation, count)) for (_, mean, deviation), count in zip(mix, counts)
+    ])
+    cut_points = config_cut_points(demo_config)
+    assert np.abs(cut_points / np.quantile(gifts, CUT_LEVELS) - 1).max() <= SKETCH_ACCURACY
+
+
+def test_sketch_mode_places_each_campaign_against_the_gifts_so_far():
+    rng = np.random.default_rng(6)
+    assigner = DecileAssigner('sketch')
+    campaigns = [np.maximum(1, rng.normal(mean, 15, 5000)) for mean in (30, 60, 90, 45)]
+    for position, amounts in enumerate(campaigns):
+        deciles = assigner.campaign_deciles(amounts)
+        # The campaign being assigned is part of the cut points
+        so_far = np.concatenate(campaigns[:position + 1])
+        np.testing.assert_array_equal(deciles, assign_deciles(amounts, assigner.cut_points))
+        exact = np.quantile(so_far, CUT_LEVELS, method='lower')
+        assert np.abs(assigner.cut_points / exact - 1).max() <= SKETCH_ACCURACY
+    assigner.reset()
+    assert assigner.cut_points is None
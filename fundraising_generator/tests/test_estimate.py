@@ -0,0 +1,88 @@
+"""
+Tests of the generation cost estimate and of admission control.
+"""
+import copy
+
+from fundraising_generator.services.enrichment import POOLED_ATTRIBUTES
+from fundraising_generator.services.estimate import (
+    ALLOCATED_CONTACT_BYTES, BACKGROUND, BASE_MEMORY_BYTES, FAKER_VALUE_BYTES, PREVIEW_MAX_ALLOCATED_CONTACTS,
+    REJECT, SYNC, admit_generation, estimate_generation, preview_config
+)
+
+
+def test_within_limits_runs_synchronously(demo_config):
+    estimate = estimate_generation(demo_config)
+    admission = admit_generation(
+        demo_config, max_transactions=estimate.transactions, max_memory_bytes=estimate.peak_memory_bytes
+    )
+    assert admission.decision == SYNC
+    assert admission.config is demo_config
+    assert admission.scale == 1.0
+
+
+def test_over_the_limits_is_rejected(demo_config):
+    estimate = estimate_generation(demo_config)
+    admission = admit_generation(demo_config, max_transactions=estimate.transactions // 2)
+    assert admission.decision == REJECT
+    assert 'transactions exceeds the limit' in admission.reason
+
+    admission = admit_generation(demo_config, max_memory_bytes=estimate.peak_memory_bytes - 1)
+    assert admission.decision == REJECT
+    assert 'peak memory' in admission.reason
+
+
+def test_downscale_fits_the_limits(demo_config):
+    max_transactions = estimate_generation(demo_config).transactions // 4
+    admission = admit_generation(demo_config, max_transactions=max_transactions, downscale=True)
+    assert admission.decision == SYNC
+    assert 0.0 < admission.scale < 1.0
+    assert admission.estimate.transactions <= max_transactions
+    assert estimate_generation(admission.config) == admission.estimate
+
+
+def test_downscale_rejects_what_cannot_fit(demo_config):
+    # The Faker pools do not shrink with the contact volumes: half of them never fits
+    pool_bytes = len(POOLED_ATTRIBUTES) * demo_config.get('CONTACT_POOL_SIZE', 2000) * FAKER_VALUE_BYTES
+    admission = admit_generation(demo_config, max_memory_bytes=BASE_MEMORY_BYTES + pool_bytes // 2, downscale=True)
+    assert admission.decision == REJECT
+    assert admission.estimate.peak_memory_bytes > BASE_MEMORY_BYTES + pool_bytes // 2
+
+
+def test_long_requests_run_in_the_background(demo_config):
+    estimate = estimate_generation(demo_config)
+    admission = admit_generation(demo_config, max_sync_seconds=estimate.runtime_seconds / 2)
+    assert admission.decision == BACKGROUND
+    assert admission.config is demo_config
+
+    # Downscaled requests are timed on their downscaled estimate
+    admission = admit_generation(
+        demo_config, max_transactions=estimate.transactions // 4, max_sync_seconds=estimate.runtime_seconds,
+        downscale=True
+    )
+    assert admission.decision == SYNC
+
+
+def test_large_channels_count_in_the_memory_estimate(demo_config):
+    config = copy.deepcopy(demo_config)
+    config['YEARS'] = 1
+    config['CHANNELS']['Online']['initial_nb'] = 30_000_000
+    estimate = estimate_generation(config)
+    assert estimate.allocated_contacts > 30_000_000
+    # Contacts that never donate still take their IDs, membership and donor state
+    assert estimate.peak_memory_bytes > 30_000_000 * ALLOCATED_CONTACT_BYTES
+
+    admission = admit_generation(config, max_transactions=20_000_000, max_memory_bytes=2 * 1024 ** 3)
+    assert admission.decision == REJECT
+    assert 'peak memory' in admission.reason
+    admission = admit_generation(
+        config, max_transactions=20_000_000, max_memory_bytes=2 * 1024 ** 3, downscale=True
+    )
+    assert admission.decision != REJECT
+    assert admission.config['CHANNELS']['Online']['initial_nb'] < 30_000_000
+    assert admission.estimate.peak_memory_bytes <= 2 * 1024 ** 3
+
+
+def test_preview_scales_large_channels_down(demo_config):
+    config = copy.deepcopy(demo_config)
+    config['CHANNELS']['Online']['initial_nb'] = 3_000_000_000
+    assert estimate_generation(preview_config(config)).allocated_contacts <= PREVIEW_MAX_ALLOCATED_CONTACTS
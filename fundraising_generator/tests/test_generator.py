@@ -0,0 +1,112 @@
+"""
+Tests of the dataset generator on a small seeded configuration.
+
+The configuration (see conftest.py) is the demo one, scaled down to a couple
+of years and a few thousand transactions so that every test generates it in
+about a second.
+"""
+import contextlib
+import io
+
+import pandas as pd
+
+from fundraising_generator.services import workers
+from fundraising_generator.services.generator import FundraisingDataGenerator
+
+
+def generate_chunks(config):
+    """Every chunk of a streamed generation, with the progress output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(FundraisingDataGenerator(config).iter_generate())
+
+
+def test_chunks_hold_the_monthly_gifts_of_their_year(small_config):
+    chunks = [chunk for chunk in generate_chunks(small_config) if chunk.kind == 'transactions']
+    recurring_chunks = 0
+    for chunk in chunks:
+        recurring = chunk.frame[chunk.frame['campaign_type'] == 'recurring']
+        assert (recurring['date'].dt.year == chunk.year).all()
+        recurring_chunks += not recurring.empty
+    assert recurring_chunks
+    # Monthly gifts run one year past the generated years
+    assert max(chunk.year for chunk in chunks) == small_config['FIRST_YEAR'] + small_config['YEARS']
+
+
+def as_csv(frames):
+    """CSV text of frames written one after the other, as the exports write chunks."""
+    return ''.join(frame.to_csv(index=False, header=position == 0) for position, frame in enumerate(frames))
+
+
+def test_streamed_transactions_match_generate(small_config):
+    streamed = [chunk.frame for chunk in generate_chunks(small_config) if chunk.kind == 'transactions']
+    with contextlib.redirect_stdout(io.StringIO()):
+        transactions, _ = FundraisingDataGenerator(small_config).generate()
+    assert as_csv(streamed) == as_csv([transactions])
+
+
+def test_seeded_output_does_not_depend_on_workers(small_config, monkeypatch):
+    # Let the pool start processes even on a single-CPU machine
+    monkeypatch.setattr('fundraising_generator.services.workers.MAX_WORKERS', 2)
+    config = dict(small_config, DONOR_SUMMARY=True)
+    inline = generate_chunks(dict(config, WORKERS=1))
+    pooled = generate_chunks(dict(config, WORKERS=2))
+    assert [(chunk.kind, chunk.year, chunk.channel) for chunk in inline] == \
+        [(chunk.kind, chunk.year, chunk.channel) for chunk in pooled]
+    for kind in ('transactions', 'contacts', 'donors'):
+        assert as_csv([chunk.frame for chunk in pooled if chunk.kind == kind]) == \
+            as_csv([chunk.frame for chunk in inline if chunk.kind == kind])
+
+
+
+def test_pool_spawns_its_workers(monkeypatch):
+    start_methods = []
+
+    class RecordingExecutor:
+        def __init__(self, max_workers, mp_context):
+            start_methods.append(mp_context.get_start_method())
+
+        def shutdown(self, wait=True):
+            pass
+
+    monkeypatch.setattr(workers, 'MAX_WORKERS', 2)
+    monkeypatch.setattr(workers, 'ProcessPoolExecutor', RecordingExecutor)
+    with workers.WorkerPool(2):
+        pass
+    # Pools are started from web request threads, which must not be forked
+    assert start_methods == ['spawn']
+
+def sorted_rows(frames):
+    """Rows of frames as a canonically ordered frame, to compare them as multisets."""
+    frame = pd.concat(frames, ignore_index=True)
+    return frame.sort_values(list(frame.columns), kind='stable').reset_index(drop=True)
+
+
+def test_lazy_recurring_streams_the_same_rows(small_config):
+    eager = generate_chunks(dict(small_config, LAZY_RECURRING=False))
+    lazy = generate_chunks(dict(small_config, LAZY_RECURRING=True))
+    lazy_transactions = [chunk for chunk in lazy if chunk.kind == 'transactions']
+    # Campaign chunks hold no monthly gifts, which come in recurring-only chunks afterwards
+    assert any((chunk.frame['campaign_type'] == 'recurring').all() for chunk in lazy_transactions)
+    for kind in ('transactions', 'contacts'):
+        pd.testing.assert_frame_equal(
+            sorted_rows([chunk.frame for chunk in lazy if chunk.kind == kind]),
+            sorted_rows([chunk.frame for chunk in eager if chunk.kind == kind])
+        )
+
+
+def test_lazy_generate_expands_the_same_transactions(small_config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        eager_transactions, eager_contacts = FundraisingDataGenerator(dict(small_config, LAZY_RECURRING=False)).generate()
+        generator = FundraisingDataGenerator(dict(small_config, LAZY_RECURRING=True))
+        lazy_transactions, lazy_contacts = generator.generate()
+        frames = list(generator.iter_transaction_frames(lazy_transactions))
+    # generate() holds the campaign gifts only, the monthly gifts are expanded afterwards
+    assert not (lazy_transactions['campaign_type'] == 'recurring').any()
+    assert len(frames) > 1
+    # Chunks each have their own categories, so their rows are compared as plain strings
+    categories = {column: str for column in eager_transactions.select_dtypes('category').columns}
+    pd.testing.assert_frame_equal(
+        sorted_rows([frame.astype(categories) for frame in frames]),
+        sorted_rows([eager_transactions.astype(categories)])
+    )
+    pd.testing.assert_frame_equal(lazy_contacts, eager_contacts)
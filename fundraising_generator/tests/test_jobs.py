@@ -0,0 +1,217 @@
+"""
+Tests of the asynchronous generation jobs: their on-disk store, the job
+runner and the queue.
+"""
+import contextlib
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fundraising_generator.services import jobs
+from fundraising_generator.services.cache import DatasetCache
+from fundraising_generator.services.jobs import (
+    FAILED, QUEUED, RUNNING, STAGE_PROGRESS, SUCCEEDED, JobQueue, JobStore, run_generation_job
+)
+
+OPTIONS = {'output_format': 'csv', 'campaign_table': False, 'seed': 7, 'scale': 1.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs'))
+
+
+@pytest.fixture
+def progress_updates(monkeypatch):
+    """Progress values recorded by every job state update."""
+    updates = []
+    update = JobStore.update
+
+    def recording_update(self, job_id, **fields):
+        if 'progress' in fields:
+            updates.append(fields['progress'])
+        return update(self, job_id, **fields)
+
+    monkeypatch.setattr(JobStore, 'update', recording_update)
+    return updates
+
+
+def run_job(store, config, cache):
+    """Create and run a job in-process, with the progress output silenced."""
+    job = store.create(OPTIONS)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        run_generation_job(store.root, job['job_id'], config, cache)
+    return store.get(job['job_id'])
+
+
+@pytest.mark.parametrize('lazy_recurring', [False, True])
+def test_job_succeeds_with_steady_progress(small_config, store, tmp_path, progress_updates, lazy_recurring):
+    config = dict(small_config, LAZY_RECURRING=lazy_recurring, DONOR_SUMMARY=True)
+    job = run_job(store, config, DatasetCache(str(tmp_path / 'cache'), 0))
+
+    assert job['status'] == SUCCEEDED
+    assert job['stage'] == 'done'
+    assert job['seed'] == '7'
+    with zipfile.ZipFile(store.artifact_path(job['job_id'])) as archive:
+        assert 'transactions_seed7.csv' in archive.namelist()
+    # Progress only moves forward, and 1.0 is only reported once the job succeeded
+    assert progress_updates == sorted(progress_updates)
+    assert progress_updates[-1] == job['progress'] == 1.0
+    assert max(progress_updates[:-1]) == STAGE_PROGRESS['donors']
+
+
+def test_cached_job_copies_the_archive(small_config, store, tmp_path):
+    cache = DatasetCache(str(tmp_path / 'cache'), 64 * 1024 ** 2)
+    first = run_job(store, small_config, cache)
+    second = run_job(store, small_config, cache)
+    assert second['status'] == SUCCEEDED
+    assert second['progress'] == 1.0
+    with open(store.artifact_path(first['job_id']), 'rb') as f:
+        first_archive = f.read()
+    with open(store.artifact_path(second['job_id']), 'rb') as f:
+        assert f.read() == first_archive
+
+
+def test_failed_generation_fails_the_job(store, tmp_path):
+    job = run_job(store, {'CHANNELS': {'Mail': {'distribution': 'unknown'}}}, DatasetCache(str(tmp_path), 0))
+    assert job['status'] == FAILED
+    assert job['error']
+
+
+def test_jobs_of_a_stopped_process_are_failed(store):
+    alive_owner, alive_lock = store.register_owner()
+    stopped_owner, stopped_lock = store.register_owner()
+    # Closing the lock file releases the lock, as the end of its process would
+    stopped_lock.close()
+    alive = store.create(OPTIONS, owner=alive_owner)
+    orphaned = store.create(OPTIONS, owner=stopped_owner)
+    store.update(orphaned['job_id'], status=RUNNING)
+
+    assert store.fail_orphaned_jobs() == 1
+    assert store.get(orphaned['job_id'])['status'] == FAILED
+    assert store.get(alive['job_id'])['status'] == QUEUED
+    # The stopped owner's lock file is gone, the live one is kept
+    assert os.listdir(os.path.join(store.root, jobs.OWNERS_DIR)) == [alive_owner]
+    alive_lock.close()
+
+
+def test_cleanup_deletes_expired_finished_jobs(store):
+    owner, lock = store.register_owner()
+    expired = store.create(OPTIONS, owner=owner)
+    recent = store.create(OPTIONS, owner=owner)
+    running = store.create(OPTIONS, owner=owner)
+    store.update(recent['job_id'], status=SUCCEEDED)
+    store.update(running['job_id'], status=RUNNING)
+    job = store.update(expired['job_id'], status=FAILED)
+    # Rewrite the state file directly: update() would refresh updated_at
+    job['updated_at'] = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+    with open(os.path.join(store.job_dir(job['job_id']), 'job.json'), 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+
+    assert store.cleanup(3600) == 1
+    assert store.get(expired['job_id']) is None
+    assert store.get(recent['job_id'])['status'] == SUCCEEDED
+    assert store.get(running['job_id'])['status'] == RUNNING
+    assert store.cleanup(0) == 0
+    lock.close()
+
+
+class FakeExecutor:
+    """Executor whose submissions complete at once, or fail with a broken pool."""
+
+    instances = []
+    broken = 0
+
+    def __init__(self, max_workers, mp_context):
+        self.start_method = mp_context.get_start_method()
+        self.shut_down = False
+        FakeExecutor.instances.append(self)
+
+    def submit(self, function, *args):
+        if FakeExecutor.broken:
+            FakeExecutor.broken -= 1
+            raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+@pytest.fixture
+def fake_executor(monkeypatch):
+    FakeExecutor.instances = []
+    FakeExecutor.broken = 0
+    monkeypatch.setattr(jobs, 'ProcessPoolExecutor', FakeExecutor)
+    return FakeExecutor
+
+
+def test_queue_spawns_its_workers(store, fake_executor):
+    queue = JobQueue(store)
+    job = queue.submit({}, OPTIONS)
+    assert job['status'] == QUEUED
+    assert [executor.start_method for executor in fake_executor.instances] == ['spawn']
+
+
+def test_queue_replaces_a_broken_pool(store, fake_executor):
+    queue = JobQueue(store)
+    queue.submit({}, OPTIONS)
+    fake_executor.broken = 1
+    job = queue.submit({}, OPTIONS)
+    assert job['status'] == QUEUED
+    assert len(fake_executor.instances) == 2
+    assert fake_executor.instances[0].shut_down
+    assert queue._executor is fake_executor.instances[1]
+
+    # A pool that cannot even be replaced fails the job
+    fake_executor.broken = 2
+    job = queue.submit({}, OPTIONS)
+    assert job['status'] == FAILED
+    assert 'workers unavailable' in job['error']
+
+
+def test_crashed_worker_fails_its_job(store):
+    queue = JobQueue(store)
+    job = store.create(OPTIONS, owner=queue.owner)
+    crashed = Future()
+    crashed.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+    queue._check_crash(job['job_id'], crashed)
+    assert store.get(job['job_id'])['status'] == FAILED
+    assert 'crashed' in store.get(job['job_id'])['error']
+
+
+def test_queued_job_runs_in_a_spawned_worker(small_config, store, tmp_path):
+    queue = JobQueue(store, workers=1, cache=DatasetCache(str(tmp_path / 'cache'), 0))
+    job = queue.submit(dict(small_config, YEARS=1), OPTIONS)
+    deadline = time.monotonic() + 120
+    while store.get(job['job_id'])['status'] in (QUEUED, RUNNING) and time.monotonic() < deadline:
+        time.sleep(0.2)
+    queue._executor.shutdown()
+    assert store.get(job['job_id'])['status'] == SUCCEEDED
+    assert os.path.exists(store.artifact_path(job['job_id']))
+
+
+def test_download_of_a_deleted_artifact_is_not_found(store, monkeypatch):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.test')
+    import django
+    django.setup()
+    from rest_framework.test import APIRequestFactory
+    from fundraising_generator.api.views import GenerationJobDownloadView
+
+    queue = JobQueue(store)
+    monkeypatch.setattr(jobs, '_queue', queue)
+    job = store.create(OPTIONS, owner=queue.owner)
+    # Succeeded, but its artifact already deleted by the retention cleanup
+    store.update(job['job_id'], status=SUCCEEDED, filename='dataset.zip', seed='7')
+    request = APIRequestFactory().get(f"/api/jobs/{job['job_id']}/download/")
+    response = GenerationJobDownloadView.as_view()(request, job_id=job['job_id'])
+    assert response.status_code == 404
+    assert response.data == {'error': 'Job not found'}
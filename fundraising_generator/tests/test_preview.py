@@ -0,0 +1,57 @@
+"""
+Tests of the preview mode: the reduced configuration and the donor sample.
+"""
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from fundraising_generator.services.estimate import (
+    PREVIEW_MAX_CAMPAIGN_TRANSACTIONS, PREVIEW_MAX_CAMPAIGNS, estimate_generation, preview_config
+)
+from fundraising_generator.services.generator import FundraisingDataGenerator
+
+
+def preview(config, max_donors):
+    """Preview of a configuration reduced as the API reduces it, with the progress output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FundraisingDataGenerator(preview_config(config)).preview(max_donors)
+
+
+@pytest.fixture(scope='module')
+def seeded_config(demo_config):
+    return dict(demo_config, SEED=11)
+
+
+def test_preview_config_is_one_small_year(seeded_config):
+    reduced = preview_config(seeded_config)
+    assert reduced['YEARS'] == 1
+    assert seeded_config['YEARS'] > 1
+    for data in reduced['CHANNELS'].values():
+        assert all(info.get('nb', 1) <= PREVIEW_MAX_CAMPAIGNS for info in data['campaigns'].values())
+    assert estimate_generation(reduced).campaign_transactions <= PREVIEW_MAX_CAMPAIGN_TRANSACTIONS
+
+
+def test_preview_donors_limits_the_sample(seeded_config):
+    transactions, contacts = preview(seeded_config, 20)
+    donors = transactions['contact_id'].unique()
+    assert len(donors) == 20
+    assert sorted(contacts['contact_id']) == sorted(donors)
+    # Only the first year, monthly gifts cut at its end
+    assert (transactions['date'].dt.year == seeded_config['FIRST_YEAR']).all()
+    assert transactions['date'].is_monotonic_increasing
+
+    # Sampled donors keep every transaction they have in the unsampled preview
+    everything, _ = preview(seeded_config, 100000)
+    assert everything['contact_id'].nunique() > 20
+    sampled = everything[everything['contact_id'].isin(donors)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(transactions.reset_index(drop=True), sampled, check_categorical=False)
+
+
+def test_no_year_previews_no_rows(seeded_config):
+    config = dict(seeded_config, YEARS=0)
+    assert preview_config(config)['YEARS'] == 0
+    transactions, contacts = preview(config, 20)
+    assert transactions.empty
+    assert contacts.empty
@@ -1,6 +1,13 @@
 from django.urls import path
-from .api.views import GenerateDatasetView
+from .api.views import (
+    GenerateDatasetView, GenerationEstimateView, GenerationJobDetailView, GenerationJobDownloadView,
+    GenerationJobListView
+)
 
 urlpatterns = [
     path('generate/', GenerateDatasetView.as_view(), name='generate-dataset'),
+    path('estimate/', GenerationEstimateView.as_view(), name='generation-estimate'),
+    path('jobs/', GenerationJobListView.as_view(), name='generation-jobs'),
+    path('jobs/<str:job_id>/', GenerationJobDetailView.as_view(), name='generation-job'),
+    path('jobs/<str:job_id>/download/', GenerationJobDownloadView.as_view(), name='generation-job-download'),
 ]